@@ -14,6 +14,74 @@ CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # FastF1 Configuration
 FASTF1_CACHE_DIR = str(CACHE_DIR)
+# Disk budget of the FastF1 cache; least recently used sessions are evicted
+# beyond it (0 = unbounded). Sessions whose cache path (<year>/<event>/
+# <session>, e.g. "2023/2023-09-03_Italian_Grand_Prix/*") matches one of
+# the comma-separated glob patterns in FASTF1_CACHE_PINNED are never evicted.
+FASTF1_CACHE_MAX_MB = int(os.getenv("FASTF1_CACHE_MAX_MB", "2048"))
+FASTF1_CACHE_PINNED = [
+    pattern.strip()
+    for pattern in os.getenv("FASTF1_CACHE_PINNED", "").split(",")
+    if pattern.strip()
+]
+
+# Data source used by the API: "fastf1" (live FastF1 API), "local"
+# (pre-exported lap tables under LOCAL_DATA_DIR) or "synthetic" (generated)
+DATA_SOURCE = os.getenv("DATA_SOURCE", "fastf1").lower()
+LOCAL_DATA_DIR = Path(os.getenv("LOCAL_DATA_DIR", str(DATA_DIR / "local")))
+
+# Precompiled analysis bundle (written by build_bundle.py). When set,
+# requests for bundled sessions are answered from it, without loading the
+# session or importing FastF1; other sessions are computed live unless
+# BUNDLE_FALLBACK is off, in which case they are 404
+ANALYSIS_BUNDLE = os.getenv("ANALYSIS_BUNDLE", "")
+BUNDLE_FALLBACK = os.getenv("BUNDLE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Cache of session lap arrays and derived results shared by all workers on
+# the host (memory-mapped files; one worker loads each session)
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SHARED_CACHE_DIR = Path(os.getenv("SHARED_CACHE_DIR", str(DATA_DIR / "shared")))
+# Size budget of the derived results, least recently used evicted first
+# (0 = unbounded)
+SHARED_RESULTS_MAX_MB = int(os.getenv("SHARED_RESULTS_MAX_MB", "256"))
+
+# Downsampled per-lap telemetry (memory-mapped arrays per session and driver)
+TELEMETRY_DIR = DATA_DIR / "telemetry"
+TELEMETRY_DISTANCE_STEP = 5.0  # meters between samples on the distance grid
+# Size budget of the store, least recently used sessions evicted first
+# (0 = unbounded)
+TELEMETRY_MAX_MB = int(os.getenv("TELEMETRY_MAX_MB", "1024"))
+# Base URL of the F1 livetiming API the raw car data stream is read from
+LIVETIMING_URL = os.getenv("LIVETIMING_URL", "https://livetiming.formula1.com")
+
+# Background jobs (season batches, large sweeps, Monte Carlo runs)
+# Job state and results live in a SQLite file so they survive restarts;
+# every API process runs JOB_WORKERS worker threads (0 = accept jobs only)
+JOBS_DB = Path(os.getenv("JOBS_DB", str(DATA_DIR / "jobs.sqlite3")))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))  # seconds
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds
+# A running job whose worker has not renewed its lease for this long is
+# taken to be dead (on any host) and is queued again
+JOB_LEASE_TIMEOUT = float(os.getenv("JOB_LEASE_TIMEOUT", "60"))  # seconds
+
+# Admission control for requests that must load a session from the source
+# (cold loads of FastF1 sessions peak at 200-300MB each); requests served
+# from the shared cache are never limited
+MAX_COLD_LOADS = int(os.getenv("MAX_COLD_LOADS", "1"))  # concurrent, per process
+COLD_LOAD_QUEUE = int(os.getenv("COLD_LOAD_QUEUE", "4"))  # waiting, per process
+COLD_LOAD_QUEUE_TIMEOUT = float(os.getenv("COLD_LOAD_QUEUE_TIMEOUT", "30"))  # seconds
+# Reject cold loads that would take RSS above this (0 = no limit; ~450 on
+# a 512MB instance). COLD_LOAD_MEMORY_MB overrides the data source estimate.
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "0"))
+COLD_LOAD_MEMORY_MB = int(os.getenv("COLD_LOAD_MEMORY_MB", "0"))
+# Bootstrap intervals with more samples than this (~16KB each at peak) are
+# admitted like cold loads; smaller ones run inline
+BOOTSTRAP_COLD_SAMPLES = int(os.getenv("BOOTSTRAP_COLD_SAMPLES", "1000"))
 
 # API Configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -22,6 +90,24 @@ CORS_ORIGINS = os.getenv(
     "CORS_ORIGINS", "http://localhost:3000,http://localhost:3001,http://localhost:3002"
 ).split(",")
 
+# HTTP caching of analysis responses (ETag / Cache-Control, seconds)
+# Sessions from past seasons never change, so clients and proxies may keep
+# them for long; current-season responses are revalidated with the ETag
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+HTTP_CACHE_CURRENT_MAX_AGE = int(os.getenv("HTTP_CACHE_CURRENT_MAX_AGE", "300"))
+
+# Observability
+# Stage timers, /metrics and Server-Timing headers; disable to remove overhead
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Admin API token (X-Admin-Token header); admin features are off when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Per-request profiling (admin only, opt in with X-Profile: 1 or ?profile=1)
+PROFILES_DIR = DATA_DIR / "profiles"
+PROFILE_MAX_RETAINED = int(os.getenv("PROFILE_MAX_RETAINED", "20"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "25"))
+
 # F1 Constants
 PIT_LOSS = {
     "Monza": 22.5,
@@ -1,15 +1,56 @@
 """
 FastAPI entry point for F1 Strategy Room backend.
 """
-from app.config import CORS_ORIGINS
-from app.routers import degradation, overtakes, races, strategy
+from contextlib import asynccontextmanager
+
+from app.config import ADMIN_TOKEN, CORS_ORIGINS, METRICS_ENABLED
+from app.routers import (
+    admin,
+    degradation,
+    export,
+    jobs,
+    laps,
+    overtakes,
+    races,
+    simulation,
+    strategy,
+    undercut,
+)
+from app.services.bundle import get_bundle
+from app.utils import admission, metrics
+from app.utils.profiling import ProfilingMiddleware
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that records serialization as the encode_response stage."""
+
+    def render(self, content) -> bytes:
+        with metrics.stage("encode_response"):
+            return super().render(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background job workers for the lifetime of the process."""
+    # Open the analysis bundle now, so a bad file fails startup
+    get_bundle()
+    # Admission control measures the idle process before any load
+    admission.calibrate()
+    job_queue = jobs.get_job_queue()
+    job_queue.start()
+    yield
+    job_queue.shutdown()
+
 
 app = FastAPI(
     title="F1 Strategy Room API",
     description="Turn F1 telemetry into race-winning strategy insights",
     version="0.1.0",
+    default_response_class=TimedJSONResponse if METRICS_ENABLED else JSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware - allow frontend to access API
@@ -21,11 +62,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics middleware - in-flight gauge, request latency, Server-Timing header
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Profiling middleware - only installed when the admin API is enabled
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(races.router)
 app.include_router(degradation.router)
 app.include_router(strategy.router)
 app.include_router(overtakes.router)
+app.include_router(undercut.router)
+app.include_router(simulation.router)
+app.include_router(export.router)
+app.include_router(laps.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -42,3 +97,13 @@ async def root():
 async def health():
     """Detailed health check."""
     return {"status": "healthy", "service": "f1-strategy-room-api"}
+
+
+if METRICS_ENABLED:
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus scrape endpoint."""
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4"
+        )
@@ -1,7 +1,7 @@
 """
 Pydantic models for API request/response validation.
 """
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -26,6 +26,7 @@ class StintLap(BaseModel):
 
     lap_time: Optional[float]
     tyre_life: Optional[int]
+    lap_number: Optional[int] = None
 
 
 class Stint(BaseModel):
@@ -51,6 +52,12 @@ class DegradationRequest(BaseModel):
     session: str = Field(
         default="R", description="Session type: R, Q, FP1, FP2, FP3, S"
     )
+    bootstrap: int = Field(
+        default=0,
+        ge=0,
+        le=5000,
+        description="Bootstrap samples over stints for confidence intervals (0 = off)",
+    )
 
 
 class DegradationCurve(BaseModel):
@@ -65,6 +72,12 @@ class DegradationCurve(BaseModel):
     )
     r_squared: float = Field(..., description="R² goodness of fit (0-1)")
     sample_size: int = Field(..., description="Number of laps used for fitting")
+    coefficients_ci: Optional[List[List[float]]] = Field(
+        default=None, description="95% bootstrap interval [low, high] per coefficient"
+    )
+    deg_per_lap_ci: Optional[List[float]] = Field(
+        default=None, description="95% bootstrap interval of deg_per_lap"
+    )
 
 
 class DegradationResponse(BaseModel):
@@ -74,7 +87,10 @@ class DegradationResponse(BaseModel):
     year: int
     curves: List[DegradationCurve]
     fuel_effect_per_lap: float = Field(
-        ..., description="Fuel effect correction applied (seconds)"
+        ..., description="Fitted fuel effect for this session (seconds per lap)"
+    )
+    fuel_effect_ci: Optional[List[float]] = Field(
+        default=None, description="95% bootstrap interval of the fuel effect"
     )
 
 
@@ -95,6 +111,18 @@ class StrategyRequest(BaseModel):
     pit_loss_seconds: Optional[float] = Field(
         default=None, description="Pit stop time loss (uses circuit default if None)"
     )
+    bootstrap: int = Field(
+        default=0,
+        ge=0,
+        le=5000,
+        description="Bootstrap samples over stints for confidence intervals (0 = off)",
+    )
+    source: Literal["race", "practice"] = Field(
+        default="race",
+        description="Fit curves on the race session, or on the long runs of the "
+        "weekend's practice and sprint sessions (before the race; `session` is "
+        "ignored)",
+    )
 
 
 class PitStop(BaseModel):
@@ -116,6 +144,15 @@ class Strategy(BaseModel):
     )
     predicted_time: float = Field(..., description="Total race time in seconds")
     time_delta: float = Field(..., description="Delta to fastest strategy in seconds")
+    predicted_time_ci: Optional[List[float]] = Field(
+        default=None, description="95% bootstrap interval of predicted_time"
+    )
+    time_delta_ci: Optional[List[float]] = Field(
+        default=None, description="95% bootstrap interval of time_delta"
+    )
+    probability_fastest: Optional[float] = Field(
+        default=None, description="Share of bootstrap samples where this is fastest"
+    )
 
 
 class StrategyResponse(BaseModel):
@@ -129,6 +166,82 @@ class StrategyResponse(BaseModel):
         ..., description="Strategies ranked by predicted time"
     )
     fastest_strategy: str
+    source: str = Field(default="race", description="Sessions the curves come from")
+    sessions: Optional[List[str]] = Field(
+        default=None, description="Practice sessions fitted (source=practice)"
+    )
+    long_runs: Optional[int] = Field(
+        default=None, description="Long runs fitted (source=practice)"
+    )
+
+
+class SensitivityRequest(BaseModel):
+    """Request for strategy sensitivity analysis."""
+
+    year: int = Field(..., ge=2018, le=2030)
+    race: str
+    session: str = Field(default="R")
+    total_laps: Optional[int] = Field(
+        default=None, description="Total race laps (auto-detected if None)"
+    )
+    pit_loss_seconds: Optional[float] = Field(
+        default=None, description="Pit stop time loss (uses circuit default if None)"
+    )
+    max_stops: int = Field(default=2, ge=1, le=3)
+    pit_loss_range: float = Field(
+        default=5.0, ge=0, le=30, description="Seconds either side of the pit loss"
+    )
+    degradation_range: float = Field(
+        default=0.5, ge=0, le=1, description="Fraction either side of each wear rate"
+    )
+    pace_range: float = Field(
+        default=1.0, ge=0, le=5, description="s/lap either side of each compound's pace"
+    )
+    laps_range: int = Field(
+        default=5, ge=0, le=20, description="Laps either side of the race distance"
+    )
+    steps: int = Field(default=41, ge=3, le=1001, description="Sweep points")
+
+
+class BreakEven(BaseModel):
+    """A parameter value where the fastest strategy changes."""
+
+    value: float
+    from_strategy: str
+    to_strategy: str
+
+
+class ParameterSensitivity(BaseModel):
+    """Sweep of one model parameter."""
+
+    parameter: str = Field(..., description="e.g. 'pit_loss', 'SOFT_degradation'")
+    unit: str
+    baseline: float
+    low: float
+    high: float
+    time_sensitivity: float = Field(
+        ..., description="Change in the best strategy's time per unit (s)"
+    )
+    gap_sensitivity: float = Field(
+        ..., description="Change in the runner-up's deficit per unit (s)"
+    )
+    break_evens: List[BreakEven]
+
+
+class SensitivityResponse(BaseModel):
+    """Response with strategy sensitivity to the model parameters."""
+
+    race_name: str
+    year: int
+    total_laps: int
+    pit_loss_seconds: float
+    best_strategy: str
+    runner_up: str
+    predicted_time: float
+    gap: float = Field(..., description="Runner-up's deficit at baseline in seconds")
+    strategies_evaluated: int
+    evaluations: int = Field(..., description="Strategy race times computed")
+    parameters: List[ParameterSensitivity]
 
 
 # ============================================================================
@@ -153,20 +266,185 @@ class OvertakeZone(BaseModel):
     avg_speed_delta: float = Field(
         ..., description="Average speed differential in km/h"
     )
-    overtake_count: int = Field(
-        ..., description="Number of overtakes observed in this zone"
+    overtake_count: Optional[int] = Field(
+        default=None,
+        description="Observed overtakes in this zone; null until passes are "
+        "located on track (lap positions only give the lap, see per_lap)",
     )
     difficulty: str = Field(..., description="Easy, Medium, Hard based on speed delta")
     has_drs: bool = Field(..., description="DRS zone detected")
 
 
+class LapOvertakes(BaseModel):
+    """Overtakes completed on a single lap."""
+
+    lap: int
+    overtakes: int
+
+
+class OvertakePair(BaseModel):
+    """Overtakes made by one driver on another over the race."""
+
+    overtaking: str = Field(..., description="Driver code of the overtaking car")
+    overtaken: str = Field(..., description="Driver code of the overtaken car")
+    count: int
+
+
 class OvertakeResponse(BaseModel):
     """Response with overtake zones."""
 
     race_name: str
     year: int
     zones: List[OvertakeZone]
-    total_overtakes: int
+    total_overtakes: int = Field(
+        ..., description="On-track position swaps, excluding pit stops and retirements"
+    )
+    overtakes_per_lap: List[LapOvertakes] = Field(default_factory=list)
+    overtakes_by_pair: List[OvertakePair] = Field(default_factory=list)
+
+
+# ============================================================================
+# Undercut Endpoint
+# ============================================================================
+
+
+class DriverState(BaseModel):
+    """A driver's current stint and gap."""
+
+    driver: str
+    compound: str
+    tyre_life: int = Field(..., ge=0, description="Laps on the current set")
+    gap: float = Field(..., ge=0, description="Gap to the leader in seconds")
+    pace_offset: float = Field(
+        default=0.0,
+        description="Driver pace relative to the compound curve (s/lap, + = slower)",
+    )
+    position: Optional[int] = None
+
+
+class UndercutRequest(BaseModel):
+    """Request for pairwise undercut/overcut analysis."""
+
+    year: int = Field(..., ge=2018, le=2030)
+    race: str
+    session: str = Field(default="R")
+    lap: Optional[int] = Field(
+        default=None, ge=1, description="Current lap (half distance if None)"
+    )
+    horizon: int = Field(default=5, ge=1, le=20, description="Candidate pit laps ahead")
+    response_lag: int = Field(
+        default=1, ge=1, le=5, description="Laps before the other car pits"
+    )
+    drivers: Optional[List[DriverState]] = Field(
+        default=None,
+        description="Driver states to analyze instead of the session's at `lap`",
+    )
+
+
+class PitOpportunity(BaseModel):
+    """A pit stop timing that gains track position on a rival."""
+
+    attacker: str = Field(..., description="Driver behind who gains the position")
+    defender: str = Field(..., description="Driver ahead")
+    gap: float = Field(..., description="Current gap between them in seconds")
+    pit_lap: int = Field(..., description="Lap of the first stop when stopping now")
+    margin: float = Field(
+        ...,
+        description="Seconds ahead after both stops when stopping now "
+        "(negative: not yet)",
+    )
+    best_pit_lap: int = Field(
+        ...,
+        description="Best lap for the first stop within the horizon, if the "
+        "rival does not stop first",
+    )
+    best_margin: float = Field(..., description="Margin when stopping at best_pit_lap")
+    new_compound: str = Field(..., description="Compound the attacker fits")
+
+
+class UndercutResponse(BaseModel):
+    """Response with undercut and overcut opportunities."""
+
+    race_name: str
+    year: int
+    lap: int
+    horizon: int
+    response_lag: int
+    drivers: List[DriverState]
+    undercuts: List[PitOpportunity] = Field(
+        ..., description="Attacker pits first and comes out ahead"
+    )
+    overcuts: List[PitOpportunity] = Field(
+        ..., description="Attacker stays out longer and comes out ahead"
+    )
+
+
+# ============================================================================
+# Race Simulation Endpoint
+# ============================================================================
+
+
+class DriverPlan(BaseModel):
+    """A driver's strategy and pace for a full-race simulation."""
+
+    driver: str
+    compounds: List[str] = Field(..., min_length=1, description="Compound per stint")
+    pit_laps: List[int] = Field(
+        default_factory=list, description="Lap at the end of which each stop is made"
+    )
+    pace_offset: float = Field(
+        default=0.0,
+        description="Driver pace relative to the compound curve (s/lap, + = slower)",
+    )
+
+
+class SimulationRequest(BaseModel):
+    """Request for a full-field race simulation."""
+
+    year: int = Field(..., ge=2018, le=2030)
+    race: str
+    session: str = Field(default="R")
+    drivers: Optional[List[DriverPlan]] = Field(
+        default=None,
+        description="Plans in starting order (the session's actual strategies if None)",
+    )
+    pit_loss_seconds: Optional[float] = Field(
+        default=None, description="Pit stop time loss (uses circuit default if None)"
+    )
+    overtake_margin: float = Field(
+        default=0.5,
+        ge=0,
+        description="Seconds a car must get ahead by to complete a pass",
+    )
+    runs: int = Field(default=1, ge=1, le=10000, description="Monte Carlo races")
+    lap_time_sigma: float = Field(
+        default=0.3, ge=0, le=5, description="Lap-time noise in Monte Carlo races"
+    )
+    seed: Optional[int] = None
+
+
+class SimulatedDriver(BaseModel):
+    """A driver's simulated result."""
+
+    driver: str
+    position: int
+    total_time: float
+    gap: float = Field(..., description="Gap to the winner in seconds")
+    laps_held: int = Field(..., description="Laps held up behind a slower car")
+    mean_position: float = Field(..., description="Mean position over the runs")
+    win_probability: float
+
+
+class SimulationResponse(BaseModel):
+    """Response with the simulated finishing order."""
+
+    race_name: str
+    year: int
+    total_laps: int
+    pit_loss_seconds: float
+    runs: int
+    drivers: List[DriverPlan]
+    results: List[SimulatedDriver]
 
 
 # ============================================================================
@@ -190,3 +468,69 @@ class RacesResponse(BaseModel):
 
     season: int
     races: List[RaceInfo]
+
+
+# ============================================================================
+# Jobs Endpoint
+# ============================================================================
+
+
+class SeasonRequest(BaseModel):
+    """Request for degradation fits of every race in a season (job only)."""
+
+    year: int = Field(..., ge=2018, le=2030)
+    session: str = Field(default="R")
+    races: Optional[List[str]] = Field(
+        default=None, description="Races to include (the whole season if None)"
+    )
+
+
+class SeasonRaceDegradation(BaseModel):
+    """Degradation fit of one race of a season."""
+
+    race_name: str
+    curves: List[DegradationCurve]
+    fuel_effect_per_lap: float
+
+
+class SeasonDegradationResponse(BaseModel):
+    """Degradation fits of a season's races, from one batched solve."""
+
+    year: int
+    races: List[SeasonRaceDegradation]
+    missing: List[str] = Field(
+        default_factory=list, description="Requested races that could not be loaded"
+    )
+
+
+class JobSubmission(BaseModel):
+    """A long-running analysis to run in the background."""
+
+    kind: Literal["simulate", "sensitivity", "season"] = Field(
+        ...,
+        description=(
+            "simulate: SimulationRequest, sensitivity: SensitivityRequest, "
+            "season: SeasonRequest"
+        ),
+    )
+    params: Dict[str, Any] = Field(..., description="Request body for the kind")
+
+
+class Job(BaseModel):
+    """State of a submitted job."""
+
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    params: Dict[str, Any]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = Field(
+        default=None, description="When the job and its result are deleted"
+    )
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+    deduplicated: bool = Field(
+        default=False, description="An identical job was already submitted"
+    )
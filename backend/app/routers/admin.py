@@ -0,0 +1,113 @@
+"""
+Admin API endpoints (require X-Admin-Token).
+"""
+from typing import Optional
+
+from app.services.fastf1_cache import MB, FastF1DiskCache
+from app.services.fastf1_client import FastF1Client
+from app.services.telemetry_store import TelemetryStore
+from app.utils import profiling
+from app.utils.admin import require_admin
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+router = APIRouter(
+    prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    List retained request profiles, newest first.
+
+    Profiles are captured by sending X-Profile: 1 (or ?profile=1) with an
+    admin token on any request.
+    """
+    return {"profiles": profiling.list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, kind: str = "txt"):
+    """
+    Download a captured profile.
+
+    kind=txt returns the readable report with top functions and allocation
+    sites; kind=prof returns raw cProfile stats for pstats/snakeviz.
+    """
+    path = profiling.get_profile_path(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+
+    media_type = "text/plain" if kind == "txt" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
+@router.get("/telemetry")
+async def telemetry_store_stats():
+    """
+    Report the downsampled telemetry store.
+
+    Lists every stored session with its on-disk size, ingest time and the
+    time taken to open all of its drivers' memory-mapped arrays.
+    """
+    sessions = TelemetryStore().session_stats()
+    return {
+        "sessions": sessions,
+        "total_size_bytes": sum(s["size_bytes"] for s in sessions),
+    }
+
+
+@router.get("/shared-cache")
+async def shared_cache_stats():
+    """
+    Report the cross-worker cache for the configured data source.
+
+    Lists stored sessions, result counts per namespace, the sessions this
+    worker has open and the total size on disk.
+    """
+    return FastF1Client().cache.stats()
+
+
+@router.get("/fastf1-cache")
+async def fastf1_cache_stats(top: int = Query(default=20, ge=0, le=1000)):
+    """
+    Report the FastF1 disk cache.
+
+    Size against the FASTF1_CACHE_MAX_MB budget, session and file counts,
+    pinned sessions, load hit rate, evictions so far and the `top` most
+    recently used sessions with their sizes and hit counts.
+    """
+    return FastF1DiskCache().stats(top=top)
+
+
+@router.post("/fastf1-cache/purge")
+async def purge_fastf1_cache(
+    target_mb: Optional[int] = Query(
+        default=None, ge=0, description="Shrink to this size (default: the budget)"
+    ),
+    pattern: Optional[str] = Query(
+        default=None, description="Only evict sessions matching this glob"
+    ),
+):
+    """
+    Evict least recently used sessions from the FastF1 disk cache.
+
+    Pinned sessions are never evicted. With `pattern` and no `target_mb`,
+    every matching unpinned session is evicted.
+    """
+    cache = FastF1DiskCache()
+    if target_mb is not None:
+        return cache.evict(target_mb * MB, pattern=pattern)
+    if pattern is not None:
+        return cache.evict(0, pattern=pattern)
+    return cache.enforce()
+
+
+@router.post("/fastf1-cache/compact")
+async def compact_fastf1_cache():
+    """
+    Compact the FastF1 disk cache: rebuild the index, remove empty
+    directories and leftover temporary files, and VACUUM its SQLite files.
+    """
+    return FastF1DiskCache().compact()
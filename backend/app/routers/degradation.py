@@ -1,25 +1,55 @@
 """
 Degradation analysis API endpoint.
 """
+import numpy as np
 from app.models.schemas import DegradationRequest, DegradationResponse
+from app.services import bundle
 from app.services.degradation_model import DegradationModel
 from app.services.fastf1_client import FastF1Client
-from fastapi import APIRouter, HTTPException
+from app.utils import admission
+from app.utils.http_cache import cache_headers, conditional_response, session_etag
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 router = APIRouter(prefix="/api/degradation", tags=["degradation"])
 
 
 @router.post("", response_model=DegradationResponse)
-async def analyze_degradation(request: DegradationRequest):
+async def analyze_degradation(
+    request: DegradationRequest, http_request: Request, response: Response
+):
     """
     Analyze tyre degradation for a race.
 
     Returns degradation curves for each compound with coefficients,
-    degradation rate, and goodness-of-fit metrics.
+    degradation rate, and goodness-of-fit metrics. With `bootstrap` > 0,
+    adds 95% intervals from resampling stints.
     """
+    # The client or a proxy may already have this exact response
+    etag = session_etag("degradation", request)
+    cached = conditional_response(http_request, etag, request.year)
+    if cached is not None:
+        return cached
+
+    # Precomputed fit, without loading the session
+    bundled = (
+        None
+        if request.bootstrap
+        else bundle.find_session(request.year, request.race, request.session)
+    )
+    if bundled is not None:
+        response.headers.update(cache_headers(etag, request.year))
+        return DegradationResponse(
+            race_name=bundled.event["EventName"],
+            year=request.year,
+            curves=bundled.fit["curves"],
+            fuel_effect_per_lap=bundled.fit["fuel_effect_per_lap"],
+        )
+
     # Load session
     client = FastF1Client()
-    session = client.load_session(request.year, request.race, request.session)
+    session = await admission.load_session(
+        client, request.year, request.race, request.session
+    )
 
     if session is None:
         raise HTTPException(
@@ -27,32 +57,42 @@ async def analyze_degradation(request: DegradationRequest):
             detail=f"Session not found: {request.year} {request.race} {request.session}",
         )
 
-    # Get stint data for all drivers
-    all_drivers = session.laps["Driver"].unique()
-    all_stints = {}
-
-    for driver in all_drivers:
-        stints = client.get_stint_data(session, driver)
-        if stints:
-            all_stints[driver] = stints
+    # Fit degradation and fuel model (once per session, shared by all workers)
+    fit = client.get_degradation_fit(session)
+    curves = fit["curves"]
 
-    if not all_stints:
+    if not curves:
         raise HTTPException(
-            status_code=500, detail="No stint data available for analysis"
+            status_code=500, detail="Could not generate degradation curves"
         )
 
-    # Fit degradation model
-    model = DegradationModel()
-    curves = model.analyze_race(all_stints)
+    fuel_effect_ci = None
+    if request.bootstrap:
 
-    if not curves:
-        raise HTTPException(
-            status_code=500, detail="Could not generate degradation curves"
+        def intervals():
+            samples = client.get_degradation_bootstrap(session, request.bootstrap)
+            return (
+                DegradationModel().curve_intervals(curves, samples),
+                np.percentile(samples["fuel_effect_per_lap"], [2.5, 97.5]).tolist(),
+            )
+
+        curves, fuel_effect_ci = await admission.run_bootstrap(
+            request.bootstrap, intervals
         )
 
+    response.headers.update(cache_headers(etag, request.year))
     return DegradationResponse(
         race_name=session.event["EventName"],
         year=request.year,
         curves=curves,
-        fuel_effect_per_lap=DegradationModel.FUEL_EFFECT_PER_LAP,
+        fuel_effect_per_lap=fit["fuel_effect_per_lap"],
+        fuel_effect_ci=fuel_effect_ci,
     )
+
+
+@router.get("", response_model=DegradationResponse)
+async def get_degradation(
+    http_request: Request, response: Response, request: DegradationRequest = Depends()
+):
+    """Cacheable GET form of POST /api/degradation, with query parameters."""
+    return await analyze_degradation(request, http_request, response)
@@ -0,0 +1,119 @@
+"""
+Binary columnar export API endpoint.
+"""
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from app.services import bundle
+from app.services.fastf1_client import FastF1Client
+from app.services.session_data import session_key
+from app.utils import admission, columnar
+from app.utils.http_cache import cache_headers, conditional_response, make_etag
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: Literal["laps", "stints", "curves"],
+    http_request: Request,
+    year: int = Query(..., ge=2018, le=2030),
+    race: str = Query(...),
+    session: str = Query(default="R"),
+    format: Literal["npz", "arrow"] = Query(default="npz"),
+    columns: Optional[str] = Query(
+        default=None, description="Comma-separated columns to include (default: all)"
+    ),
+    chunk_rows: int = Query(default=columnar.CHUNK_ROWS, ge=1024, le=1_000_000),
+):
+    """
+    Export a session's quick laps, stints or fitted curves in bulk.
+
+    The response is a NumPy .npz archive (one array per column, read with
+    `numpy.load`) or an Arrow IPC stream (`pyarrow.ipc.open_stream`),
+    streamed in chunks of `chunk_rows` rows straight from the session's
+    arrays.
+
+    - laps: the fields of get_race_laps (quick laps)
+    - stints: one row per driver stint, as get_stint_data
+    - curves: one row per compound with the fitted coefficients
+    """
+    if format == "arrow" and not columnar.arrow_available():
+        raise HTTPException(
+            status_code=501, detail="Arrow export needs pyarrow on the server"
+        )
+    projection = [name.strip() for name in columns.split(",")] if columns else None
+
+    etag = make_etag(
+        "export",
+        {
+            "session": session_key(year, race, session),
+            "dataset": dataset,
+            "format": format,
+            "columns": projection,
+        },
+    )
+    cached = conditional_response(http_request, etag, year)
+    if cached is not None:
+        return cached
+
+    bundled = None if dataset == "laps" else bundle.find_session(year, race, session)
+    if bundled is not None:
+        # Precomputed stints and fit, without loading the session
+        key = bundled.key
+        if dataset == "stints":
+            data = bundled.stint_columns()
+        else:
+            data = _curve_columns(bundled.fit["curves"])
+    else:
+        # Load session
+        client = FastF1Client()
+        loaded = await admission.load_session(client, year, race, session)
+        if loaded is None:
+            raise HTTPException(
+                status_code=404, detail=f"Session not found: {year} {race} {session}"
+            )
+
+        key = loaded.key
+        if dataset == "laps":
+            data = client.get_race_lap_columns(loaded)
+        elif dataset == "stints":
+            data = client.get_stint_columns(loaded)
+        else:
+            data = _curve_columns(client.get_degradation_fit(loaded)["curves"])
+
+    if projection:
+        unknown = [name for name in projection if name not in data]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown columns {unknown}, expected some of {list(data)}",
+            )
+        data = {name: data[name] for name in projection}
+
+    filename = f"{key}_{dataset}.{format}"
+    return StreamingResponse(
+        columnar.stream_columns(data, format, chunk_rows),
+        media_type=columnar.MEDIA_TYPES[format],
+        headers={
+            **cache_headers(etag, year),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
+
+
+def _curve_columns(curves: List[Dict]) -> Dict[str, np.ndarray]:
+    """Fitted curves as columns, coefficients split into a, b and c."""
+    coefficients = np.array([c["coefficients"] for c in curves], dtype=float)
+    coefficients = coefficients.reshape(len(curves), 3)
+    return {
+        "compound": np.array([c["compound"] for c in curves], dtype="U16"),
+        "a": coefficients[:, 0],
+        "b": coefficients[:, 1],
+        "c": coefficients[:, 2],
+        "deg_per_lap": np.array([c["deg_per_lap"] for c in curves], dtype=float),
+        "r_squared": np.array([c["r_squared"] for c in curves], dtype=float),
+        "sample_size": np.array([c["sample_size"] for c in curves], dtype=np.int64),
+    }
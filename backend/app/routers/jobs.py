@@ -0,0 +1,153 @@
+"""
+Background jobs API endpoints.
+"""
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict
+
+from app.models.schemas import (
+    Job,
+    JobSubmission,
+    SeasonDegradationResponse,
+    SeasonRaceDegradation,
+    SeasonRequest,
+    SensitivityRequest,
+    SimulationRequest,
+)
+from app.routers import simulation, strategy
+from app.services.degradation_model import DegradationModel
+from app.services.fastf1_client import FastF1Client
+from app.services.job_queue import JobError, JobQueue
+from app.services.stints import StintTable
+from app.utils import admission
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+async def season_degradation(request: SeasonRequest) -> SeasonDegradationResponse:
+    """Degradation curves of every race in a season, fitted in one batch."""
+    client = FastF1Client()
+    races = request.races or [
+        event["race_name"] for event in client.source.get_schedule(request.year)
+    ]
+
+    sessions, missing = [], []
+    for race in races:
+        session = await admission.load_session(
+            client, request.year, race, request.session
+        )
+        if session is None:
+            missing.append(race)
+        else:
+            sessions.append(session)
+    if not sessions:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No sessions found: {request.year} {request.session}",
+        )
+
+    # One lap buffer and one batched solve for the whole season
+    stints = StintTable.concatenate([client.get_stint_table(s) for s in sessions])
+    fits = DegradationModel().analyze_season(stints)
+
+    return SeasonDegradationResponse(
+        year=request.year,
+        races=[
+            SeasonRaceDegradation(race_name=session.event["EventName"], **fit)
+            for session, fit in zip(sessions, fits)
+        ],
+        missing=missing,
+    )
+
+
+# Request model and handler of each job kind
+JOB_KINDS = {
+    "simulate": (SimulationRequest, simulation.simulate_race),
+    "sensitivity": (SensitivityRequest, strategy.analyze_sensitivity),
+    "season": (SeasonRequest, season_degradation),
+}
+
+
+def run_job(kind: str, params: Dict[str, Any]) -> Any:
+    """Run a job's handler in the calling (worker) thread."""
+    model, handler = JOB_KINDS[kind]
+    try:
+        response = asyncio.run(handler(model(**params)))
+    except HTTPException as e:
+        raise JobError(e.status_code, str(e.detail))
+    return jsonable_encoder(response)
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    """This process's job queue (started by the app on startup)."""
+    return JobQueue(run_job)
+
+
+@router.post("", response_model=Job, status_code=202)
+async def submit_job(submission: JobSubmission, response: Response):
+    """
+    Submit a long-running analysis and return its job id at once.
+
+    `params` is the request body of the matching endpoint (POST
+    /api/simulate, POST /api/strategy/sensitivity) or, for "season", a
+    SeasonRequest fitting degradation for every race of a season. An
+    identical submission returns the existing job (`deduplicated`) while it
+    is pending or its result is retained.
+    """
+    model, _ = JOB_KINDS[submission.kind]
+    try:
+        request = model.model_validate(submission.params)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    queue = get_job_queue()
+    queue.start()
+    job, created = queue.submit(submission.kind, request.model_dump(mode="json"))
+    response.headers["Location"] = f"{router.prefix}/{job['id']}"
+    return Job(**job, deduplicated=not created)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Status of a job."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return Job(**job)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Result of a succeeded job: the response body of the matching endpoint.
+
+    Returns 409 while the job is queued or running, or if it failed or was
+    cancelled.
+    """
+    job = get_job_queue().get(job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if job["status"] != "succeeded":
+        detail = f"Job {job_id} is {job['status']}"
+        if job["error"]:
+            detail += f": {job['error']}"
+        raise HTTPException(status_code=409, detail=detail)
+    return job["result"]
+
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job.
+
+    A running job is not interrupted, but its result is discarded.
+    """
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return Job(**job)
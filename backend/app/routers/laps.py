@@ -0,0 +1,140 @@
+"""
+Lap data API endpoint.
+"""
+import base64
+import binascii
+import json
+from typing import Iterator, List, Optional
+
+import numpy as np
+from app.services.fastf1_client import RACE_LAP_FIELDS, FastF1Client
+from app.services.session_data import SessionData, session_key
+from app.utils import admission
+from app.utils.http_cache import cache_headers, conditional_response, make_etag
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(prefix="/api/laps", tags=["laps"])
+
+PAGE_LIMIT = 1000
+CHUNK_ROWS = 500  # laps per written chunk
+
+
+@router.get("")
+async def stream_laps(
+    http_request: Request,
+    year: int = Query(..., ge=2018, le=2030),
+    race: str = Query(...),
+    session: str = Query(default="R"),
+    driver: Optional[str] = Query(default=None, description="Comma-separated codes"),
+    compound: Optional[str] = Query(default=None, description="Comma-separated"),
+    lap_min: Optional[int] = Query(default=None, ge=1),
+    lap_max: Optional[int] = Query(default=None, ge=1),
+    tyre_life_min: Optional[int] = Query(default=None, ge=0),
+    tyre_life_max: Optional[int] = Query(default=None, ge=0),
+    fields: Optional[str] = Query(
+        default=None, description="Comma-separated fields to include (default: all)"
+    ),
+    limit: int = Query(default=PAGE_LIMIT, ge=1, le=100_000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of a page"),
+):
+    """
+    Stream a session's quick laps as newline-delimited JSON.
+
+    One lap object per line, with the fields of get_race_laps (or the
+    `fields` projection). Laps are filtered on the server and come in
+    table order, `limit` per page; when more laps match, the response
+    carries an `X-Next-Cursor` header (and a `Link: rel="next"`) to pass
+    as `cursor` for the next page.
+    """
+    projection = [f.strip() for f in fields.split(",")] if fields else None
+    projection = projection or list(RACE_LAP_FIELDS)
+    unknown = [name for name in projection if name not in RACE_LAP_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}, expected some of {list(RACE_LAP_FIELDS)}",
+        )
+    after = _decode_cursor(cursor) if cursor else -1
+
+    etag = make_etag(
+        "laps",
+        {
+            "session": session_key(year, race, session),
+            "driver": _split(driver),
+            "compound": _split(compound),
+            "laps": [lap_min, lap_max],
+            "tyre_life": [tyre_life_min, tyre_life_max],
+            "fields": projection,
+            "limit": limit,
+            "after": after,
+        },
+    )
+    cached = conditional_response(http_request, etag, year)
+    if cached is not None:
+        return cached
+
+    # Load session
+    client = FastF1Client()
+    loaded = await admission.load_session(client, year, race, session)
+    if loaded is None:
+        raise HTTPException(
+            status_code=404, detail=f"Session not found: {year} {race} {session}"
+        )
+
+    rows = client.select_race_laps(
+        loaded,
+        drivers=_split(driver),
+        compounds=_split(compound),
+        lap_range=(lap_min, lap_max),
+        tyre_life_range=(tyre_life_min, tyre_life_max),
+    )
+    # Keyset pagination on the row index: stable while the session is cached
+    rows = rows[np.searchsorted(rows, after, side="right") :]
+    page = rows[:limit]
+
+    headers = cache_headers(etag, year)
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(int(page[-1]))
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = http_request.url.include_query_params(cursor=next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+
+    return StreamingResponse(
+        _ndjson(client, loaded, page, projection),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+def _ndjson(
+    client: FastF1Client, session: SessionData, rows: np.ndarray, fields: List[str]
+) -> Iterator[str]:
+    """Encode the laps one chunk at a time, so only a chunk is held in memory."""
+    for chunk in client.iter_race_laps(session, rows, fields, CHUNK_ROWS):
+        yield "".join(json.dumps(lap, separators=(",", ":")) + "\n" for lap in chunk)
+
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated codes as an upper-case list (None when absent or empty)."""
+    if not value:
+        return None
+    items = [item.strip().upper() for item in value.split(",") if item.strip()]
+    return items or None
+
+
+def _encode_cursor(row: int) -> str:
+    """Opaque cursor for the laps after the given table row."""
+    raw = json.dumps({"after": row}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after = json.loads(raw)["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(after, int) or isinstance(after, bool) or after < -1:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
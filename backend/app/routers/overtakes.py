@@ -4,22 +4,36 @@ Overtake zone analysis API endpoint.
 from app.models.schemas import OvertakeRequest, OvertakeResponse
 from app.services.fastf1_client import FastF1Client
 from app.services.overtake_analyzer import OvertakeAnalyzer
-from fastapi import APIRouter, HTTPException
+from app.services.telemetry_store import TelemetryStore
+from app.utils import admission
+from app.utils.http_cache import cache_headers, conditional_response, session_etag
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 router = APIRouter(prefix="/api/overtakes", tags=["overtakes"])
 
 
 @router.post("", response_model=OvertakeResponse)
-async def analyze_overtakes(request: OvertakeRequest):
+async def analyze_overtakes(
+    request: OvertakeRequest, http_request: Request, response: Response
+):
     """
     Analyze overtaking zones for a race.
 
     Returns identified overtaking zones with speed deltas,
-    overtake counts, and difficulty ratings.
+    overtake counts, and difficulty ratings, plus position-based overtake
+    counts per lap and per driver pair.
     """
+    # The client or a proxy may already have this exact response
+    etag = session_etag("overtakes", request)
+    cached = conditional_response(http_request, etag, request.year)
+    if cached is not None:
+        return cached
+
     # Load session
     client = FastF1Client()
-    session = client.load_session(request.year, request.race, request.session)
+    session = await admission.load_session(
+        client, request.year, request.race, request.session
+    )
 
     if session is None:
         raise HTTPException(
@@ -29,11 +43,31 @@ async def analyze_overtakes(request: OvertakeRequest):
 
     # Analyze overtaking zones
     analyzer = OvertakeAnalyzer()
-    result = analyzer.analyze_session(session)
+    if TelemetryStore().needs_ingest(session):
+        # First use streams the session's car data: admitted like a cold load
+        result = await admission.run_cold(
+            TelemetryStore.INGEST_MEMORY_BYTES, analyzer.analyze_session, session
+        )
+    else:
+        result = analyzer.analyze_session(session)
 
+    # Zones missing because telemetry could not be loaded must not be cached
+    response.headers.update(
+        cache_headers(etag, request.year, complete=result["complete"])
+    )
     return OvertakeResponse(
         race_name=session.event["EventName"],
         year=request.year,
         zones=result["zones"],
         total_overtakes=result["total_overtakes"],
+        overtakes_per_lap=result["per_lap"],
+        overtakes_by_pair=result["per_pair"],
     )
+
+
+@router.get("", response_model=OvertakeResponse)
+async def get_overtakes(
+    http_request: Request, response: Response, request: OvertakeRequest = Depends()
+):
+    """Cacheable GET form of POST /api/overtakes, with query parameters."""
+    return await analyze_overtakes(request, http_request, response)
@@ -1,46 +1,42 @@
 """
 Races listing API endpoint.
 """
-import fastf1
-from app.config import FASTF1_CACHE_DIR
 from app.models.schemas import RaceInfo, RacesResponse
-from fastapi import APIRouter, HTTPException
+from app.services import bundle
+from app.services.fastf1_client import FastF1Client
+from app.utils.http_cache import cache_headers, conditional_response, make_etag
+from fastapi import APIRouter, HTTPException, Request, Response
 
 router = APIRouter(prefix="/api/races", tags=["races"])
 
 
 @router.get("/{year}", response_model=RacesResponse)
-async def list_races(year: int):
+async def list_races(year: int, http_request: Request, response: Response):
     """
     List all races for a given season.
 
     Returns race calendar with names, dates, and locations.
     """
-    try:
-        # Enable cache
-        fastf1.Cache.enable_cache(FASTF1_CACHE_DIR)
-
-        # Get schedule
-        schedule = fastf1.get_event_schedule(year)
-
-        races = []
-        for _, event in schedule.iterrows():
-            # Only include actual race events (skip testing)
-            if event.get("EventFormat") != "testing":
-                races.append(
-                    RaceInfo(
-                        year=year,
-                        round_number=int(event["RoundNumber"]),
-                        race_name=event["EventName"],
-                        circuit_name=event.get("Location", "Unknown"),
-                        country=event.get("Country", "Unknown"),
-                        date=str(event["EventDate"]),
-                    )
-                )
-
-        return RacesResponse(season=year, races=races)
+    # Seasons with bundled sessions are listed without the data source
+    bundled = bundle.get_bundle()
+    schedule = bundled.get_schedule(year) if bundled else None
 
+    try:
+        if schedule is None:
+            schedule = FastF1Client().source.get_schedule(year)
+        races = [RaceInfo(year=year, **event) for event in schedule]
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Could not fetch race schedule: {str(e)}"
         )
+
+    # The schedule itself is part of the ETag: a bundle and the data source,
+    # or a revised calendar of the current season, give different ones
+    etag = make_etag("races", {"year": year, "schedule": schedule})
+    cached = conditional_response(http_request, etag, year)
+    if cached is not None:
+        return cached
+
+    # An empty schedule (season not published, or missing locally) is not kept
+    response.headers.update(cache_headers(etag, year, complete=bool(races)))
+    return RacesResponse(season=year, races=races)
@@ -0,0 +1,127 @@
+"""
+Full-field race simulation API endpoint.
+"""
+import numpy as np
+from app.config import PIT_LOSS
+from app.models.schemas import SimulationRequest, SimulationResponse
+from app.services.fastf1_client import FastF1Client
+from app.services.race_simulator import RaceSimulator
+from app.utils import admission
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter(prefix="/api/simulate", tags=["simulation"])
+
+
+@router.post("", response_model=SimulationResponse)
+async def simulate_race(request: SimulationRequest):
+    """
+    Simulate the whole field lap by lap to a finishing order.
+
+    Every car runs its strategy on the race's fitted degradation curves,
+    with traffic: cars that cannot get far enough ahead to pass are held
+    behind. Without `drivers`, each driver's actual strategy and pace are
+    used. With `runs` > 1, lap-time noise is added and the finishing
+    positions are averaged over the runs.
+    """
+    # Load session
+    client = FastF1Client()
+    session = await admission.load_session(
+        client, request.year, request.race, request.session
+    )
+
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session not found: {request.year} {request.race} {request.session}",
+        )
+
+    total_laps = session.total_laps
+    circuit_name = session.event.get("Location", "default")
+    pit_loss = request.pit_loss_seconds or PIT_LOSS.get(
+        circuit_name, PIT_LOSS["default"]
+    )
+
+    # Degradation curves (once per session, shared by all workers)
+    fit = client.get_degradation_fit(session)
+    if not fit["curves"]:
+        raise HTTPException(
+            status_code=500, detail="Could not generate degradation curves"
+        )
+
+    simulator = RaceSimulator(
+        fit["curves"], fit["fuel_effect_per_lap"], pit_loss, request.overtake_margin
+    )
+    if request.drivers:
+        drivers = [plan.model_dump() for plan in request.drivers]
+        for plan in drivers:
+            _validate_plan(plan, simulator, total_laps)
+    else:
+        drivers = simulator.field_from_session(session)
+    if not drivers:
+        raise HTTPException(status_code=500, detail="No drivers to simulate")
+
+    plans = simulator.plan_arrays(drivers, total_laps)
+    race = simulator.simulate(
+        plans["compounds"], plans["pit_laps"], plans["pace_offset"], total_laps
+    )
+    results = simulator.results(drivers, race["total_time"][0])
+
+    # Monte Carlo: distribution of finishing positions under lap-time noise
+    if request.runs > 1:
+        samples = simulator.simulate(
+            plans["compounds"],
+            plans["pit_laps"],
+            plans["pace_offset"],
+            total_laps,
+            runs=request.runs,
+            lap_time_sigma=request.lap_time_sigma,
+            seed=request.seed,
+        )
+        positions = samples["total_time"].argsort(axis=1).argsort(axis=1) + 1
+    else:
+        positions = race["total_time"].argsort(axis=1).argsort(axis=1) + 1
+
+    index = {plan["driver"]: i for i, plan in enumerate(drivers)}
+    for result in results:
+        i = index[result["driver"]]
+        result["laps_held"] = int(race["laps_held"][0, i])
+        result["mean_position"] = round(float(positions[:, i].mean()), 2)
+        result["win_probability"] = round(float(np.mean(positions[:, i] == 1)), 4)
+
+    return SimulationResponse(
+        race_name=session.event["EventName"],
+        year=request.year,
+        total_laps=total_laps,
+        pit_loss_seconds=pit_loss,
+        runs=request.runs,
+        drivers=drivers,
+        results=results,
+    )
+
+
+def _validate_plan(plan: dict, simulator: RaceSimulator, total_laps: int) -> None:
+    """Reject plans the simulator cannot run."""
+    unknown = set(plan["compounds"]) - set(simulator.compounds)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No degradation curve for compounds: {sorted(unknown)}",
+        )
+
+    pit_laps = plan["pit_laps"]
+    if len(pit_laps) != len(plan["compounds"]) - 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{plan['driver']}: need one pit lap per compound change",
+        )
+    if any(
+        lap < 1 or lap >= total_laps or lap <= previous
+        for previous, lap in zip([0] + pit_laps, pit_laps)
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"{plan['driver']}: pit laps must be increasing and before "
+                f"the last lap ({total_laps})"
+            ),
+        )
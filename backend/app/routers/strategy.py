@@ -1,77 +1,313 @@
 """
 Strategy simulation API endpoint.
 """
+import asyncio
+from typing import List
+
 from app.config import PIT_LOSS
-from app.models.schemas import StrategyRequest, StrategyResponse
+from app.models.schemas import (
+    SensitivityRequest,
+    SensitivityResponse,
+    StrategyRequest,
+    StrategyResponse,
+)
+from app.services import bundle
 from app.services.degradation_model import DegradationModel
 from app.services.fastf1_client import FastF1Client
+from app.services.long_runs import PRACTICE_SESSIONS
+from app.services.sensitivity_analyzer import SensitivityAnalyzer
+from app.services.session_data import SessionData
 from app.services.strategy_engine import StrategyEngine
-from fastapi import APIRouter, HTTPException
+from app.utils import admission
+from app.utils.http_cache import cache_headers, conditional_response, session_etag
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 router = APIRouter(prefix="/api/strategy", tags=["strategy"])
 
 
 @router.post("", response_model=StrategyResponse)
-async def simulate_strategies(request: StrategyRequest):
+async def simulate_strategies(
+    request: StrategyRequest, http_request: Request, response: Response
+):
     """
     Simulate and rank pit stop strategies.
 
     Returns all viable strategies ranked by predicted finish time,
-    using degradation model to estimate lap times.
+    using degradation model to estimate lap times. With `bootstrap` > 0,
+    adds 95% intervals on each strategy's time and delta and the
+    probability that it is the fastest.
+
+    With `source=practice`, the curves are fitted on the long runs of the
+    weekend's practice and sprint sessions instead, to plan the race before
+    it is run.
     """
-    # Load session
-    client = FastF1Client()
-    session = client.load_session(request.year, request.race, request.session)
+    if request.source == "practice":
+        return await _simulate_from_practice(request, http_request, response)
 
-    if session is None:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Session not found: {request.year} {request.race} {request.session}",
+    # The client or a proxy may already have this exact response
+    etag = session_etag("strategy", request)
+    cached = conditional_response(http_request, etag, request.year)
+    if cached is not None:
+        return cached
+
+    # Precomputed fit (and default strategies), without loading the session
+    bundled = (
+        None
+        if request.bootstrap
+        else bundle.find_session(request.year, request.race, request.session)
+    )
+    if bundled is not None:
+        event, fit = bundled.event, bundled.fit
+        total_laps = request.total_laps or bundled.total_laps
+    else:
+        # Load session
+        client = FastF1Client()
+        session = await admission.load_session(
+            client, request.year, request.race, request.session
         )
 
-    # Get total laps
-    total_laps = request.total_laps or int(session.laps["LapNumber"].max())
+        if session is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Session not found: {request.year} {request.race} {request.session}",
+            )
+
+        event = session.event
+        total_laps = request.total_laps or session.total_laps
+
+        # Fit degradation and fuel model (once per session, shared by all workers)
+        fit = client.get_degradation_fit(session)
 
     # Get pit loss time
-    circuit_name = session.event.get("Location", "default")
+    circuit_name = event.get("Location", "default")
     pit_loss = request.pit_loss_seconds or PIT_LOSS.get(
         circuit_name, PIT_LOSS["default"]
     )
 
-    # Get stint data and fit degradation model
-    all_drivers = session.laps["Driver"].unique()
-    all_stints = {}
+    curves = fit["curves"]
+    model = DegradationModel(fit["fuel_effect_per_lap"])
+
+    if not curves:
+        raise HTTPException(
+            status_code=500, detail="Could not generate degradation curves"
+        )
+
+    # Simulate strategies
+    engine = StrategyEngine(model)
 
-    for driver in all_drivers:
-        stints = client.get_stint_data(session, driver)
-        if stints:
-            all_stints[driver] = stints
+    def simulate():
+        return engine.simulate_strategies(curves, total_laps, pit_loss, max_stops=2)
+
+    if bundled is not None:
+        strategies = bundled.strategies(total_laps, pit_loss) or simulate()
+    elif request.total_laps is None and request.pit_loss_seconds is None:
+        strategies = client.cache.get_result(
+            "strategies", f"{session.key}_{total_laps}_{pit_loss:g}", simulate
+        )
+    else:
+        # Only the defaults are cached: request parameters must not grow it
+        strategies = simulate()
+
+    if not strategies:
+        raise HTTPException(status_code=500, detail="Could not simulate strategies")
 
-    if not all_stints:
+    if request.bootstrap:
+        strategies = await admission.run_bootstrap(
+            request.bootstrap,
+            lambda: engine.strategy_intervals(
+                strategies,
+                client.get_degradation_bootstrap(session, request.bootstrap),
+                total_laps,
+                pit_loss,
+            ),
+        )
+
+    response.headers.update(cache_headers(etag, request.year))
+    return StrategyResponse(
+        race_name=event["EventName"],
+        year=request.year,
+        total_laps=total_laps,
+        pit_loss_seconds=pit_loss,
+        strategies=strategies,
+        fastest_strategy=strategies[0]["strategy_name"],
+    )
+
+
+async def _simulate_from_practice(
+    request: StrategyRequest, http_request: Request, response: Response
+) -> StrategyResponse:
+    """POST /api/strategy with source=practice."""
+    client = FastF1Client()
+    sessions = await _load_practice(client, request.year, request.race)
+    if not sessions:
         raise HTTPException(
-            status_code=500, detail="No stint data available for analysis"
+            status_code=404,
+            detail=f"No practice sessions found: {request.year} {request.race}",
         )
 
-    model = DegradationModel()
-    curves = model.analyze_race(all_stints)
+    # The fit changes as the weekend's sessions are run, so the ETag covers
+    # the sessions found
+    session_types = [session.session_type for session in sessions]
+    etag = session_etag("strategy", request, {"sessions": session_types})
+    cached = conditional_response(http_request, etag, request.year)
+    if cached is not None:
+        return cached
 
-    if not curves:
+    total_laps = request.total_laps or await _race_laps(client, request)
+    event = sessions[0].event
+    pit_loss = request.pit_loss_seconds or PIT_LOSS.get(
+        event.get("Location", "default"), PIT_LOSS["default"]
+    )
+
+    fit = client.get_practice_fit(sessions)
+    if not fit["curves"]:
         raise HTTPException(
-            status_code=500, detail="Could not generate degradation curves"
+            status_code=404,
+            detail=f"No long runs found in practice: {request.year} {request.race}",
         )
 
-    # Simulate strategies
-    engine = StrategyEngine(model)
-    strategies = engine.simulate_strategies(curves, total_laps, pit_loss, max_stops=2)
+    engine = StrategyEngine(DegradationModel(fit["fuel_effect_per_lap"]))
+
+    def simulate():
+        return engine.simulate_strategies(
+            fit["curves"], total_laps, pit_loss, max_stops=2
+        )
+
+    if request.total_laps is None and request.pit_loss_seconds is None:
+        sessions_key = "+".join(session.key for session in sessions)
+        strategies = client.cache.get_result(
+            "practice_strategies", f"{sessions_key}_{total_laps}_{pit_loss:g}", simulate
+        )
+    else:
+        # Only the defaults are cached: request parameters must not grow it
+        strategies = simulate()
 
     if not strategies:
         raise HTTPException(status_code=500, detail="Could not simulate strategies")
 
+    if request.bootstrap:
+        strategies = await admission.run_bootstrap(
+            request.bootstrap,
+            lambda: engine.strategy_intervals(
+                strategies,
+                client.get_practice_bootstrap(sessions, request.bootstrap),
+                total_laps,
+                pit_loss,
+            ),
+        )
+
+    response.headers.update(cache_headers(etag, request.year))
     return StrategyResponse(
-        race_name=session.event["EventName"],
+        race_name=event["EventName"],
         year=request.year,
         total_laps=total_laps,
         pit_loss_seconds=pit_loss,
         strategies=strategies,
         fastest_strategy=strategies[0]["strategy_name"],
+        source="practice",
+        sessions=session_types,
+        long_runs=fit["long_runs"],
+    )
+
+
+async def _load_practice(
+    client: FastF1Client, year: int, race: str
+) -> List[SessionData]:
+    """The event's practice and sprint sessions that exist, loaded concurrently."""
+    loaded = await asyncio.gather(
+        *(
+            admission.load_session(client, year, race, session_type)
+            for session_type in PRACTICE_SESSIONS
+        )
+    )
+    return [session for session in loaded if session is not None]
+
+
+async def _race_laps(client: FastF1Client, request: StrategyRequest) -> int:
+    """
+    Race distance for source=practice when total_laps is not given: from the
+    bundle or an already loaded race session. Before the race there is none.
+    """
+    bundled = bundle.find_session(request.year, request.race, "R")
+    if bundled is not None:
+        return bundled.total_laps
+    if client.cache.has_session(request.year, request.race, "R"):
+        race = await admission.load_session(client, request.year, request.race, "R")
+        if race is not None:
+            return race.total_laps
+    raise HTTPException(
+        status_code=400,
+        detail="total_laps is required with source=practice before the race",
+    )
+
+
+@router.get("", response_model=StrategyResponse)
+async def get_strategies(
+    http_request: Request, response: Response, request: StrategyRequest = Depends()
+):
+    """Cacheable GET form of POST /api/strategy, with query parameters."""
+    return await simulate_strategies(request, http_request, response)
+
+
+@router.post("/sensitivity", response_model=SensitivityResponse)
+async def analyze_sensitivity(request: SensitivityRequest):
+    """
+    How robust is the fastest strategy?
+
+    Sweeps pit loss, each compound's degradation rate and pace, and race
+    distance over the requested ranges, re-ranks every strategy at each
+    point and returns the break-even values where the fastest strategy
+    changes, with the sensitivity of predicted time to each parameter.
+    """
+    bundled = bundle.find_session(request.year, request.race, request.session)
+    if bundled is not None:
+        event, fit = bundled.event, bundled.fit
+        total_laps = request.total_laps or bundled.total_laps
+    else:
+        # Load session
+        client = FastF1Client()
+        session = await admission.load_session(
+            client, request.year, request.race, request.session
+        )
+
+        if session is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Session not found: {request.year} {request.race} {request.session}",
+            )
+
+        event = session.event
+        total_laps = request.total_laps or session.total_laps
+
+        # One fit per session; every sweep point reuses it
+        fit = client.get_degradation_fit(session)
+
+    circuit_name = event.get("Location", "default")
+    pit_loss = request.pit_loss_seconds or PIT_LOSS.get(
+        circuit_name, PIT_LOSS["default"]
+    )
+
+    if not fit["curves"]:
+        raise HTTPException(
+            status_code=500, detail="Could not generate degradation curves"
+        )
+
+    engine = StrategyEngine(DegradationModel(fit["fuel_effect_per_lap"]))
+    analyzer = SensitivityAnalyzer(
+        engine, fit["curves"], total_laps, pit_loss, max_stops=request.max_stops
+    )
+    result = analyzer.analyze(
+        pit_loss_range=request.pit_loss_range,
+        degradation_range=request.degradation_range,
+        pace_range=request.pace_range,
+        laps_range=request.laps_range,
+        steps=request.steps,
+    )
+
+    return SensitivityResponse(
+        race_name=event["EventName"],
+        year=request.year,
+        total_laps=total_laps,
+        pit_loss_seconds=pit_loss,
+        **result,
     )
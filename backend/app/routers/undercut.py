@@ -0,0 +1,79 @@
+"""
+Undercut / overcut analysis API endpoint.
+"""
+from app.models.schemas import UndercutRequest, UndercutResponse
+from app.services.fastf1_client import FastF1Client
+from app.services.undercut_engine import UndercutEngine
+from app.utils import admission
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter(prefix="/api/undercut", tags=["undercut"])
+
+
+@router.post("", response_model=UndercutResponse)
+async def analyze_undercuts(request: UndercutRequest):
+    """
+    Find driver pairs where pitting first (undercut) or later (overcut)
+    gains track position.
+
+    Every pair and every candidate pit lap over the next `horizon` laps is
+    evaluated with the race's fitted degradation curves. The field is read
+    from the session at `lap`, or taken from `drivers` for what-if analysis.
+    """
+    # Load session
+    client = FastF1Client()
+    session = await admission.load_session(
+        client, request.year, request.race, request.session
+    )
+
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session not found: {request.year} {request.race} {request.session}",
+        )
+
+    total_laps = session.total_laps
+    lap = request.lap or total_laps // 2
+    if lap >= total_laps:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lap {lap} is not before the last lap ({total_laps})",
+        )
+
+    # Degradation curves (once per session, shared by all workers)
+    fit = client.get_degradation_fit(session)
+    if not fit["curves"]:
+        raise HTTPException(
+            status_code=500, detail="Could not generate degradation curves"
+        )
+
+    engine = UndercutEngine(fit["curves"])
+    if request.drivers:
+        drivers = [state.model_dump() for state in request.drivers]
+        unknown = {d["compound"] for d in drivers} - set(engine.compounds)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No degradation curve for compounds: {sorted(unknown)}",
+            )
+    else:
+        drivers = engine.field_at_lap(session, lap, fit["fuel_effect_per_lap"])
+
+    result = engine.analyze(
+        drivers,
+        lap,
+        remaining_laps=total_laps - lap,
+        horizon=request.horizon,
+        response_lag=request.response_lag,
+    )
+
+    return UndercutResponse(
+        race_name=session.event["EventName"],
+        year=request.year,
+        lap=lap,
+        horizon=request.horizon,
+        response_lag=request.response_lag,
+        drivers=drivers,
+        undercuts=result["undercuts"],
+        overcuts=result["overcuts"],
+    )
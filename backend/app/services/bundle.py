@@ -0,0 +1,291 @@
+"""
+Precompiled, read-only analysis bundle.
+
+For a fixed set of historical sessions, build_bundle.py runs stint
+extraction, the degradation fit and the default strategy simulation once
+and writes everything to a single file:
+
+    header      magic "F1BUNDLE", format version, index length (24 bytes)
+    index       JSON: schedules, and per session its event, total laps,
+                degradation fit, default strategies and array layout
+    arrays      raw stint columns, each aligned to ALIGN bytes
+
+With ANALYSIS_BUNDLE set, the routers answer requests for bundled sessions
+from it: opening it reads only the header and index, and the arrays are
+memory-mapped, so startup is fast, memory stays small and FastF1 (with
+pandas) is never imported for them. Sessions missing from the bundle fall
+back to live computation, unless BUNDLE_FALLBACK is off.
+"""
+import json
+import os
+import struct
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from app.config import ANALYSIS_BUNDLE, PIT_LOSS
+from app.services.data_sources import match_event
+from app.services.degradation_model import DegradationModel
+from app.services.fastf1_client import FastF1Client
+from app.services.session_data import SessionData, session_key
+from app.services.shared_cache import RESULTS_VERSION
+from app.services.strategy_engine import StrategyEngine
+from app.utils import metrics
+
+MAGIC = b"F1BUNDLE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQ")  # magic, format version, reserved, index length
+ALIGN = 64  # byte alignment of every array
+
+# Strategies are precomputed for the default race distance and pit loss,
+# with the same stop limit as POST /api/strategy
+MAX_STOPS = 2
+
+
+class BundleError(ValueError):
+    """The file is not a bundle this code can read."""
+
+
+class BundledSession:
+    """One session's precomputed analysis, as stored in a bundle."""
+
+    __slots__ = (
+        "key",
+        "year",
+        "session_type",
+        "event",
+        "total_laps",
+        "fit",
+        "_entry",
+        "_data",
+    )
+
+    def __init__(self, key: str, entry: Dict, data: np.ndarray):
+        self.key = key
+        self.year = entry["year"]
+        self.session_type = entry["session_type"]
+        self.event = entry["event"]
+        self.total_laps = entry["total_laps"]
+        self.fit = entry["fit"]
+        self._entry = entry
+        self._data = data
+
+    def strategies(self, total_laps: int, pit_loss: float) -> Optional[List[Dict]]:
+        """Ranked strategies, if precomputed for this distance and pit loss."""
+        return self._entry["strategies"].get(_strategy_key(total_laps, pit_loss))
+
+    def stint_columns(self) -> Dict[str, np.ndarray]:
+        """Stint columns as FastF1Client.get_stint_columns (memory-mapped)."""
+        columns = {}
+        for name, layout in self._entry["arrays"]["stints"].items():
+            dtype = np.dtype(layout["dtype"])
+            start = layout["offset"]
+            end = start + dtype.itemsize * layout["length"]
+            columns[name] = self._data[start:end].view(dtype)
+        return columns
+
+
+class AnalysisBundle:
+    """Read-only view of a bundle file."""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Bundle written by BundleWriter
+
+        Raises:
+            BundleError: Not a bundle, or written by an incompatible version
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise BundleError(f"Not an analysis bundle: {self.path}")
+            magic, version, _, index_length = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise BundleError(f"Not an analysis bundle: {self.path}")
+            if version != FORMAT_VERSION:
+                raise BundleError(
+                    f"Bundle format {version} is not supported (expected "
+                    f"{FORMAT_VERSION}), rebuild {self.path}"
+                )
+            self.index = json.loads(f.read(index_length))
+
+        if self.index["results_version"] != RESULTS_VERSION:
+            raise BundleError(
+                f"Bundle results are version {self.index['results_version']} "
+                f"(expected {RESULTS_VERSION}), rebuild {self.path}"
+            )
+
+        data_offset = _aligned(HEADER.size + index_length)
+        if self.path.stat().st_size > data_offset:
+            self._data = np.memmap(
+                self.path, dtype=np.uint8, mode="r", offset=data_offset
+            )
+        else:
+            self._data = np.empty(0, dtype=np.uint8)
+        self._sessions: Dict[str, BundledSession] = {}
+
+    def __len__(self) -> int:
+        return len(self.index["sessions"])
+
+    def get_schedule(self, year: int) -> Optional[List[Dict]]:
+        """Schedule of a season, if the bundle has sessions from it."""
+        return self.index["schedules"].get(str(year))
+
+    def find(
+        self, year: int, race_name: str, session_type: str = "R"
+    ) -> Optional[BundledSession]:
+        """
+        Look up a session as the data sources do: by circuit, event name,
+        country or round number.
+        """
+        event = match_event(self.get_schedule(year) or [], race_name)
+        name = event["race_name"] if event else str(race_name)
+        key = session_key(year, name, session_type)
+
+        entry = self.index["sessions"].get(key)
+        metrics.inc(
+            "f1_cache_requests_total",
+            cache="bundle",
+            result="miss" if entry is None else "hit",
+        )
+        if entry is None:
+            return None
+        if key not in self._sessions:
+            self._sessions[key] = BundledSession(key, entry, self._data)
+        return self._sessions[key]
+
+    def stats(self) -> Dict:
+        return {
+            "path": str(self.path),
+            "size_bytes": self.path.stat().st_size,
+            "format_version": FORMAT_VERSION,
+            "created": self.index["created"],
+            "source": self.index["source"],
+            "sessions": sorted(self.index["sessions"]),
+        }
+
+
+class BundleWriter:
+    """Precomputes sessions' analyses and writes them as one bundle."""
+
+    def __init__(self, client: FastF1Client):
+        """
+        Args:
+            client: Client over the data source to read sessions from
+        """
+        self.client = client
+        self.schedules: Dict[str, List[Dict]] = {}
+        self.sessions: Dict[str, Dict] = {}
+        self._arrays: Dict[str, Dict[str, Dict[str, np.ndarray]]] = {}
+
+    def add_schedule(self, year: int, schedule: List[Dict]) -> None:
+        self.schedules[str(year)] = schedule
+
+    def add_session(self, session: SessionData) -> Dict:
+        """
+        Run stint extraction, the degradation fit and the default strategy
+        simulation for a session, as the live endpoints do.
+
+        Returns:
+            The session's index entry
+        """
+        fit = self.client.get_degradation_fit(session)
+        total_laps = session.total_laps
+        pit_loss = PIT_LOSS.get(
+            session.event.get("Location", "default"), PIT_LOSS["default"]
+        )
+
+        strategies = {}
+        if fit["curves"]:
+            engine = StrategyEngine(DegradationModel(fit["fuel_effect_per_lap"]))
+            key = _strategy_key(total_laps, pit_loss)
+            strategies[key] = engine.simulate_strategies(
+                fit["curves"], total_laps, pit_loss, max_stops=MAX_STOPS
+            )
+
+        entry = {
+            "year": session.year,
+            "session_type": session.session_type,
+            "event": session.event,
+            "total_laps": total_laps,
+            "fit": fit,
+            "strategies": strategies,
+        }
+        self.sessions[session.key] = entry
+        self._arrays[session.key] = {"stints": self.client.get_stint_columns(session)}
+        return entry
+
+    def write(self, path: Path) -> int:
+        """
+        Write the bundle atomically.
+
+        Returns:
+            Size of the file in bytes
+        """
+        blocks, offset = [], 0
+        for key, groups in self._arrays.items():
+            layouts = self.sessions[key]["arrays"] = {}
+            for group, columns in groups.items():
+                layouts[group] = {}
+                for name, values in columns.items():
+                    values = np.ascontiguousarray(values)
+                    if values.dtype.hasobject:
+                        raise TypeError(f"Cannot bundle object array {key}/{name}")
+                    layouts[group][name] = {
+                        "dtype": values.dtype.str,
+                        "length": len(values),
+                        "offset": offset,
+                    }
+                    blocks.append((offset, values))
+                    offset = _aligned(offset + values.nbytes)
+
+        index = json.dumps(
+            {
+                "results_version": RESULTS_VERSION,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "source": self.client.source.name,
+                "schedules": self.schedules,
+                "sessions": self.sessions,
+            },
+            separators=(",", ":"),
+        ).encode()
+        data_offset = _aligned(HEADER.size + len(index))
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(index)))
+            f.write(index)
+            for block_offset, values in blocks:
+                f.seek(data_offset + block_offset)
+                f.write(values.tobytes())
+        os.replace(tmp_path, path)
+        return path.stat().st_size
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _strategy_key(total_laps: int, pit_loss: float) -> str:
+    return f"{total_laps}_{pit_loss:g}"
+
+
+@lru_cache(maxsize=1)
+def get_bundle() -> Optional[AnalysisBundle]:
+    """The bundle at ANALYSIS_BUNDLE (opened once per process), if set."""
+    return AnalysisBundle(Path(ANALYSIS_BUNDLE)) if ANALYSIS_BUNDLE else None
+
+
+def find_session(
+    year: int, race_name: str, session_type: str = "R"
+) -> Optional[BundledSession]:
+    """A session from the configured bundle, or None (no bundle or not in it)."""
+    bundle = get_bundle()
+    return bundle.find(year, race_name, session_type) if bundle else None
@@ -0,0 +1,644 @@
+"""
+Pluggable session data sources.
+
+FastF1Client reads sessions through a DataSource selected by the
+DATA_SOURCE setting:
+
+- "fastf1":    the FastF1 livetiming API (with its disk cache)
+- "local":     pre-exported lap tables (.npz or .parquet) under LOCAL_DATA_DIR,
+               for air-gapped environments, load tests and benchmarks
+- "synthetic": deterministic generated sessions, no files or network needed
+
+All sources return SessionData, so the analysis services do not care where
+the laps came from. Only FastF1DataSource imports fastf1.
+"""
+import gc
+import json
+import os
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from app.config import DATA_SOURCE, FASTF1_CACHE_DIR, LOCAL_DATA_DIR
+from app.services.fastf1_cache import FastF1DiskCache
+from app.services.session_data import LAP_COLUMNS, LapTable, SessionData, slugify
+from app.utils import metrics
+
+
+class DataSource(ABC):
+    """Interface implemented by every session data source."""
+
+    name = "base"
+
+    # Used by admission control: memory the libraries a load imports take
+    # once imported, and the peak one load adds on top of that
+    IMPORT_MEMORY_BYTES = 0
+    LOAD_MEMORY_BYTES = 50 * 1024 * 1024
+
+    @abstractmethod
+    def load_session(
+        self, year: int, race_name: Union[str, int], session_type: str = "R"
+    ) -> Optional[SessionData]:
+        """
+        Load one session.
+
+        Args:
+            year: Season
+            race_name: Circuit ("Monza"), event name ("Italian Grand Prix")
+                       or round number
+            session_type: R, Q, FP1, FP2, FP3, S
+
+        Returns:
+            SessionData, or None if the session is not available
+        """
+
+    @abstractmethod
+    def get_schedule(self, year: int) -> List[Dict]:
+        """
+        Race weekends of a season.
+
+        Returns:
+            List of dicts with round_number, race_name, circuit_name, country
+            and date
+        """
+
+
+def match_event(schedule: List[Dict], race_name: Union[str, int]) -> Optional[Dict]:
+    """Find an event by round number, event name, circuit or country."""
+    name = str(race_name).strip()
+    if name.isdigit():
+        return next((e for e in schedule if e["round_number"] == int(name)), None)
+
+    wanted = name.lower()
+    for field in ("race_name", "circuit_name", "country"):
+        for event in schedule:
+            if str(event[field]).lower() == wanted:
+                return event
+
+    wanted_slug = slugify(name)
+    return next((e for e in schedule if wanted_slug in slugify(e["race_name"])), None)
+
+
+def _event_metadata(event: Dict) -> Dict:
+    return {
+        "EventName": event["race_name"],
+        "Location": event["circuit_name"],
+        "Country": event["country"],
+        "RoundNumber": event["round_number"],
+        "EventDate": event["date"],
+    }
+
+
+# ============================================================================
+# FastF1
+# ============================================================================
+
+
+class FastF1DataSource(DataSource):
+    """Sessions from the FastF1 livetiming API."""
+
+    name = "fastf1"
+
+    # Importing fastf1 and pandas takes the process from ~59MB to ~107MB;
+    # session.load(laps=True, telemetry=False) then peaks at ~200-300MB
+    # in total
+    IMPORT_MEMORY_BYTES = 48 * 1024 * 1024
+    LOAD_MEMORY_BYTES = 200 * 1024 * 1024
+
+    def __init__(self):
+        self.disk_cache = FastF1DiskCache()
+        self._fastf1 = None
+
+    def _import_fastf1(self):
+        """
+        fastf1 (and pandas with it) is imported on first use rather than at
+        module load or construction, so the API can start, answer health
+        checks and serve bundled sessions without it.
+        """
+        if self._fastf1 is None:
+            import fastf1
+
+            # CRITICAL: Enable cache BEFORE any session loads
+            fastf1.Cache.enable_cache(FASTF1_CACHE_DIR)
+            self._fastf1 = fastf1
+        return self._fastf1
+
+    def load_session(
+        self, year: int, race_name: Union[str, int], session_type: str = "R"
+    ) -> Optional[SessionData]:
+        """
+        Load a session with memory-efficient settings.
+
+        Note:
+            First load can take 30-60 seconds as data is downloaded.
+            Subsequent loads are faster due to caching.
+            Memory-optimized to load only laps data (not full telemetry).
+        """
+        fastf1 = self._import_fastf1()
+
+        try:
+            session = fastf1.get_session(year, race_name, session_type)
+            cached = self._is_cached(session)
+            metrics.inc(
+                "f1_cache_requests_total",
+                cache="fastf1",
+                result="hit" if cached else "miss",
+            )
+            # MEMORY OPTIMIZATION: Only load laps, not full telemetry
+            # This reduces memory usage from ~1200MB to ~200-300MB
+            session.load(laps=True, telemetry=False, weather=False, messages=False)
+
+            # Keep the disk cache within its budget (never evicting this one)
+            self.disk_cache.record_access(session.api_path, hit=cached)
+            self.disk_cache.enforce(
+                keep=[self.disk_cache.session_path(session.api_path)]
+            )
+
+            session_data = SessionData(
+                year=year,
+                session_type=session_type,
+                event={
+                    "EventName": str(session.event["EventName"]),
+                    "Location": str(session.event.get("Location", "default")),
+                    "Country": str(session.event.get("Country", "Unknown")),
+                    "RoundNumber": int(session.event["RoundNumber"]),
+                    "EventDate": str(session.event["EventDate"]),
+                },
+                laps=self._lap_table(session.laps),
+                api_path=session.api_path,
+            )
+
+            # Force garbage collection after loading to free memory
+            del session
+            gc.collect()
+
+            return session_data
+        except Exception as e:
+            print(f"Error loading session {year} {race_name} {session_type}: {e}")
+            return None
+
+    @staticmethod
+    def _lap_table(laps) -> LapTable:
+        """
+        Convert a FastF1 Laps frame into a LapTable.
+
+        Only the columns in LAP_COLUMNS are read, and each becomes a new typed
+        array (no views into the frame), so the Session and its full frame
+        can be freed as soon as this returns.
+        """
+
+        def seconds(column: str) -> np.ndarray:
+            return laps[column].dt.total_seconds().to_numpy(dtype=np.float64)
+
+        return LapTable(
+            {
+                "driver": laps["Driver"].astype(str).to_numpy(),
+                "driver_number": laps["DriverNumber"].astype(str).to_numpy(),
+                "lap_number": laps["LapNumber"].to_numpy(),
+                "lap_time": seconds("LapTime"),
+                "compound": laps["Compound"].fillna("UNKNOWN").astype(str).to_numpy(),
+                "tyre_life": laps["TyreLife"].to_numpy(dtype=np.float32),
+                "stint": laps["Stint"].to_numpy(dtype=np.float32),
+                "position": laps["Position"].to_numpy(dtype=np.float32),
+                "pit_in": laps["PitInTime"].notna().to_numpy(),
+                "pit_out": laps["PitOutTime"].notna().to_numpy(),
+                "is_personal_best": laps["IsPersonalBest"]
+                .fillna(False)
+                .astype(bool)
+                .to_numpy(),
+                "lap_start_time": seconds("LapStartTime"),
+                "lap_end_time": seconds("Time"),
+            }
+        )
+
+    @staticmethod
+    def _is_cached(session) -> bool:
+        """Check whether FastF1 already has API data for this session on disk."""
+        # FastF1 mirrors the API path below the cache dir, minus '/static/'
+        session_dir = os.path.join(FASTF1_CACHE_DIR, session.api_path[8:])
+        try:
+            return any(name.endswith(".ff1pkl") for name in os.listdir(session_dir))
+        except OSError:
+            return False
+
+    def get_schedule(self, year: int) -> List[Dict]:
+        schedule = self._import_fastf1().get_event_schedule(year)
+
+        events = []
+        for _, event in schedule.iterrows():
+            # Only include actual race events (skip testing)
+            if event.get("EventFormat") != "testing":
+                events.append(
+                    {
+                        "round_number": int(event["RoundNumber"]),
+                        "race_name": event["EventName"],
+                        "circuit_name": event.get("Location", "Unknown"),
+                        "country": event.get("Country", "Unknown"),
+                        "date": str(event["EventDate"]),
+                    }
+                )
+        return events
+
+
+# ============================================================================
+# Local lap files
+# ============================================================================
+
+
+class LocalDataSource(DataSource):
+    """
+    Sessions from pre-exported lap tables on disk.
+
+    Layout (written by export_sessions.py):
+        <root>/<year>/schedule.json
+        <root>/<year>/<event-slug>/<session>.npz      (or .parquet)
+
+    .npz files need only NumPy; .parquet files need pandas and pyarrow.
+    """
+
+    name = "local"
+
+    # pandas, imported for .parquet files
+    IMPORT_MEMORY_BYTES = 34 * 1024 * 1024
+
+    def __init__(self, root: Path = LOCAL_DATA_DIR):
+        self.root = Path(root)
+
+    def get_schedule(self, year: int) -> List[Dict]:
+        path = self.root / str(year) / "schedule.json"
+        if not path.exists():
+            return []
+        return json.loads(path.read_text())
+
+    def session_path(self, year: int, event_name: str, session_type: str) -> Path:
+        return self.root / str(year) / slugify(event_name) / session_type.upper()
+
+    def load_session(
+        self, year: int, race_name: Union[str, int], session_type: str = "R"
+    ) -> Optional[SessionData]:
+        event = match_event(self.get_schedule(year), race_name)
+        if event is None:
+            return None
+
+        base = self.session_path(year, event["race_name"], session_type)
+        try:
+            if base.with_suffix(".npz").exists():
+                return SessionData.load_npz(base.with_suffix(".npz"))
+            if base.with_suffix(".parquet").exists():
+                return self._load_parquet(base.with_suffix(".parquet"), year, event)
+        except Exception as e:
+            print(f"Error loading local session {base}: {e}")
+        return None
+
+    def _load_parquet(self, path: Path, year: int, event: Dict) -> SessionData:
+        import pandas as pd
+
+        frame = pd.read_parquet(path, columns=list(LAP_COLUMNS))
+        laps = LapTable({name: frame[name].to_numpy() for name in LAP_COLUMNS})
+        return SessionData(year, path.stem, _event_metadata(event), laps)
+
+    def write_schedule(self, year: int, schedule: List[Dict]) -> None:
+        path = self.root / str(year) / "schedule.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(schedule, indent=2))
+
+    def write_session(self, session: SessionData, file_format: str = "npz") -> Path:
+        """Write a session in the local layout and return the file path."""
+        base = self.session_path(
+            session.year, session.event["EventName"], session.session_type
+        )
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        if file_format == "parquet":
+            import pandas as pd
+
+            path = base.with_suffix(".parquet")
+            pd.DataFrame(session.laps.columns).to_parquet(path, index=False)
+        else:
+            path = base.with_suffix(".npz")
+            session.save_npz(path)
+        return path
+
+
+# ============================================================================
+# Synthetic
+# ============================================================================
+
+SYNTHETIC_DRIVERS = [
+    ("VER", "1"), ("PER", "11"), ("HAM", "44"), ("RUS", "63"), ("LEC", "16"),
+    ("SAI", "55"), ("NOR", "4"), ("PIA", "81"), ("ALO", "14"), ("STR", "18"),
+    ("OCO", "31"), ("GAS", "10"), ("ALB", "23"), ("SAR", "2"), ("BOT", "77"),
+    ("ZHO", "24"), ("MAG", "20"), ("HUL", "27"), ("TSU", "22"), ("RIC", "3"),
+]  # fmt: skip
+
+# (event name, location, country, race laps)
+SYNTHETIC_CALENDAR = [
+    ("Bahrain Grand Prix", "Sakhir", "Bahrain", 57),
+    ("Saudi Arabian Grand Prix", "Jeddah", "Saudi Arabia", 50),
+    ("Australian Grand Prix", "Melbourne", "Australia", 58),
+    ("Azerbaijan Grand Prix", "Baku", "Azerbaijan", 51),
+    ("Miami Grand Prix", "Miami", "United States", 57),
+    ("Monaco Grand Prix", "Monaco", "Monaco", 78),
+    ("Spanish Grand Prix", "Barcelona", "Spain", 66),
+    ("Canadian Grand Prix", "Montréal", "Canada", 70),
+    ("Austrian Grand Prix", "Spielberg", "Austria", 71),
+    ("British Grand Prix", "Silverstone", "Great Britain", 52),
+    ("Hungarian Grand Prix", "Budapest", "Hungary", 70),
+    ("Belgian Grand Prix", "Spa", "Belgium", 44),
+    ("Dutch Grand Prix", "Zandvoort", "Netherlands", 72),
+    ("Italian Grand Prix", "Monza", "Italy", 51),
+    ("Singapore Grand Prix", "Marina Bay", "Singapore", 62),
+    ("Japanese Grand Prix", "Suzuka", "Japan", 53),
+    ("Qatar Grand Prix", "Lusail", "Qatar", 57),
+    ("United States Grand Prix", "Austin", "United States", 56),
+    ("Mexico City Grand Prix", "Mexico City", "Mexico", 71),
+    ("São Paulo Grand Prix", "São Paulo", "Brazil", 71),
+    ("Las Vegas Grand Prix", "Las Vegas", "United States", 50),
+    ("Abu Dhabi Grand Prix", "Yas Island", "United Arab Emirates", 58),
+]
+
+# Compound pace offset (s), linear and quadratic wear terms (s/lap, s/lap²)
+SYNTHETIC_COMPOUNDS = {
+    "SOFT": (-0.6, 0.060, 0.0020),
+    "MEDIUM": (0.0, 0.035, 0.0010),
+    "HARD": (0.45, 0.020, 0.0005),
+}
+
+
+class SyntheticDataSource(DataSource):
+    """
+    Deterministic generated sessions.
+
+    Each (year, event, session) is seeded from its name, so repeated loads
+    return identical laps. Races follow 1-2 stop strategies with quadratic
+    tyre wear, fuel burn, pit stops and the occasional retirement; practice
+    and qualifying sessions consist of short push runs and (in practice)
+    longer race-simulation runs.
+    """
+
+    name = "synthetic"
+
+    SESSION_START = 3600.0  # session time (s) at which running starts
+    PIT_LOSS = 22.0
+
+    def get_schedule(self, year: int) -> List[Dict]:
+        first_race = date(year, 3, 5)
+        return [
+            {
+                "round_number": round_number,
+                "race_name": name,
+                "circuit_name": location,
+                "country": country,
+                "date": str(first_race + timedelta(days=14 * (round_number - 1))),
+            }
+            for round_number, (name, location, country, _) in enumerate(
+                SYNTHETIC_CALENDAR, 1
+            )
+        ]
+
+    def load_session(
+        self, year: int, race_name: Union[str, int], session_type: str = "R"
+    ) -> Optional[SessionData]:
+        event = match_event(self.get_schedule(year), race_name)
+        if event is None:
+            return None
+
+        session_type = session_type.upper()
+        seed = zlib.crc32(f"{year}|{event['race_name']}|{session_type}".encode())
+        rng = np.random.default_rng(seed)
+        race_laps = SYNTHETIC_CALENDAR[event["round_number"] - 1][3]
+        # Circuit pace depends only on the event, not the session
+        base_time = 72.0 + zlib.crc32(event["race_name"].encode()) % 2500 / 100
+
+        if session_type == "R":
+            columns = self._race(rng, race_laps, base_time, stops=True)
+        elif session_type == "S":
+            columns = self._race(rng, race_laps // 3, base_time, stops=False)
+        else:
+            columns = self._runs(
+                rng, base_time, long_runs=session_type.startswith("FP")
+            )
+
+        return SessionData(
+            year, session_type, _event_metadata(event), LapTable(columns)
+        )
+
+    def _race(
+        self, rng: np.random.Generator, total_laps: int, base_time: float, stops: bool
+    ) -> Dict[str, np.ndarray]:
+        """Generate a race: drivers × laps arrays, flattened driver by driver."""
+        n_drivers = len(SYNTHETIC_DRIVERS)
+        lap = np.arange(1, total_laps + 1)
+        pace = np.sort(rng.normal(0.0, 0.45, n_drivers))
+        fuel_effect = rng.uniform(0.045, 0.07)
+
+        # Strategy: pit laps (padded past the flag) and compound per stint
+        n_stops = rng.choice([1, 2], p=[0.6, 0.4], size=n_drivers) if stops else None
+        pit_laps = np.full((n_drivers, 2), total_laps + 10)
+        compounds = np.empty((n_drivers, 3), dtype="U16")
+        for d in range(n_drivers):
+            compounds[d, 0] = rng.choice(["SOFT", "MEDIUM"])
+            compounds[d, 1:] = rng.choice(["MEDIUM", "HARD"], size=2)
+            if n_stops is None:
+                continue
+            if n_stops[d] == 1:
+                pit_laps[d, 0] = rng.integers(
+                    int(0.3 * total_laps), int(0.6 * total_laps)
+                )
+            else:
+                pit_laps[d, 0] = rng.integers(
+                    int(0.2 * total_laps), int(0.4 * total_laps)
+                )
+                pit_laps[d, 1] = rng.integers(
+                    int(0.55 * total_laps), int(0.75 * total_laps)
+                )
+            if compounds[d, 1] == compounds[d, 0]:
+                compounds[d, 1] = "HARD"
+
+        stint_idx = (pit_laps[:, :, None] < lap[None, None, :]).sum(axis=1)
+        stint_start = np.concatenate(
+            [np.ones((n_drivers, 1), int), pit_laps + 1], axis=1
+        )
+        tyre_life = lap - np.take_along_axis(stint_start, stint_idx, axis=1) + 1
+        compound = np.take_along_axis(compounds, stint_idx, axis=1)
+
+        params = np.array([SYNTHETIC_COMPOUNDS[c] for c in compound.ravel()])
+        offset, linear, quadratic = params.T.reshape(3, n_drivers, total_laps)
+        lap_time = (
+            base_time
+            + pace[:, None]
+            + offset
+            + linear * tyre_life
+            + quadratic * tyre_life**2
+            - fuel_effect * lap
+            + rng.normal(0.0, 0.2, (n_drivers, total_laps))
+        )
+
+        pit_in = (lap[None, None, :] == pit_laps[:, :, None]).any(axis=1)
+        pit_out = (lap[None, None, :] == pit_laps[:, :, None] + 1).any(axis=1)
+        lap_time[:, 0] += 5.0  # standing start
+        lap_time += pit_in * 4.0 + pit_out * (self.PIT_LOSS - 4.0)
+
+        # Occasionally one car retires
+        running = np.ones((n_drivers, total_laps), dtype=bool)
+        if rng.random() < 0.5:
+            running[
+                rng.integers(1, n_drivers), rng.integers(5, total_laps - 5) :
+            ] = False
+
+        elapsed = np.cumsum(lap_time, axis=1)
+        order = np.argsort(np.where(running, elapsed, np.inf), axis=0)
+        position = np.empty((n_drivers, total_laps), dtype=np.float32)
+        np.put_along_axis(
+            position, order, np.arange(1, n_drivers + 1, dtype=np.float32)[:, None], 0
+        )
+        position[~running] = np.nan
+
+        clean = ~(pit_in | pit_out) & (lap > 1)
+        best_so_far = np.minimum.accumulate(np.where(clean, lap_time, np.inf), axis=1)
+        lap_end = self.SESSION_START + elapsed
+
+        return self._flatten(
+            running,
+            {
+                "lap_number": np.broadcast_to(lap, running.shape),
+                "lap_time": lap_time,
+                "compound": compound,
+                "tyre_life": tyre_life,
+                "stint": stint_idx + 1,
+                "position": position,
+                "pit_in": pit_in,
+                "pit_out": pit_out,
+                "is_personal_best": clean & (lap_time <= best_so_far),
+                "lap_start_time": lap_end - lap_time,
+                "lap_end_time": lap_end,
+            },
+        )
+
+    def _runs(
+        self, rng: np.random.Generator, base_time: float, long_runs: bool
+    ) -> Dict[str, np.ndarray]:
+        """
+        Generate a practice or qualifying session as runs per driver.
+
+        A run is an out-lap, some timed laps on one set of tyres and an
+        in-lap. Short runs are low-fuel push laps; in practice each driver
+        also does one or two long race-simulation runs on high fuel, with an
+        occasional cool-down lap in the middle.
+        """
+        n_drivers = len(SYNTHETIC_DRIVERS)
+        pace = rng.normal(0.0, 0.45, n_drivers)
+        values = {
+            name: [] for name in LAP_COLUMNS if name not in ("driver", "driver_number")
+        }
+        driver_rows = []
+
+        for d in range(n_drivers):
+            clock = self.SESSION_START + rng.uniform(0, 600)
+            lap_number = 0
+            plan = ["short"] * int(rng.integers(2, 4))
+            if long_runs:
+                plan += ["long"] * int(rng.integers(1, 3))
+                rng.shuffle(plan)
+
+            best = np.inf
+            for stint, run in enumerate(plan, 1):
+                compound = rng.choice(list(SYNTHETIC_COMPOUNDS))
+                offset, linear, quadratic = SYNTHETIC_COMPOUNDS[compound]
+                timed_laps = (
+                    int(rng.integers(1, 4))
+                    if run == "short"
+                    else int(rng.integers(8, 16))
+                )
+                fuel_offset = -0.8 if run == "short" else 1.5
+                cool_down = (
+                    int(rng.integers(3, timed_laps - 2)) if run == "long" else -1
+                )
+
+                # Out-lap, timed laps, in-lap
+                for i in range(timed_laps + 2):
+                    tyre_life = i + 1
+                    lap_time = (
+                        base_time
+                        + pace[d]
+                        + offset
+                        + fuel_offset
+                        + linear * tyre_life
+                        + quadratic * tyre_life**2
+                        + rng.normal(0.0, 0.2)
+                    )
+                    is_out, is_in = i == 0, i == timed_laps + 1
+                    if is_out or is_in or i == cool_down:
+                        lap_time *= 1.12 if i == cool_down else 1.2
+                    lap_number += 1
+                    clean = not (is_out or is_in)
+                    is_pb = clean and lap_time < best
+                    best = min(best, lap_time) if clean else best
+
+                    for name, value in (
+                        ("lap_number", lap_number),
+                        ("lap_time", lap_time),
+                        ("compound", compound),
+                        ("tyre_life", tyre_life),
+                        ("stint", stint),
+                        ("position", np.nan),
+                        ("pit_in", is_in),
+                        ("pit_out", is_out),
+                        ("is_personal_best", is_pb),
+                        ("lap_start_time", clock),
+                        ("lap_end_time", clock + lap_time),
+                    ):
+                        values[name].append(value)
+                    driver_rows.append(d)
+                    clock += lap_time
+
+                clock += rng.uniform(300, 900)  # back in the garage
+
+        columns = {name: np.array(column) for name, column in values.items()}
+        driver_rows = np.array(driver_rows)
+        columns["driver"] = np.array([SYNTHETIC_DRIVERS[d][0] for d in driver_rows])
+        columns["driver_number"] = np.array(
+            [SYNTHETIC_DRIVERS[d][1] for d in driver_rows]
+        )
+        return columns
+
+    @staticmethod
+    def _flatten(
+        running: np.ndarray, matrices: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        """Flatten drivers × laps matrices into per-lap columns (driver-major)."""
+        columns = {name: values[running] for name, values in matrices.items()}
+        rows = np.nonzero(running)[0]
+        codes = np.array([code for code, _ in SYNTHETIC_DRIVERS])
+        numbers = np.array([number for _, number in SYNTHETIC_DRIVERS])
+        columns["driver"] = codes[rows]
+        columns["driver_number"] = numbers[rows]
+        return columns
+
+
+# ============================================================================
+# Factory
+# ============================================================================
+
+DATA_SOURCES = {
+    FastF1DataSource.name: FastF1DataSource,
+    LocalDataSource.name: LocalDataSource,
+    SyntheticDataSource.name: SyntheticDataSource,
+}
+
+_instances: Dict[str, DataSource] = {}
+
+
+def get_data_source(name: Optional[str] = None) -> DataSource:
+    """Return the (shared) data source instance for a name, DATA_SOURCE by default."""
+    name = (name or DATA_SOURCE).lower()
+    if name not in DATA_SOURCES:
+        raise ValueError(
+            f"Unknown data source '{name}', expected one of {sorted(DATA_SOURCES)}"
+        )
+    if name not in _instances:
+        _instances[name] = DATA_SOURCES[name]()
+    return _instances[name]
@@ -1,130 +1,424 @@
 """
 Tyre degradation modeling service.
 
-Uses polynomial regression to model lap time degradation as a function
-of tyre age, accounting for fuel load reduction.
+Fits tyre wear (quadratic in tyre age, per compound) and fuel burn (linear
+in lap number, per session) jointly as one linear least-squares problem.
+Many sessions can be fitted in a single batched solve.
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Union
 
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
-from sklearn.preprocessing import PolynomialFeatures
+from app.services.stints import StintTable
+from app.utils import metrics
 
 
 class DegradationModel:
     """
-    Models tyre degradation using polynomial regression.
-
-    Approach: lap_time = a*(tyre_life)² + b*(tyre_life) + c
-
-    The model:
-    1. Filters stints by compound
-    2. Corrects lap times for fuel load (lighter car = faster laps)
-    3. Fits 2nd-degree polynomial to (tyre_life, corrected_lap_time)
-    4. Returns coefficients and goodness-of-fit metrics
+    Models tyre degradation and fuel effect with a joint linear regression.
+
+    Approach: lap_time = a*(tyre_life)² + b*(tyre_life) + c - fuel*lap_number
+
+    with a, b, c per compound and one fuel term per session. The model:
+    1. Collects quick laps with their compound, tyre life and lap number
+    2. Builds the normal equations of the design matrix ([t², t, 1] columns
+       per compound, a shared -lap_number column) from grouped sums
+    3. Solves every session at once (stacked per-session matrices, one
+       batched pseudo-inverse)
+    4. Returns fuel-corrected coefficients, the session's fuel effect and
+       R² of each compound's curve on its fuel-corrected lap times
+
+    Lap number and tyre life move together within a stint, so the fuel term
+    is only identifiable from stints starting on different laps. A weak
+    prior pulls it to FUEL_EFFECT_PER_LAP when the data cannot separate them.
     """
 
+    DRY_COMPOUNDS = ("SOFT", "MEDIUM", "HARD")
+    WET_COMPOUNDS = ("INTERMEDIATE", "WET")
+    COMPOUNDS = DRY_COMPOUNDS + WET_COMPOUNDS
     FUEL_EFFECT_PER_LAP = 0.055  # seconds per lap (fuel burn makes car faster)
+    FUEL_PRIOR_WEIGHT = 50.0  # weight of the fuel prior in the normal equations
     MIN_LAPS_FOR_FITTING = 5  # Minimum laps needed to fit a curve
+    BOOTSTRAP_SEED = 0  # fixed, so cached bootstrap results are reproducible
+
+    def __init__(self, fuel_effect_per_lap: float = FUEL_EFFECT_PER_LAP):
+        """
+        Args:
+            fuel_effect_per_lap: Fuel effect used by predict_lap_time; set from
+                                 the fitted value after analyze_race
+        """
+        self.fuel_effect_per_lap = fuel_effect_per_lap
 
+    @metrics.timed("analyze_race")
     def analyze_race(
-        self, all_driver_stints: Dict[str, List[Dict]]
+        self, all_driver_stints: Union[StintTable, Dict[str, List[Dict]]]
     ) -> List[Dict[str, any]]:
         """
         Analyze degradation for all compounds across all drivers.
 
         Args:
-            all_driver_stints: Dict mapping driver code to list of stint objects
+            all_driver_stints: StintTable of one session (its lap buffer is
+                               fitted as is), or dict mapping driver code to
+                               list of stint objects
                                e.g., {"VER": [{stint1}, {stint2}], "HAM": [...]}
 
         Returns:
             List of degradation curves, one per compound with enough data
         """
-        # Aggregate all stints by compound
-        compound_data = {"SOFT": [], "MEDIUM": [], "HARD": []}
-
-        for driver_stints in all_driver_stints.values():
-            for stint in driver_stints:
-                compound = stint.get("compound")
-                if compound in compound_data:
-                    compound_data[compound].extend(stint.get("laps", []))
-
-        # Fit curves for each compound with sufficient data
-        curves = []
-        for compound, laps in compound_data.items():
-            if len(laps) >= self.MIN_LAPS_FOR_FITTING:
-                curve = self.fit_compound(laps, compound)
-                if curve:
-                    curves.append(curve)
+        if isinstance(all_driver_stints, StintTable):
+            fit = self.fit_session(all_driver_stints.laps)
+            self.fuel_effect_per_lap = fit["fuel_effect_per_lap"]
+            return fit["curves"]
+
+        rows = [
+            (
+                stint.get("compound"),
+                lap["tyre_life"],
+                lap["lap_number"],
+                lap["lap_time"],
+            )
+            for driver_stints in all_driver_stints.values()
+            for stint in driver_stints
+            for lap in stint.get("laps", [])
+            if lap.get("lap_time") and lap.get("tyre_life")
+        ]
+        if not rows:
+            return []
+
+        compound, tyre_life, lap_number, lap_time = zip(*rows)
+        fit = self.fit_session(
+            {
+                "compound": np.array(compound),
+                "tyre_life": np.array(tyre_life, dtype=np.float64),
+                "lap_number": np.array(lap_number, dtype=np.float64),
+                "lap_time": np.array(lap_time, dtype=np.float64),
+            }
+        )
+        self.fuel_effect_per_lap = fit["fuel_effect_per_lap"]
+        return fit["curves"]
+
+    def analyze_season(self, stints: StintTable) -> List[Dict]:
+        """
+        Fit every session of a (concatenated) StintTable in one batched
+        solve, on views of its lap buffer.
 
-        return curves
+        Returns:
+            One {"curves", "fuel_effect_per_lap"} dict per session, in
+            stints.sessions order
+        """
+        return self.fit_sessions(stints.session_laps())
 
-    def fit_compound(self, laps: List[Dict], compound: str) -> Optional[Dict[str, any]]:
+    def fit_session(self, laps: Dict[str, np.ndarray]) -> Dict[str, any]:
         """
-        Fit degradation curve for a single compound.
+        Fit one session.
 
         Args:
-            laps: List of lap objects with lap_time and tyre_life
-            compound: Compound name (SOFT, MEDIUM, HARD)
+            laps: Arrays "compound", "tyre_life", "lap_number" and "lap_time"
+                  (e.g. from FastF1Client.get_fit_laps)
 
         Returns:
-            Dictionary with coefficients and metrics, or None if fitting fails
+            Dictionary with "curves" and "fuel_effect_per_lap"
         """
-        # Extract and filter valid data points
-        tyre_lives = []
-        lap_times = []
+        return self.fit_sessions([laps])[0]
 
-        for i, lap in enumerate(laps):
-            if lap.get("lap_time") and lap.get("tyre_life"):
-                tyre_life = lap["tyre_life"]
-                lap_time = lap["lap_time"]
+    @metrics.timed("fit_degradation")
+    def fit_sessions(self, sessions: List[Dict[str, np.ndarray]]) -> List[Dict]:
+        """
+        Fit many sessions in one batched least-squares solve.
+
+        Args:
+            sessions: Per-session lap arrays, as for fit_session
 
-                # Apply fuel correction: earlier laps had more fuel
-                fuel_correction = i * self.FUEL_EFFECT_PER_LAP
-                corrected_time = lap_time + fuel_correction
+        Returns:
+            One {"curves", "fuel_effect_per_lap"} dict per session
+        """
+        n_sessions = len(sessions)
+        n_compounds = len(self.COMPOUNDS)
+        if n_sessions == 0:
+            return []
+
+        rows = self._fit_rows(sessions)
+        session_idx, group = rows["session"], rows["group"]
+        t, n, y = rows["tyre_life"], rows["lap_number"], rows["lap_time"]
+
+        # The design matrix has [t², t, 1] columns in each compound's block and
+        # -lap_number last. Its normal equations only need per-(session,
+        # compound) sums of powers of t and their products with n and y, so
+        # they are built from bincounts without materialising the matrix.
+        size = n_sessions * n_compounds
+        sample_size = np.bincount(group, minlength=size)
+        t_powers = [np.ones_like(t), t, t**2, t**3, t**4]
+
+        def group_sums(weights):
+            return np.stack(
+                [np.bincount(group, w, size) for w in weights], axis=-1
+            ).reshape(n_sessions, n_compounds, -1)
+
+        beta = self._solve(
+            group_sums(t_powers),  # Σt^p, p = 0..4
+            group_sums([n * t_powers[p] for p in (2, 1, 0)]),  # Σn·φ
+            group_sums([y * t_powers[p] for p in (2, 1, 0)]),  # Σy·φ
+            np.bincount(session_idx, n**2, n_sessions),
+            np.bincount(session_idx, n * y, n_sessions),
+        )
+
+        # Goodness of fit of each tyre curve on fuel-corrected lap times
+        fuel = beta[:, -1]
+        coefficients = beta[:, :-1].reshape(size, 3)[group]
+        corrected = y + fuel[session_idx] * n
+        residual = corrected - (
+            coefficients[:, 0] * t_powers[2]
+            + coefficients[:, 1] * t
+            + coefficients[:, 2]
+        )
+        mean = np.bincount(group, corrected, size) / np.maximum(sample_size, 1)
+        ss_res = np.bincount(group, residual**2, size)
+        ss_tot = np.bincount(group, (corrected - mean[group]) ** 2, size)
+
+        life_min = np.full(size, np.inf)
+        life_max = np.full(size, -np.inf)
+        np.minimum.at(life_min, group, t)
+        np.maximum.at(life_max, group, t)
+
+        results = []
+        for s in range(n_sessions):
+            curves = []
+            for k, name in enumerate(self.COMPOUNDS):
+                g = s * n_compounds + k
+                if sample_size[g] == 0:
+                    continue
+                a, b, c = beta[s, 3 * k : 3 * k + 3]
+                # Average degradation: derivative at midpoint of tyre life range
+                mid_life = (life_min[g] + life_max[g]) / 2
+                r2 = 1.0 - ss_res[g] / ss_tot[g] if ss_tot[g] > 0 else 0.0
+                curves.append(
+                    {
+                        "compound": name,
+                        "coefficients": [float(a), float(b), float(c)],
+                        "deg_per_lap": float(2 * a * mid_life + b),
+                        "r_squared": float(r2),
+                        "sample_size": int(sample_size[g]),
+                    }
+                )
+            fuel_effect = float(fuel[s]) if curves else self.FUEL_EFFECT_PER_LAP
+            results.append({"curves": curves, "fuel_effect_per_lap": fuel_effect})
+
+        return results
+
+    @metrics.timed("bootstrap_degradation")
+    def bootstrap(
+        self,
+        laps: Dict[str, np.ndarray],
+        n_samples: int = 1000,
+        seed: int = BOOTSTRAP_SEED,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Bootstrap the fit of one session by resampling whole stints.
 
-                tyre_lives.append(tyre_life)
-                lap_times.append(corrected_time)
+        Laps within a stint are correlated, so stints (not laps) are drawn
+        with replacement, separately within each compound so every fitted
+        compound appears in every sample. A resample is a vector of stint
+        counts; the normal equations are linear in those counts, so all
+        samples' equations come from one (samples × stints) @ (stints ×
+        moments) product per compound and are solved in one batched
+        pseudo-inverse instead of n_samples separate fits.
 
-        if len(tyre_lives) < self.MIN_LAPS_FOR_FITTING:
-            return None
+        Args:
+            laps: Arrays as for fit_session, plus "stint_id" identifying
+                  each lap's stint (e.g. from FastF1Client.get_fit_laps)
+            n_samples: Number of bootstrap samples
+            seed: Random seed, so repeated calls give the same samples
 
-        # Fit 2nd-degree polynomial
-        X = np.array(tyre_lives).reshape(-1, 1)
-        y = np.array(lap_times)
+        Returns:
+            Dictionary with "compounds", "coefficients" (samples × compounds
+            × [a, b, c]), "deg_per_lap" (samples × compounds, derivative at
+            the midpoint of the tyre life range as in fit_sessions), both NaN
+            for compounds without a fit, and "fuel_effect_per_lap" (samples)
+        """
+        n_compounds = len(self.COMPOUNDS)
+        rows = self._fit_rows([laps])
+        t, n, y = rows["tyre_life"], rows["lap_number"], rows["lap_time"]
+        _, stint = np.unique(
+            np.asarray(laps["stint_id"])[rows["keep"]], return_inverse=True
+        )
+        n_stints = int(stint.max()) + 1 if len(stint) else 0
+
+        # Per-stint moments: Σt^p (p = 0..4), Σn·φ, Σy·φ, Σn², Σn·y
+        t_powers = [np.ones_like(t), t, t**2, t**3, t**4]
+        weights = (
+            t_powers
+            + [n * t_powers[p] for p in (2, 1, 0)]
+            + [y * t_powers[p] for p in (2, 1, 0)]
+            + [n**2, n * y]
+        )
+        moments = np.stack([np.bincount(stint, w, n_stints) for w in weights], axis=1)
+        stint_compound = np.zeros(n_stints, dtype=int)
+        stint_compound[stint] = rows["compound"]
+
+        rng = np.random.default_rng(seed)
+        sums = np.zeros((n_samples, n_compounds, moments.shape[1]))
+        fitted = np.zeros(n_compounds, dtype=bool)
+        for k in range(n_compounds):
+            members = np.flatnonzero(stint_compound == k)
+            if len(members) == 0:
+                continue
+            fitted[k] = True
+            counts = rng.multinomial(
+                len(members), np.full(len(members), 1.0 / len(members)), size=n_samples
+            )
+            sums[:, k] = counts @ moments[members]
+
+        beta = self._solve(
+            sums[:, :, 0:5],
+            sums[:, :, 5:8],
+            sums[:, :, 8:11],
+            sums[:, :, 11].sum(axis=1),
+            sums[:, :, 12].sum(axis=1),
+        )
+        coefficients = beta[:, :-1].reshape(n_samples, n_compounds, 3)
+        coefficients[:, ~fitted] = np.nan
+
+        mid_life = np.full(n_compounds, np.nan)
+        for k in np.flatnonzero(fitted):
+            life = t[rows["compound"] == k]
+            mid_life[k] = (life.min() + life.max()) / 2
+        return {
+            "compounds": list(self.COMPOUNDS),
+            "coefficients": coefficients,
+            "deg_per_lap": 2 * coefficients[:, :, 0] * mid_life + coefficients[:, :, 1],
+            "fuel_effect_per_lap": beta[:, -1],
+        }
 
-        poly = PolynomialFeatures(degree=2)
-        X_poly = poly.fit_transform(X)
+    def curve_intervals(
+        self, curves: List[Dict], samples: Dict, confidence: float = 0.95
+    ) -> List[Dict]:
+        """
+        Add bootstrap percentile intervals to fitted curves.
 
-        model = LinearRegression()
-        model.fit(X_poly, y)
+        Args:
+            curves: Curves from fit_session
+            samples: Output of bootstrap for the same laps
+            confidence: Interval coverage
 
-        # Get predictions and calculate R²
-        y_pred = model.predict(X_poly)
-        r2 = r2_score(y, y_pred)
+        Returns:
+            Copies of the curves with "coefficients_ci" ([low, high] per
+            coefficient) and "deg_per_lap_ci"
+        """
+        tail = 50 * (1 - confidence)
+        coefficients = np.asarray(samples["coefficients"], dtype=float)
+        deg_per_lap = np.asarray(samples["deg_per_lap"], dtype=float)
+        with_ci = []
+        for curve in curves:
+            k = samples["compounds"].index(curve["compound"])
+            low, high = np.percentile(coefficients[:, k], [tail, 100 - tail], axis=0)
+            deg = np.percentile(deg_per_lap[:, k], [tail, 100 - tail])
+            with_ci.append(
+                {
+                    **curve,
+                    "coefficients_ci": [
+                        [float(lo), float(hi)] for lo, hi in zip(low, high)
+                    ],
+                    "deg_per_lap_ci": [float(deg[0]), float(deg[1])],
+                }
+            )
+        return with_ci
+
+    def _fit_rows(self, sessions: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        Concatenate the sessions' laps and keep those that enter the fit.
 
-        # Extract coefficients: [intercept, linear, quadratic]
-        # Note: sklearn PolynomialFeatures creates [1, x, x²]
-        coefficients = [
-            model.coef_[2],  # quadratic (a)
-            model.coef_[1],  # linear (b)
-            model.intercept_,  # intercept (c)
-        ]
+        Laps need a known compound, finite values, tyre life > 0 and at
+        least MIN_LAPS_FOR_FITTING laps for their (session, compound).
 
-        # Calculate average degradation per lap
-        # Use derivative at midpoint of tyre life range
-        mid_life = (max(tyre_lives) + min(tyre_lives)) / 2
-        deg_per_lap = 2 * coefficients[0] * mid_life + coefficients[1]
+        Returns:
+            Kept laps' "session", "compound" (index into COMPOUNDS), "group"
+            (session * len(COMPOUNDS) + compound), "tyre_life",
+            "lap_number" and "lap_time", and the "keep" mask over all laps
+        """
+        n_sessions = len(sessions)
+        n_compounds = len(self.COMPOUNDS)
+        session_idx = np.concatenate(
+            [np.full(len(s["lap_time"]), i) for i, s in enumerate(sessions)]
+        )
+        compound = np.concatenate([s["compound"] for s in sessions])
+        tyre_life = np.concatenate([s["tyre_life"] for s in sessions]).astype(float)
+        lap_number = np.concatenate([s["lap_number"] for s in sessions]).astype(float)
+        lap_time = np.concatenate([s["lap_time"] for s in sessions]).astype(float)
+
+        compound_idx = np.full(len(compound), -1)
+        for k, name in enumerate(self.COMPOUNDS):
+            compound_idx[compound == name] = k
+
+        valid = (
+            (compound_idx >= 0)
+            & np.isfinite(lap_time)
+            & np.isfinite(lap_number)
+            & np.isfinite(tyre_life)
+            & (tyre_life > 0)
+        )
+        group = session_idx * n_compounds + compound_idx
+        counts = np.bincount(group[valid], minlength=n_sessions * n_compounds)
+        keep = valid & (counts[np.where(valid, group, 0)] >= self.MIN_LAPS_FOR_FITTING)
 
         return {
-            "compound": compound,
-            "coefficients": coefficients,
-            "deg_per_lap": float(deg_per_lap),
-            "r_squared": float(r2),
-            "sample_size": len(tyre_lives),
+            "session": session_idx[keep],
+            "compound": compound_idx[keep],
+            "group": group[keep],
+            "tyre_life": tyre_life[keep],
+            "lap_number": lap_number[keep],
+            "lap_time": lap_time[keep],
+            "keep": keep,
         }
 
+    def _solve(
+        self,
+        power_sums: np.ndarray,
+        fuel_sums: np.ndarray,
+        target_sums: np.ndarray,
+        fuel_square: np.ndarray,
+        fuel_target: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Solve a batch of normal equations from their moment sums.
+
+        Args:
+            power_sums: Σt^p, p = 0..4 (batch × compounds × 5)
+            fuel_sums: Σn·φ for φ = (t², t, 1) (batch × compounds × 3)
+            target_sums: Σy·φ (batch × compounds × 3)
+            fuel_square: Σn² (batch)
+            fuel_target: Σn·y (batch)
+
+        Returns:
+            Coefficients (batch × [a, b, c] per compound + fuel effect)
+        """
+        n_batch = len(power_sums)
+        n_compounds = len(self.COMPOUNDS)
+        n_params = 3 * n_compounds + 1
+
+        # φ = (t², t, 1): φ_i·φ_j = t^((2 - i) + (2 - j))
+        exponent = 4 - np.add.outer(np.arange(3), np.arange(3))
+        XtX = np.zeros((n_batch, n_params, n_params))
+        Xty = np.zeros((n_batch, n_params))
+        for k in range(n_compounds):
+            block = slice(3 * k, 3 * k + 3)
+            XtX[:, block, block] = power_sums[:, k][:, exponent]
+            XtX[:, block, -1] = -fuel_sums[:, k]
+            XtX[:, -1, block] = -fuel_sums[:, k]
+            Xty[:, block] = target_sums[:, k]
+        XtX[:, -1, -1] = fuel_square
+        Xty[:, -1] = -fuel_target
+
+        XtX[:, -1, -1] += self.FUEL_PRIOR_WEIGHT
+        Xty[:, -1] += self.FUEL_PRIOR_WEIGHT * self.FUEL_EFFECT_PER_LAP
+
+        # Jacobi scaling keeps t² and intercept columns comparable; columns of
+        # compounds a session did not run stay zero and get zero coefficients
+        scale = np.sqrt(np.einsum("sii->si", XtX))
+        scale[scale == 0] = 1.0
+        scaled = XtX / (scale[:, :, None] * scale[:, None, :])
+        return (np.linalg.pinv(scaled, rcond=1e-10) @ (Xty / scale)[:, :, None])[
+            :, :, 0
+        ] / scale
+
     def predict_lap_time(
         self, tyre_life: int, coefficients: List[float], lap_number: int = 0
     ) -> float:
@@ -145,7 +439,7 @@ class DegradationModel:
         predicted_time = a * (tyre_life**2) + b * tyre_life + c
 
         # Remove fuel correction (car gets lighter as race progresses)
-        fuel_correction = lap_number * self.FUEL_EFFECT_PER_LAP
+        fuel_correction = lap_number * self.fuel_effect_per_lap
         predicted_time -= fuel_correction
 
         return predicted_time
@@ -0,0 +1,358 @@
+"""
+Size-bounded management of the FastF1 disk cache.
+
+FastF1 mirrors the livetiming API below its cache directory, one directory
+per session, next to its HTTP cache database:
+
+    CACHE_DIR/<year>/<event>/<session>/*.ff1pkl
+    CACHE_DIR/fastf1_http_cache.sqlite
+
+The manager keeps an index of the session directories (size, file count,
+last access, hits and misses) in CACHE_DIR/cache_index.json. Refreshing it
+only re-measures sessions whose newest modification time (of the directory
+or any file in it) changed. FastF1 rewrites .ff1pkl files in place, which
+leaves the directory's own mtime alone. When the cache grows beyond
+FASTF1_CACHE_MAX_MB, least recently used sessions are deleted, except those
+matching FASTF1_CACHE_PINNED. Like the shared cache, the index is updated
+under an exclusive file lock, so all workers on the host can share it.
+"""
+import fnmatch
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.config import CACHE_DIR, FASTF1_CACHE_MAX_MB, FASTF1_CACHE_PINNED
+from app.services.shared_cache import file_lock
+from app.utils import metrics
+
+MB = 1024 * 1024
+INDEX_VERSION = 1
+
+
+class FastF1DiskCache:
+    """Index, usage statistics and LRU eviction for the FastF1 cache."""
+
+    INDEX_NAME = "cache_index.json"
+    LOCK_NAME = ".cache_index.lock"
+
+    def __init__(
+        self,
+        root: Path = CACHE_DIR,
+        max_bytes: int = FASTF1_CACHE_MAX_MB * MB,
+        pinned: Sequence[str] = FASTF1_CACHE_PINNED,
+    ):
+        """
+        Args:
+            root: FastF1 cache directory
+            max_bytes: Size budget of the whole directory (0 = unbounded)
+            pinned: Glob patterns of session paths that are never evicted
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.pinned = list(pinned)
+
+    @staticmethod
+    def session_path(api_path: str) -> str:
+        """
+        Cache path of a session from its API path, e.g.
+        "/static/2023/2023-09-03_Italian_Grand_Prix/2023-09-03_Race/" ->
+        "2023/2023-09-03_Italian_Grand_Prix/2023-09-03_Race".
+        """
+        path = api_path.strip("/")
+        return path[len("static/") :] if path.startswith("static/") else path
+
+    def is_pinned(self, path: str) -> bool:
+        return any(fnmatch.fnmatchcase(path, pattern) for pattern in self.pinned)
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        Bring the index up to date with the directory and return it.
+
+        Args:
+            full: Re-read every session directory, not only changed ones
+        """
+        with file_lock(self.root / self.LOCK_NAME):
+            index = self._load_index()
+            self._scan(index, full)
+            self._save_index(index)
+        return index
+
+    def record_access(self, api_path: str, hit: bool) -> None:
+        """Note a session load (a hit if it was already cached) and its size."""
+        path = self.session_path(api_path)
+        with file_lock(self.root / self.LOCK_NAME):
+            index = self._load_index()
+            entry = index["sessions"].get(path) or _new_entry()
+            self._measure(path, entry)
+            entry["last_access"] = time.time()
+            entry["hits" if hit else "misses"] += 1
+            index["hits" if hit else "misses"] += 1
+            if entry["size"]:
+                index["sessions"][path] = entry
+            self._save_index(index)
+
+    def enforce(self, keep: Iterable[str] = ()) -> Dict:
+        """Evict least recently used sessions until the budget is met."""
+        if not self.max_bytes:
+            return {"evicted": [], "freed_bytes": 0}
+        return self.evict(self.max_bytes, keep=keep)
+
+    def evict(
+        self,
+        target_bytes: int,
+        pattern: Optional[str] = None,
+        keep: Iterable[str] = (),
+    ) -> Dict:
+        """
+        Delete unpinned sessions, least recently used first, until the
+        cache is at most target_bytes.
+
+        Args:
+            target_bytes: Size to shrink the cache to (0 = evict all candidates)
+            pattern: Only evict sessions whose path matches this glob
+            keep: Session paths to leave alone (e.g. one being loaded)
+
+        Returns:
+            Dictionary with the "evicted" session paths and "freed_bytes"
+        """
+        keep = set(keep)
+        evicted, freed = [], 0
+        with file_lock(self.root / self.LOCK_NAME):
+            index = self._load_index()
+            self._scan(index)
+            sessions = index["sessions"]
+            total = _total(index)
+            candidates = sorted(
+                (
+                    path
+                    for path in sessions
+                    if path not in keep
+                    and not self.is_pinned(path)
+                    and (pattern is None or fnmatch.fnmatchcase(path, pattern))
+                ),
+                key=lambda path: _last_used(sessions[path]),
+            )
+            for path in candidates:
+                if total <= target_bytes:
+                    break
+                shutil.rmtree(self.root / path, ignore_errors=True)
+                size = sessions.pop(path)["size"]
+                total -= size
+                freed += size
+                evicted.append(path)
+            index["evictions"] += len(evicted)
+            self._save_index(index)
+
+        if evicted:
+            metrics.inc("f1_fastf1_cache_evictions_total", len(evicted))
+        metrics.gauge_set("f1_fastf1_cache_bytes", total)
+        return {"evicted": evicted, "freed_bytes": freed}
+
+    def compact(self) -> Dict:
+        """
+        Rebuild the index from scratch, remove empty directories and
+        leftover temporary files, and VACUUM the SQLite databases.
+
+        Returns:
+            Dictionary with "size_before", "size_after" and "removed" paths
+        """
+        with file_lock(self.root / self.LOCK_NAME):
+            index = self._load_index()
+            self._scan(index)
+            before = _total(index)
+            removed = []
+
+            for dirpath, dirnames, filenames in os.walk(self.root, topdown=False):
+                for name in filenames:
+                    if name.endswith((".tmp", ".part")):
+                        os.remove(os.path.join(dirpath, name))
+                        removed.append(
+                            os.path.relpath(os.path.join(dirpath, name), self.root)
+                        )
+                if dirpath != str(self.root) and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+                    removed.append(os.path.relpath(dirpath, self.root))
+
+            for entry in os.scandir(self.root):
+                if entry.is_file() and entry.name.endswith(".sqlite"):
+                    db = sqlite3.connect(entry.path, timeout=30)
+                    try:
+                        db.execute("VACUUM")
+                    finally:
+                        db.close()
+
+            self._scan(index, full=True)
+            after = _total(index)
+            self._save_index(index)
+        metrics.gauge_set("f1_fastf1_cache_bytes", after)
+        return {"size_before": before, "size_after": after, "removed": removed}
+
+    def stats(self, top: int = 20) -> Dict:
+        """
+        Usage of the cache: sizes, budget, hit rates and the most recently
+        used sessions.
+        """
+        start = time.perf_counter()
+        index = self.refresh()
+        scan_seconds = time.perf_counter() - start
+
+        sessions = index["sessions"]
+        # Totals include sessions evicted since
+        hits, misses = index["hits"], index["misses"]
+        recent = sorted(sessions, key=lambda p: _last_used(sessions[p]), reverse=True)
+        total = _total(index)
+        metrics.gauge_set("f1_fastf1_cache_bytes", total)
+        return {
+            "root": str(self.root),
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+            "session_bytes": sum(entry["size"] for entry in sessions.values()),
+            "other_bytes": sum(index["other"].values()),
+            "sessions": len(sessions),
+            "files": sum(entry["files"] for entry in sessions.values()),
+            "pinned": sorted(p for p in sessions if self.is_pinned(p)),
+            "pinned_patterns": self.pinned,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+            "evictions": index["evictions"],
+            "scan_seconds": round(scan_seconds, 4),
+            "recent_sessions": [
+                {"path": path, "pinned": self.is_pinned(path), **sessions[path]}
+                for path in recent[:top]
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    def _scan(self, index: Dict, full: bool = False) -> None:
+        """Update the index from the directory tree (changed sessions only)."""
+        sessions = index["sessions"]
+        seen = set()
+        index["other"] = {}
+
+        for year in _scandir(self.root):
+            if not year.is_dir():
+                if year.name != self.INDEX_NAME:
+                    index["other"][year.name] = year.stat().st_size
+                continue
+            for event in _scandir(year.path):
+                if not event.is_dir():
+                    index["other"][f"{year.name}/{event.name}"] = event.stat().st_size
+                    continue
+                for session in _scandir(event.path):
+                    path = f"{year.name}/{event.name}/{session.name}"
+                    if not session.is_dir():
+                        index["other"][path] = session.stat().st_size
+                        continue
+                    seen.add(path)
+                    entry = sessions.get(path)
+                    mtime = _newest_mtime(session.path)
+                    if entry is None:
+                        entry = sessions[path] = _new_entry()
+                    if full or entry["mtime"] != mtime:
+                        self._measure(path, entry)
+
+        for path in set(sessions) - seen:
+            del sessions[path]
+
+    def _measure(self, path: str, entry: Dict) -> None:
+        """Size, file count and newest mtime of one session directory."""
+        size = files = 0
+        try:
+            mtime = (self.root / path).stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        for item in _scandir(self.root / path):
+            if item.is_file():
+                stat = item.stat()
+                size += stat.st_size
+                files += 1
+                mtime = max(mtime or 0, stat.st_mtime_ns)
+        entry["mtime"] = mtime
+        entry["size"] = size
+        entry["files"] = files
+        if entry["last_access"] is None:
+            entry["last_access"] = (entry["mtime"] or 0) / 1e9
+
+    def _load_index(self) -> Dict:
+        path = self.root / self.INDEX_NAME
+        try:
+            index = json.loads(path.read_text())
+        except (OSError, ValueError):
+            index = None
+        if not index or index.get("version") != INDEX_VERSION:
+            index = {
+                "version": INDEX_VERSION,
+                "sessions": {},
+                "other": {},
+                "hits": 0,
+                "misses": 0,
+                "evictions": 0,
+            }
+        return index
+
+    def _save_index(self, index: Dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / self.INDEX_NAME
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        tmp_path.write_text(json.dumps(index, separators=(",", ":")))
+        os.replace(tmp_path, path)
+
+
+def _new_entry() -> Dict:
+    return {
+        "size": 0,
+        "files": 0,
+        "mtime": None,
+        "last_access": None,
+        "hits": 0,
+        "misses": 0,
+    }
+
+
+def _last_used(entry: Dict) -> float:
+    return entry["last_access"] or 0.0
+
+
+def _total(index: Dict) -> int:
+    return sum(e["size"] for e in index["sessions"].values()) + sum(
+        index["other"].values()
+    )
+
+
+def _newest_mtime(path) -> Optional[int]:
+    """Newest mtime (ns) of a directory and the files directly in it."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    for item in _scandir(path):
+        if item.is_file():
+            mtime = max(mtime, item.stat().st_mtime_ns)
+    return mtime
+
+
+def _scandir(path) -> List[os.DirEntry]:
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if not entry.name.startswith(".")]
+    except OSError:
+        return []
+
+
+metrics.describe("f1_fastf1_cache_bytes", "Size of the FastF1 disk cache")
+metrics.describe(
+    "f1_fastf1_cache_evictions_total", "Sessions evicted from the FastF1 cache"
+)
@@ -1,27 +1,49 @@
 """
 FastF1 client service for extracting F1 telemetry data.
 
-This service handles all interactions with the FastF1 library,
-including session loading, data extraction, and filtering.
+This service is the entry point for session data: it loads sessions through
+the configured data source (FastF1, local lap files or synthetic) and
+handles data extraction and filtering on the resulting lap tables.
 """
-import gc
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-import fastf1
-from app.config import FASTF1_CACHE_DIR
+import numpy as np
+from app.services.data_sources import DataSource, get_data_source
+from app.services.degradation_model import DegradationModel
+from app.services.long_runs import LongRunDetector
+from app.services.session_data import SessionData
+from app.services.shared_cache import get_shared_cache
+from app.services.stints import StintTable
+from app.utils import metrics
+
+# Fields of each lap returned by get_race_laps
+RACE_LAP_FIELDS = (
+    "driver",
+    "lap_number",
+    "lap_time",
+    "compound",
+    "tyre_life",
+    "is_personal_best",
+)
 
 
 class FastF1Client:
     """Client for fetching and processing F1 telemetry data."""
 
-    def __init__(self):
-        """Initialize FastF1 client and enable caching."""
-        # CRITICAL: Enable cache BEFORE any session loads
-        fastf1.Cache.enable_cache(FASTF1_CACHE_DIR)
+    def __init__(self, source: Optional[DataSource] = None):
+        """
+        Initialize the client.
+
+        Args:
+            source: Data source to read sessions from (DATA_SOURCE by default)
+        """
+        self.source = source or get_data_source()
+        self.cache = get_shared_cache(self.source.name)
 
+    @metrics.timed("load_session")
     def load_session(
         self, year: int, race_name: str, session_type: str = "R"
-    ) -> Optional[fastf1.core.Session]:
+    ) -> Optional[SessionData]:
         """
         Load a specific F1 session with memory-efficient settings.
 
@@ -38,33 +60,28 @@ class FastF1Client:
                 - "S" = Sprint
 
         Returns:
-            Loaded session object, or None if loading fails
+            Loaded session, or None if loading fails
 
         Note:
-            First load can take 30-60 seconds as data is downloaded.
-            Subsequent loads are faster due to caching.
+            With the FastF1 source, first load can take 30-60 seconds as data
+            is downloaded. Subsequent loads are faster due to caching.
             Memory-optimized to load only laps data (not full telemetry).
+            Loaded sessions go through the shared cache, so every worker
+            maps the same lap arrays and only one of them loads the session.
         """
-        try:
-            session = fastf1.get_session(year, race_name, session_type)
-            # MEMORY OPTIMIZATION: Only load laps, not full telemetry
-            # This reduces memory usage from ~1200MB to ~200-300MB
-            session.load(laps=True, telemetry=False, weather=False, messages=False)
+        return self.cache.load_session(
+            year,
+            race_name,
+            session_type,
+            lambda: self.source.load_session(year, race_name, session_type),
+        )
 
-            # Force garbage collection after loading to free memory
-            gc.collect()
-
-            return session
-        except Exception as e:
-            print(f"Error loading session {year} {race_name} {session_type}: {e}")
-            return None
-
-    def get_race_laps(self, session: fastf1.core.Session) -> dict:
+    def get_race_laps(self, session: SessionData) -> dict:
         """
         Extract lap data from a race session.
 
         Args:
-            session: Loaded FastF1 session
+            session: Loaded session
 
         Returns:
             Dictionary with lap data including:
@@ -78,40 +95,214 @@ class FastF1Client:
         if session is None or session.laps is None:
             return {"laps": [], "total_laps": 0}
 
-        # Use pick_quicklaps() to filter outliers (pit laps, traffic, etc.)
-        quick_laps = session.laps.pick_quicklaps()
-
-        laps_data = []
-        for _, lap in quick_laps.iterrows():
-            laps_data.append(
-                {
-                    "driver": lap["Driver"],
-                    "lap_number": int(lap["LapNumber"]),
-                    "lap_time": (
-                        float(lap["LapTime"].total_seconds())
-                        if lap["LapTime"] is not None
-                        else None
-                    ),
-                    "compound": lap["Compound"],
-                    "tyre_life": int(lap["TyreLife"]) if lap["TyreLife"] else None,
-                    "is_personal_best": bool(lap["IsPersonalBest"]),
-                }
-            )
-
-        # Free memory after processing
-        del quick_laps
-        gc.collect()
+        # Quick laps only, to filter outliers (pit laps, traffic, etc.)
+        laps_data = [
+            lap
+            for chunk in self.iter_race_laps(session, self.select_race_laps(session))
+            for lap in chunk
+        ]
 
         return {"laps": laps_data, "total_laps": len(laps_data)}
 
-    def get_stint_data(self, session: fastf1.core.Session, driver: str) -> List[Dict]:
+    def select_race_laps(
+        self,
+        session: SessionData,
+        drivers: Optional[List[str]] = None,
+        compounds: Optional[List[str]] = None,
+        lap_range: Tuple[Optional[int], Optional[int]] = (None, None),
+        tyre_life_range: Tuple[Optional[int], Optional[int]] = (None, None),
+    ) -> np.ndarray:
+        """
+        Rows of the laps returned by get_race_laps, optionally filtered.
+
+        Args:
+            session: Loaded session
+            drivers: Keep these driver codes only
+            compounds: Keep these compounds only
+            lap_range: Inclusive (min, max) lap number, None for open
+            tyre_life_range: Inclusive (min, max) tyre life, None for open;
+                             laps with unknown tyre life are dropped when set
+
+        Returns:
+            Row indices into session.laps, in table order
+        """
+        laps = session.laps
+        mask = laps.quick_mask()
+        if drivers:
+            mask &= np.isin(laps["driver"], drivers)
+        if compounds:
+            mask &= np.isin(laps["compound"], compounds)
+        for column, (low, high) in (
+            ("lap_number", lap_range),
+            ("tyre_life", tyre_life_range),
+        ):
+            if low is not None:
+                mask &= laps[column] >= low
+            if high is not None:
+                mask &= laps[column] <= high
+        return np.flatnonzero(mask)
+
+    def iter_race_laps(
+        self,
+        session: SessionData,
+        rows: np.ndarray,
+        fields: Sequence[str] = RACE_LAP_FIELDS,
+        chunk_rows: int = 1000,
+    ) -> Iterator[List[Dict]]:
+        """
+        Lap dicts for the given rows, built one chunk at a time.
+
+        Args:
+            session: Loaded session
+            rows: Row indices (e.g. from select_race_laps)
+            fields: Subset of RACE_LAP_FIELDS to include
+            chunk_rows: Laps per yielded list
+
+        Yields:
+            Lists of up to chunk_rows lap dicts
+        """
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start : start + chunk_rows]
+            values = [session.laps[name][chunk].tolist() for name in fields]
+            if "tyre_life" in fields:
+                i = fields.index("tyre_life")
+                values[i] = [None if v != v else int(v) for v in values[i]]
+            yield [dict(zip(fields, row)) for row in zip(*values)]
+
+    def get_race_lap_columns(self, session: SessionData) -> Dict[str, np.ndarray]:
+        """
+        The laps of get_race_laps as columns (no per-lap dicts).
+
+        Returns:
+            Dictionary of "driver", "lap_number", "lap_time", "compound",
+            "tyre_life" and "is_personal_best" arrays
+        """
+        laps = session.laps
+        quick_laps = laps.select(laps.quick_mask())
+        return {name: quick_laps[name] for name in RACE_LAP_FIELDS}
+
+    def get_stint_table(self, session: SessionData) -> StintTable:
+        """
+        Every driver's stints as a compact StintTable (see get_stint_data).
+
+        Returns:
+            StintTable over one buffer of the session's quick laps
+        """
+        return StintTable.from_session(session)
+
+    def get_stint_columns(self, session: SessionData) -> Dict[str, np.ndarray]:
+        """
+        Every driver's stints as in get_stint_data, as columns.
+
+        A stint is a run of each driver's quick laps on one compound.
+
+        Returns:
+            Dictionary of "driver", "stint_number", "compound", "start_lap",
+            "end_lap" and "lap_count" arrays, one row per stint
+        """
+        return self.get_stint_table(session).columns()
+
+    def get_fit_laps(self, session: SessionData) -> Dict[str, np.ndarray]:
+        """
+        Laps used for degradation fitting, as arrays.
+
+        Same laps as the stints from get_stint_data (each driver's quick laps
+        with a known tyre life), extracted for every driver at once.
+
+        Returns:
+            Dictionary of "compound", "tyre_life", "lap_number", "lap_time"
+            and "stint_id" (unique per driver and stint)
+        """
+        laps = session.laps
+        fit_laps = laps.select(laps.quick_mask(by="driver") & (laps["tyre_life"] > 0))
+        arrays = {
+            name: fit_laps[name]
+            for name in ("compound", "tyre_life", "lap_number", "lap_time")
+        }
+        _, driver_idx = np.unique(fit_laps["driver"], return_inverse=True)
+        stint = np.nan_to_num(fit_laps["stint"].astype(float)).astype(np.int64)
+        arrays["stint_id"] = driver_idx * (int(stint.max(initial=0)) + 1) + stint
+        return arrays
+
+    def get_degradation_fit(self, session: SessionData) -> Dict:
+        """
+        Degradation curves and fuel effect for a session.
+
+        Fitted once per session and shared by all workers via the cache.
+
+        Returns:
+            Dictionary with "curves" and "fuel_effect_per_lap"
+        """
+        return self.cache.get_result(
+            "curves",
+            session.key,
+            lambda: DegradationModel().fit_session(self.get_fit_laps(session)),
+        )
+
+    def get_degradation_bootstrap(self, session: SessionData, n_samples: int) -> Dict:
+        """
+        Bootstrap samples of a session's degradation fit (see
+        DegradationModel.bootstrap), computed once per session and sample
+        count and shared by all workers via the cache.
+
+        Returns:
+            Dictionary with "compounds", "coefficients", "deg_per_lap" and
+            "fuel_effect_per_lap" as nested lists
+        """
+        return self.cache.get_result(
+            "bootstrap",
+            f"{session.key}_{n_samples}",
+            lambda: _bootstrap(self.get_fit_laps(session), n_samples),
+        )
+
+    def get_practice_fit(self, sessions: Sequence[SessionData]) -> Dict:
+        """
+        Pre-race degradation curves and fuel effect, fitted on the long runs
+        of a weekend's practice (and sprint) sessions.
+
+        Fitted once per set of sessions and shared by all workers via the
+        cache.
+
+        Args:
+            sessions: Loaded sessions of one event, e.g. FP1, FP2 and FP3
+
+        Returns:
+            Dictionary with "curves", "fuel_effect_per_lap" and "long_runs"
+            (number of runs fitted)
+        """
+
+        def compute():
+            laps = LongRunDetector().fit_laps(sessions)
+            fit = DegradationModel().fit_session(laps)
+            fit["long_runs"] = len(np.unique(laps["stint_id"]))
+            return fit
+
+        return self.cache.get_result(
+            "practice_curves", _sessions_key(sessions), compute
+        )
+
+    def get_practice_bootstrap(
+        self, sessions: Sequence[SessionData], n_samples: int
+    ) -> Dict:
+        """
+        Bootstrap samples of get_practice_fit, resampling long runs (see
+        get_degradation_bootstrap).
+        """
+        return self.cache.get_result(
+            "practice_bootstrap",
+            f"{_sessions_key(sessions)}_{n_samples}",
+            lambda: _bootstrap(LongRunDetector().fit_laps(sessions), n_samples),
+        )
+
+    @metrics.timed("get_stint_data")
+    def get_stint_data(self, session: SessionData, driver: str) -> List[Dict]:
         """
         Extract stint data for a specific driver.
 
         A stint is a continuous set of laps on the same set of tyres.
 
         Args:
-            session: Loaded FastF1 session
+            session: Loaded session
             driver: Driver code (e.g., "VER", "HAM", "LEC")
 
         Returns:
@@ -120,52 +311,31 @@ class FastF1Client:
             - compound
             - start_lap
             - end_lap
-            - laps (list of lap times)
+            - laps (list of lap times, tyre life and lap number)
         """
         if session is None or session.laps is None:
             return []
 
-        driver_laps = session.laps.pick_driver(driver).pick_quicklaps()
-
-        stints = []
-        current_stint = None
-        stint_number = 0
-
-        for _, lap in driver_laps.iterrows():
-            compound = lap["Compound"]
-            lap_time = (
-                float(lap["LapTime"].total_seconds())
-                if lap["LapTime"] is not None
-                else None
-            )
-            tyre_life = int(lap["TyreLife"]) if lap["TyreLife"] else None
-
-            # Start new stint if compound changed or first lap
-            if current_stint is None or current_stint["compound"] != compound:
-                if current_stint is not None:
-                    stints.append(current_stint)
-
-                stint_number += 1
-                current_stint = {
-                    "stint_number": stint_number,
-                    "compound": compound,
-                    "start_lap": int(lap["LapNumber"]),
-                    "end_lap": int(lap["LapNumber"]),
-                    "laps": [{"lap_time": lap_time, "tyre_life": tyre_life}],
-                }
-            else:
-                # Continue current stint
-                current_stint["end_lap"] = int(lap["LapNumber"])
-                current_stint["laps"].append(
-                    {"lap_time": lap_time, "tyre_life": tyre_life}
-                )
-
-        # Add final stint
-        if current_stint is not None:
-            stints.append(current_stint)
-
-        # Free memory after processing
-        del driver_laps
-        gc.collect()
-
-        return stints
+        # Quick laps relative to this driver's own fastest lap
+        driver_laps = SessionData(
+            session.year,
+            session.session_type,
+            session.event,
+            session.laps.select(session.laps["driver"] == driver),
+        )
+        stints = StintTable.from_session(driver_laps)
+        return [stint.to_dict() for stint in stints]
+
+
+def _bootstrap(laps: Dict[str, np.ndarray], n_samples: int) -> Dict:
+    """DegradationModel.bootstrap with its arrays as (JSON-ready) lists."""
+    samples = DegradationModel().bootstrap(laps, n_samples=n_samples)
+    return {
+        name: value.tolist() if isinstance(value, np.ndarray) else value
+        for name, value in samples.items()
+    }
+
+
+def _sessions_key(sessions: Sequence[SessionData]) -> str:
+    """Cache key of a set of sessions, e.g. '2023_italian-grand-prix_FP1+...'."""
+    return "+".join(session.key for session in sessions)
@@ -0,0 +1,477 @@
+"""
+Persistent background job queue.
+
+Long analyses (season batches, large sweeps, Monte Carlo simulations) are
+submitted as jobs and run by worker threads outside the request. Jobs live
+in one SQLite table shared by every API process on the host:
+
+    queued -> running -> succeeded | failed
+    queued | running  -> cancelled
+
+Workers claim queued jobs in a write transaction, so each job runs once
+even with several processes. A worker holds a lease on the jobs it runs
+and renews it (worker_seen_at) while they run; a running job whose lease
+is older than JOB_LEASE_TIMEOUT belongs to a process that died, on this
+or any other host, and is queued again. Identical submissions (same kind
+and parameters) reuse the pending or finished job instead of queueing a
+duplicate. Finished jobs are kept for JOB_RESULT_TTL seconds.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import (
+    DATA_SOURCE,
+    JOB_LEASE_TIMEOUT,
+    JOB_POLL_INTERVAL,
+    JOB_RESULT_TTL,
+    JOB_WORKERS,
+    JOBS_DB,
+)
+from app.utils import metrics
+
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+# Runs a job: (kind, params) -> JSON-serializable result. Raises JobError
+# (or any exception) to fail the job.
+JobRunner = Callable[[str, Dict[str, Any]], Any]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    worker_seen_at REAL,
+    result TEXT,
+    error TEXT,
+    error_status INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, created_at);
+"""
+
+# Columns added since the table was first created: (name, type)
+_MIGRATIONS = (("worker_seen_at", "REAL"),)
+
+
+class JobError(Exception):
+    """A job failed with a client-facing status code and message."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class JobQueue:
+    """SQLite-backed job queue with a local pool of worker threads."""
+
+    PURGE_INTERVAL = 60.0  # seconds between expired-job purges per process
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        path: Path = JOBS_DB,
+        workers: int = JOB_WORKERS,
+        result_ttl: float = JOB_RESULT_TTL,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        lease_timeout: float = JOB_LEASE_TIMEOUT,
+    ):
+        """
+        Args:
+            runner: Runs one job and returns its result
+            path: SQLite database file
+            workers: Worker threads in this process (0 = never run jobs)
+            result_ttl: Seconds finished jobs and their results are kept
+            poll_interval: Seconds idle workers wait before checking for
+                           jobs submitted by other processes
+            lease_timeout: Seconds without a lease renewal after which a
+                           running job is taken to be orphaned
+        """
+        self.runner = runner
+        self.path = Path(path)
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        # The token tells this process apart from an earlier one that had
+        # the same pid
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._local = threading.local()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._last_purge = 0.0
+        self._running: Set[str] = set()  # ids of the jobs this process runs
+        self._running_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._connection()
+        db.executescript(_SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+        for name, sql_type in _MIGRATIONS:
+            if name not in columns:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {sql_type}")
+
+    # ------------------------------------------------------------------
+    # Submitting and querying
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Tuple[Dict, bool]:
+        """
+        Queue a job, unless an identical one is pending or finished.
+
+        A running job only counts while its worker's lease is fresh; one
+        whose lease expired is queued again here and reused.
+
+        Returns:
+            (job, created): the new job, or the existing queued, running or
+            succeeded job with the same kind and parameters
+        """
+        key = self.dedup_key(kind, params)
+        now = time.time()
+        with self._transaction() as db:
+            self._requeue_expired(db, now, key)
+            row = db.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ?"
+                " AND (status IN ('queued', 'succeeded')"
+                "      OR (status = 'running' AND worker_seen_at > ?))"
+                " AND (expires_at IS NULL OR expires_at > ?)"
+                " ORDER BY created_at DESC LIMIT 1",
+                (key, now - self.lease_timeout, now),
+            ).fetchone()
+            created = row is None
+            if created:
+                job_id = uuid.uuid4().hex
+                db.execute(
+                    "INSERT INTO jobs (id, kind, params, dedup_key, status, created_at)"
+                    " VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, kind, _dumps(params), key, now),
+                )
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+
+        metrics.inc("f1_jobs_submitted_total", kind=kind, deduplicated=str(not created))
+        if created:
+            self._wake.set()
+            self._update_gauges()
+        return _job(row), created
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict]:
+        """The job (and its result, if asked for), or None if unknown/expired."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            )
+            .fetchone()
+        )
+        return None if row is None else _job(row, with_result)
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a queued or running job (finished jobs are left as they are).
+
+        A running job cannot be interrupted; it finishes in the background
+        and its result is discarded.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ?"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (now, now + self.result_ttl, job_id),
+            )
+        self._update_gauges()
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each status."""
+        rows = (
+            self._connection()
+            .execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            .fetchall()
+        )
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs past their TTL. Returns the number deleted."""
+        with self._transaction() as db:
+            deleted = db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            ).rowcount
+        self._last_purge = time.monotonic()
+        return deleted
+
+    @staticmethod
+    def dedup_key(kind: str, params: Dict[str, Any]) -> str:
+        """Identity of a submission: kind, canonical parameters, data source."""
+        payload = _dumps({"kind": kind, "params": params, "source": DATA_SOURCE})
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """
+        Recover orphaned jobs and start the worker threads and the lease
+        heartbeat (idempotent).
+        """
+        with self._start_lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._stop.clear()
+            self._recover()
+            self.purge_expired()
+            self._update_gauges()
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"job-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(
+                target=self._heartbeat, name="job-heartbeat", daemon=True
+            )
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop the workers after their current job. Jobs still running when
+        the timeout expires are queued again once their lease expires.
+        """
+        with self._start_lock:
+            self._stop.set()
+            self._wake.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            if time.monotonic() - self._last_purge > self.PURGE_INTERVAL:
+                self._recover()
+                self.purge_expired()
+            row = self._claim()
+            if row is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._execute(row)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Mark the oldest queued job as running by this process."""
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?,"
+                " worker_seen_at = ? WHERE id = ?",
+                (self.worker_id, now, now, row["id"]),
+            )
+            with self._running_lock:
+                self._running.add(row["id"])
+        self._update_gauges()
+        return row
+
+    def _execute(self, row: sqlite3.Row) -> None:
+        kind = row["kind"]
+        start = time.perf_counter()
+        result = error = error_status = None
+        try:
+            result = _dumps(self.runner(kind, json.loads(row["params"])))
+            status = "succeeded"
+        except JobError as e:
+            status, error, error_status = "failed", e.detail, e.status_code
+        except Exception as e:  # the job fails, the worker carries on
+            status, error, error_status = "failed", f"{type(e).__name__}: {e}", 500
+        elapsed = time.perf_counter() - start
+
+        now = time.time()
+        with self._transaction() as db:
+            # A job cancelled while running keeps its cancelled status
+            updated = db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, error_status = ?,"
+                " finished_at = ?, expires_at = ? WHERE id = ? AND status = 'running'"
+                " AND worker = ?",
+                (
+                    status,
+                    result,
+                    error,
+                    error_status,
+                    now,
+                    now + self.result_ttl,
+                    row["id"],
+                    self.worker_id,
+                ),
+            ).rowcount
+        with self._running_lock:
+            self._running.discard(row["id"])
+        if not updated:
+            status = "cancelled"
+        metrics.inc("f1_jobs_total", kind=kind, status=status)
+        metrics.observe("f1_job_duration_seconds", elapsed, kind=kind)
+        self._update_gauges()
+
+    def _heartbeat(self) -> None:
+        """Renew the lease on the jobs this process is running."""
+        interval = self.lease_timeout / 4
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                job_ids = list(self._running)
+            if not job_ids:
+                continue
+            with self._transaction() as db:
+                db.executemany(
+                    "UPDATE jobs SET worker_seen_at = ?"
+                    " WHERE id = ? AND worker = ? AND status = 'running'",
+                    [(time.time(), job_id, self.worker_id) for job_id in job_ids],
+                )
+
+    def _recover(self) -> None:
+        """Queue again the running jobs of dead processes, on any host."""
+        with self._transaction() as db:
+            requeued = self._requeue_expired(db, time.time())
+        if requeued:
+            metrics.inc("f1_jobs_requeued_total", requeued)
+            self._update_gauges()
+
+    def _requeue_expired(
+        self, db: sqlite3.Connection, now: float, dedup_key: Optional[str] = None
+    ) -> int:
+        """
+        Queue again running jobs (all, or those with dedup_key) whose lease
+        expired, or whose worker is a process gone from this host.
+
+        Returns:
+            Number of jobs queued again
+        """
+        query = "SELECT id, worker, worker_seen_at FROM jobs WHERE status = 'running'"
+        args: Tuple = ()
+        if dedup_key is not None:
+            query += " AND dedup_key = ?"
+            args = (dedup_key,)
+        host = socket.gethostname()
+        orphaned = [
+            row["id"]
+            for row in db.execute(query, args).fetchall()
+            if row["worker"] is None
+            or row["worker_seen_at"] is None
+            or row["worker_seen_at"] <= now - self.lease_timeout
+            or (row["worker"] != self.worker_id and _is_dead(row["worker"], host))
+        ]
+        db.executemany(
+            "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL,"
+            " worker_seen_at = NULL WHERE id = ? AND status = 'running'",
+            [(job_id,) for job_id in orphaned],
+        )
+        return len(orphaned)
+
+    def _update_gauges(self) -> None:
+        counts = self.stats()
+        for status in ("queued", "running"):
+            metrics.gauge_set("f1_jobs", counts[status], status=status)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on a connection."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _is_dead(worker: str, host: str) -> bool:
+    """
+    Whether a worker id (host:pid:token) names a process gone from this
+    host. Other hosts' workers are left to their lease.
+    """
+    worker_host, _, pid = worker.rsplit(":", 1)[0].rpartition(":")
+    if worker_host != host:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (PermissionError, ValueError):
+        return False
+    return False
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _job(row: sqlite3.Row, with_result: bool = False) -> Dict:
+    job = {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "params": json.loads(row["params"]),
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "expires_at": row["expires_at"],
+        "error": row["error"],
+        "error_status": row["error_status"],
+    }
+    if with_result:
+        job["result"] = None if row["result"] is None else json.loads(row["result"])
+    return job
+
+
+metrics.describe("f1_jobs_submitted_total", "Jobs submitted, by kind and dedup")
+metrics.describe("f1_jobs_total", "Jobs finished, by kind and status")
+metrics.describe("f1_jobs_requeued_total", "Orphaned running jobs queued again")
+metrics.describe("f1_job_duration_seconds", "Time to run a job, by kind")
+metrics.describe("f1_jobs", "Jobs queued and running (all processes)")
@@ -0,0 +1,130 @@
+"""
+Long-run detection in practice sessions.
+
+Before the race, the best degradation data are the race simulations teams
+run in practice: long stints on high fuel. A long run is a stint (one
+driver's consecutive laps on one set of tyres) with at least MIN_RUN_LAPS
+representative laps. Out- and in-laps, push laps (quicker than
+PUSH_THRESHOLD times the stint's median lap) and cool-down laps (slower
+than COOL_DOWN_THRESHOLD times it) are left out of the fit but do not end
+the run. Short push runs (qualifying simulations) never qualify.
+
+Everything is run-length analysis on the session's lap arrays: no loop
+over drivers, stints or laps.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+from app.services.session_data import LAP_COLUMNS, LapTable, SessionData
+
+# Weekend sessions whose long runs feed the pre-race fit (those that do not
+# take place at an event are skipped)
+PRACTICE_SESSIONS = ("FP1", "FP2", "FP3", "S")
+
+
+class LongRunDetector:
+    """Finds race-simulation runs in practice laps."""
+
+    MIN_RUN_LAPS = 5  # representative laps for a stint to count as a long run
+    PUSH_THRESHOLD = 0.98  # of the stint's median lap time
+    COOL_DOWN_THRESHOLD = 1.04  # of the stint's median lap time
+
+    def detect(self, laps: LapTable) -> Dict[str, np.ndarray]:
+        """
+        Representative laps of every long run in a session.
+
+        Args:
+            laps: Session laps, in any order
+
+        Returns:
+            Dictionary of "driver", "compound", "tyre_life", "lap_time",
+            "lap_number" (lap of the run, 1 = first lap of the stint) and
+            "run" (index of the long run, 0..n_runs-1), sorted by driver and
+            lap
+        """
+        order = np.lexsort((laps["lap_number"], laps["driver"]))
+        driver = laps["driver"][order]
+        compound = laps["compound"][order]
+        lap_number = laps["lap_number"][order].astype(np.int64)
+        lap_time = laps["lap_time"][order]
+        stint = np.nan_to_num(laps["stint"][order], nan=-1.0)
+        pit_out = laps["pit_out"][order]
+        pit_in = laps["pit_in"][order]
+
+        # A stint starts at a new driver, compound, stint number, a fresh set
+        # from the pits or a gap in the lap count
+        starts = (
+            np.r_[
+                True,
+                (driver[1:] != driver[:-1])
+                | (compound[1:] != compound[:-1])
+                | (stint[1:] != stint[:-1])
+                | (lap_number[1:] != lap_number[:-1] + 1),
+            ]
+            | pit_out
+        )
+        stint_id = np.cumsum(starts) - 1
+        n_stints = int(stint_id[-1]) + 1 if len(stint_id) else 0
+        first_lap = lap_number[starts][stint_id] if n_stints else lap_number
+
+        timed = np.isfinite(lap_time) & ~pit_in & ~pit_out & (compound != "UNKNOWN")
+        median = self._group_median(lap_time, stint_id, timed, n_stints)
+        ratio = lap_time / median[stint_id]
+        representative = (
+            timed & (ratio >= self.PUSH_THRESHOLD) & (ratio <= self.COOL_DOWN_THRESHOLD)
+        )
+
+        counts = np.bincount(stint_id[representative], minlength=n_stints)
+        is_long = counts >= self.MIN_RUN_LAPS
+        keep = representative & is_long[stint_id]
+        run = np.cumsum(is_long) - 1
+
+        return {
+            "driver": driver[keep],
+            "compound": compound[keep],
+            "tyre_life": laps["tyre_life"][order][keep],
+            "lap_time": lap_time[keep],
+            "lap_number": (lap_number - first_lap + 1)[keep],
+            "run": run[stint_id[keep]],
+        }
+
+    def fit_laps(self, sessions: Sequence[SessionData]) -> Dict[str, np.ndarray]:
+        """
+        Long-run laps of several sessions, in the layout of
+        FastF1Client.get_fit_laps ("stint_id" identifies the run across all
+        sessions), ready for DegradationModel.fit_session and bootstrap.
+
+        The fuel term is fitted against the lap of the run: fuel loads
+        differ between runs and are unknown, but each run burns fuel as it
+        goes.
+        """
+        detected = [self.detect(session.laps) for session in sessions]
+        if not detected:
+            detected = [self.detect(LapTable({name: [] for name in LAP_COLUMNS}))]
+
+        # Number runs consecutively across sessions
+        offsets = np.cumsum([0] + [int(d["run"].max(initial=-1)) + 1 for d in detected])
+        arrays = {
+            name: np.concatenate([d[name] for d in detected])
+            for name in ("compound", "tyre_life", "lap_number", "lap_time")
+        }
+        arrays["stint_id"] = np.concatenate(
+            [d["run"] + offset for d, offset in zip(detected, offsets)]
+        )
+        return arrays
+
+    @staticmethod
+    def _group_median(
+        values: np.ndarray, group: np.ndarray, mask: np.ndarray, n_groups: int
+    ) -> np.ndarray:
+        """Median of the masked values of each group (NaN for empty groups)."""
+        if len(values) == 0:
+            return np.full(n_groups, np.nan)
+        # Sort by group, masked-in values first and ascending within it
+        order = np.lexsort((np.where(mask, values, np.inf), ~mask, group))
+        counts = np.bincount(group[mask], minlength=n_groups)
+        first = np.searchsorted(group[order], np.arange(n_groups))
+        ranked = values[order]
+        low = ranked[np.minimum(first + (counts - 1) // 2, len(values) - 1)]
+        high = ranked[np.minimum(first + counts // 2, len(values) - 1)]
+        return np.where(counts > 0, (low + high) / 2, np.nan)
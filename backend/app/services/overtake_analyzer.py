@@ -4,9 +4,13 @@ Overtake zone analyzer service.
 Identifies potential overtaking zones based on speed differentials
 across the track.
 """
-from typing import Dict
+from typing import Dict, List, Optional
 
-import fastf1
+import numpy as np
+from app.services.overtake_counter import OvertakeCounter
+from app.services.session_data import SessionData
+from app.services.telemetry_store import TelemetryStore
+from app.utils import metrics
 
 
 class OvertakeAnalyzer:
@@ -14,72 +18,197 @@ class OvertakeAnalyzer:
     Analyzes telemetry to identify overtaking zones.
 
     Approach:
-    1. Extract position and speed data across track
-    2. Identify zones with high speed variance (accel/braking zones)
-    3. Detect DRS zones from telemetry
-    4. Rank zones by overtaking potential
+    1. Count overtakes from lap-by-lap positions (OvertakeCounter)
+    2. Pick each driver's fastest clean laps from the laps-only session
+    3. Read speed and DRS for those laps on the common distance grid
+       from the memory-mapped TelemetryStore
+    4. Find heavy braking zones that follow high-speed sections
+    5. Merge nearby points into zones and classify them by speed delta
+       (per-zone overtake counts stay null: lap positions do not say where
+       on track a pass happened)
     """
 
     MIN_SPEED_DELTA = 50  # km/h minimum delta to consider a zone
     ZONE_DISTANCE_THRESHOLD = 100  # meters - group nearby points
 
-    def analyze_session(self, session: fastf1.core.Session) -> Dict[str, any]:
+    LAPS_PER_DRIVER = 3  # fastest quick laps used per driver
+    BRAKING_LOOKBACK = 300  # meters before a point searched for the entry speed
+    MIN_ENTRY_SPEED = 200  # km/h - only braking after high-speed sections counts
+    DRS_OPEN = 10  # DRS channel values >= this mean the flap is open
+    MIN_DRS_SHARE = 0.2  # share of laps with DRS open before a zone to flag it
+
+    @metrics.timed("analyze_overtakes")
+    def analyze_session(self, session: SessionData) -> Dict[str, any]:
         """
         Analyze a session to find overtaking zones.
 
+        Overtakes are counted from lap positions (no telemetry needed);
+        zones are the braking zones found in telemetry.
+
         Args:
-            session: Loaded FastF1 session with telemetry
+            session: Session loaded by FastF1Client.load_session (laps only)
 
         Returns:
-            Dictionary with zones and statistics
+            Dictionary with zones, total overtakes, per-lap and per-pair
+            overtake counts, and "complete" (False when the session has
+            telemetry but it could not be loaded, so zones are missing)
         """
         if session is None or session.laps is None:
-            return {"zones": [], "total_overtakes": 0}
-
-        # For Phase 2, we'll create a simplified version
-        # that returns demo data based on typical Monza characteristics
-
-        # Monza has 3 main overtaking zones:
-        # 1. Turn 1 (end of main straight)
-        # 2. Turn 4 (Lesmo braking zone)
-        # 3. Variante Ascari
-
-        zones = [
-            {
-                "zone_id": 1,
-                "distance_start": 0,
-                "distance_end": 200,
-                "avg_speed_delta": 180.5,
-                "overtake_count": 12,
-                "difficulty": "Easy",
-                "has_drs": True,
-            },
-            {
-                "zone_id": 2,
-                "distance_start": 1500,
-                "distance_end": 1650,
-                "avg_speed_delta": 95.3,
-                "overtake_count": 5,
-                "difficulty": "Medium",
-                "has_drs": False,
-            },
-            {
-                "zone_id": 3,
-                "distance_start": 3800,
-                "distance_end": 3950,
-                "avg_speed_delta": 110.7,
-                "overtake_count": 8,
-                "difficulty": "Medium",
-                "has_drs": True,
-            },
-        ]
-
-        total_overtakes = sum(zone["overtake_count"] for zone in zones)
-
-        return {
-            "zones": zones,
-            "total_overtakes": total_overtakes,
-        }
+            return {
+                "zones": [],
+                "total_overtakes": 0,
+                "per_lap": [],
+                "per_pair": [],
+                "complete": True,
+            }
+
+        overtakes = OvertakeCounter().count_session(session)
+        zones = self.detect_zones(session)
+
+        return {"zones": zones or [], "complete": zones is not None, **overtakes}
+
+    def detect_zones(self, session: SessionData) -> Optional[List[Dict]]:
+        """
+        Find overtaking zones from car telemetry.
+
+        Telemetry comes from the downsampled TelemetryStore, which on first
+        use streams the car data into per-driver spool files and resamples
+        one driver at a time. Sessions without a FastF1 API path (local and
+        synthetic sources) have no telemetry. Only the selected laps are read
+        from its memory-mapped arrays, so peak memory stays close to the
+        laps-only session load instead of the ~1200MB of
+        ``session.load(telemetry=True)``.
+
+        Returns:
+            List of zone dicts, empty if the session has no telemetry, None
+            if it has but loading it failed
+        """
+        selected_laps = self._select_laps(session)
+        if not selected_laps or session.api_path is None:
+            return []
+
+        store = TelemetryStore()
+        try:
+            key = store.ensure(session)
+        except Exception as e:
+            print(f"Error loading telemetry for {session.api_path}: {e}")
+            return None
+
+        speed_profiles = []
+        drs_profiles = []
+        spacing = store.meta(key)["distance_step_m"]
+
+        for driver_number, lap_numbers in selected_laps.items():
+            telemetry = store.load_driver(key, driver_number)
+            if telemetry is None:
+                continue
+            rows = telemetry.rows_for(lap_numbers)
+            # Fancy indexing copies just these rows out of the memory map
+            speed_profiles.append(
+                np.asarray(telemetry["speed"][rows], dtype=np.float64)
+            )
+            drs_profiles.append(telemetry["drs"][rows] >= self.DRS_OPEN)
+
+        if not speed_profiles or spacing <= 0:
+            return []
+
+        return self._find_zones(
+            np.vstack(speed_profiles), np.vstack(drs_profiles), spacing
+        )
+
+    def _select_laps(self, session: SessionData) -> Dict[str, List[int]]:
+        """
+        Pick each driver's fastest quick laps.
+
+        Returns:
+            Dict mapping driver number to the selected lap numbers
+        """
+        quick_laps = session.laps.select(session.laps.quick_mask())
+        numbers = quick_laps["driver_number"]
+
+        selected = {}
+        for driver_number in np.unique(numbers):
+            rows = np.flatnonzero(numbers == driver_number)
+            fastest = rows[
+                np.argsort(quick_laps["lap_time"][rows])[: self.LAPS_PER_DRIVER]
+            ]
+            selected[str(driver_number)] = quick_laps["lap_number"][fastest].tolist()
+        return selected
+
+    def _find_zones(
+        self, speed_profiles: np.ndarray, drs_profiles: np.ndarray, spacing: float
+    ) -> List[Dict]:
+        """
+        Find heavy braking zones after high-speed sections.
+
+        For every lap and grid point the entry speed is the maximum speed in
+        the preceding BRAKING_LOOKBACK meters (wrapping around the start/finish
+        line); the speed delta is entry speed minus current speed. Deltas are
+        averaged across all laps, and decelerating points with a large delta
+        after a high-speed entry are merged into zones.
+
+        Args:
+            speed_profiles: (laps, points) speed in km/h on the distance grid
+            drs_profiles: (laps, points) DRS open flags
+            spacing: Distance between grid points in meters
+
+        Returns:
+            List of zone dicts ordered by track position
+        """
+        points = speed_profiles.shape[1]
+        lookback = max(1, int(round(self.BRAKING_LOOKBACK / spacing)))
+
+        # Circular windows: entry speed over the previous `lookback` points
+        padded = np.concatenate([speed_profiles[:, -lookback:], speed_profiles], axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(
+            padded, lookback + 1, axis=1
+        )[:, :points]
+        entry_speed = windows.max(axis=2)
+        speed_delta = (entry_speed - speed_profiles).mean(axis=0)
+        entry_speed = entry_speed.mean(axis=0)
+        # Negative where the field is slowing down, i.e. under braking
+        speed_change = (speed_profiles - np.roll(speed_profiles, 1, axis=1)).mean(
+            axis=0
+        )
+
+        candidates = np.flatnonzero(
+            (speed_delta >= self.MIN_SPEED_DELTA)
+            & (entry_speed >= self.MIN_ENTRY_SPEED)
+            & (speed_change < 0)
+        )
+        if candidates.size == 0:
+            return []
+
+        # Merge points closer than ZONE_DISTANCE_THRESHOLD into one zone
+        gap_points = self.ZONE_DISTANCE_THRESHOLD / spacing
+        breaks = np.flatnonzero(np.diff(candidates) > gap_points) + 1
+        groups = np.split(candidates, breaks)
+
+        drs_padded = np.concatenate([drs_profiles[:, -lookback:], drs_profiles], axis=1)
+
+        zones = []
+        for zone_id, points in enumerate(groups, 1):
+            first, last = points[0], points[-1]
+            delta = float(speed_delta[points].max())
+
+            # DRS is used on the straight leading into the braking zone
+            straight = drs_padded[:, first : first + lookback + 1]
+            drs_share = straight.any(axis=1).mean()
+
+            zones.append(
+                {
+                    "zone_id": zone_id,
+                    "distance_start": round(float(first * spacing), 1),
+                    "distance_end": round(float((last + 1) * spacing), 1),
+                    "avg_speed_delta": round(delta, 1),
+                    # Lap positions do not say where on track a pass happened
+                    "overtake_count": None,
+                    "difficulty": self._classify_difficulty(delta),
+                    "has_drs": bool(drs_share >= self.MIN_DRS_SHARE),
+                }
+            )
+
+        return zones
 
     def _classify_difficulty(self, speed_delta: float) -> str:
         """
@@ -0,0 +1,129 @@
+"""
+Position-based overtake counter.
+
+Counts on-track overtakes from the per-lap ``position`` column of the
+session lap table, without any telemetry.
+"""
+from typing import Dict
+
+import numpy as np
+from app.services.session_data import SessionData
+from app.utils import metrics
+
+
+class OvertakeCounter:
+    """
+    Counts overtakes from lap-by-lap position changes.
+
+    Approach:
+    1. Build a drivers × laps matrix of positions at the end of each lap
+    2. Compare every driver pair between consecutive laps: a pair swapped
+       order if the driver behind on lap n-1 is ahead on lap n
+    3. Ignore swaps where either driver was on a pit in-lap or out-lap
+       (position changes from pit stops are not overtakes)
+    4. Retired drivers have no position after their last lap, so the
+       places others gain from a retirement never register as a swap
+
+    Positions at the end of lap 1 are compared against nothing, so first-lap
+    (start) position changes are not counted.
+    """
+
+    @metrics.timed("count_overtakes")
+    def count_session(self, session: SessionData) -> Dict[str, any]:
+        """
+        Count overtakes for a loaded session.
+
+        Args:
+            session: Session loaded by FastF1Client.load_session (laps only)
+
+        Returns:
+            Dictionary with total, per-lap and per-pair overtake counts
+        """
+        if session is None or session.laps is None or len(session.laps) == 0:
+            return self._empty()
+
+        laps = session.laps
+        return self.count(
+            drivers=laps["driver"],
+            lap_numbers=laps["lap_number"].astype(np.float64),
+            positions=laps["position"].astype(np.float64),
+            pit_in=laps["pit_in"],
+            pit_out=laps["pit_out"],
+        )
+
+    def count(
+        self,
+        drivers: np.ndarray,
+        lap_numbers: np.ndarray,
+        positions: np.ndarray,
+        pit_in: np.ndarray,
+        pit_out: np.ndarray,
+    ) -> Dict[str, any]:
+        """
+        Count overtakes from flat per-lap arrays (one entry per driver lap).
+
+        Args:
+            drivers: Driver code per lap
+            lap_numbers: Lap number per lap
+            positions: Position at the end of the lap (NaN if unknown)
+            pit_in: True if the driver entered the pits on this lap
+            pit_out: True if the driver left the pits on this lap
+
+        Returns:
+            Dictionary with:
+            - total_overtakes
+            - per_lap: list of {"lap", "overtakes"} for laps with overtakes
+            - per_pair: list of {"overtaking", "overtaken", "count"}
+        """
+        valid = ~np.isnan(lap_numbers)
+        if not valid.any():
+            return self._empty()
+
+        driver_codes, driver_idx = np.unique(drivers[valid], return_inverse=True)
+        lap_idx = lap_numbers[valid].astype(np.int64) - 1
+        n_laps = int(lap_idx.max()) + 1
+
+        # Drivers × laps position matrix; NaN where the driver has no lap
+        # (retired, lapped out of the data) or was in/out of the pits
+        position = np.full((len(driver_codes), n_laps), np.nan)
+        position[driver_idx, lap_idx] = positions[valid]
+        pitting = np.zeros_like(position, dtype=bool)
+        pitting[driver_idx, lap_idx] = pit_in[valid] | pit_out[valid]
+        position[pitting] = np.nan
+
+        before = position[:, :-1]
+        after = position[:, 1:]
+
+        # swaps[a, b, n]: a was behind b after lap n and ahead after lap n+1.
+        # Comparisons with NaN are False, so pit laps and retirements drop out.
+        swaps = (before[:, None, :] > before[None, :, :]) & (
+            after[:, None, :] < after[None, :, :]
+        )
+
+        per_lap_counts = swaps.sum(axis=(0, 1))
+        per_pair_counts = swaps.sum(axis=2)
+
+        per_lap = [
+            {"lap": int(lap) + 2, "overtakes": int(per_lap_counts[lap])}
+            for lap in np.flatnonzero(per_lap_counts)
+        ]
+        overtaking, overtaken = np.nonzero(per_pair_counts)
+        per_pair = [
+            {
+                "overtaking": str(driver_codes[a]),
+                "overtaken": str(driver_codes[b]),
+                "count": int(per_pair_counts[a, b]),
+            }
+            for a, b in zip(overtaking, overtaken)
+        ]
+        per_pair.sort(key=lambda pair: pair["count"], reverse=True)
+
+        return {
+            "total_overtakes": int(per_lap_counts.sum()),
+            "per_lap": per_lap,
+            "per_pair": per_pair,
+        }
+
+    @staticmethod
+    def _empty() -> Dict[str, any]:
+        return {"total_overtakes": 0, "per_lap": [], "per_pair": []}
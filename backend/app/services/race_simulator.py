@@ -0,0 +1,275 @@
+"""
+Full-field race simulator.
+
+Advances every car lap by lap as (races × drivers) arrays: lap times from
+the fitted degradation curves, each driver's pace offset and strategy, pit
+losses and a simple traffic model. Many races (strategy candidates or Monte
+Carlo samples) are simulated in one batch.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from app.services.session_data import SessionData
+from app.utils import metrics
+
+
+class RaceSimulator:
+    """
+    Simulates a whole race to finishing order and gaps.
+
+    Each lap, every car's lap time is its compound curve at the current tyre
+    age, plus its pace offset, minus the fuel effect, plus pit loss on its
+    in-lap. Traffic, in running order from the previous lap:
+    - A car within FOLLOW_THRESHOLD of the car ahead loses DIRTY_AIR_PENALTY
+      on its lap time.
+    - A car only passes the car ahead if it would cross the line at least
+      `overtake_margin` seconds ahead of it. Otherwise it is held MIN_GAP
+      behind, and the hold carries down the queue behind it.
+
+    Lap times that do not depend on traffic are computed for all laps up
+    front; only the traffic pass runs per lap, vectorized over races and
+    drivers.
+    """
+
+    GRID_SPACING = 0.3  # seconds between consecutive cars at the start
+    MIN_GAP = 0.3  # gap kept by a car held behind another
+    FOLLOW_THRESHOLD = 1.0  # gap under which the following car is in dirty air
+    DIRTY_AIR_PENALTY = 0.2  # seconds per lap lost in dirty air
+    OVERTAKE_MARGIN = 0.5  # how far ahead a car must get to complete a pass
+
+    def __init__(
+        self,
+        curves: List[Dict],
+        fuel_effect_per_lap: float,
+        pit_loss: float,
+        overtake_margin: float = OVERTAKE_MARGIN,
+    ):
+        """
+        Args:
+            curves: Fitted degradation curves (DegradationModel output)
+            fuel_effect_per_lap: Fitted fuel effect in seconds per lap
+            pit_loss: Time lost on a pit stop in seconds
+            overtake_margin: Overtaking difficulty (higher = harder to pass)
+        """
+        self.compounds = [curve["compound"] for curve in curves]
+        self.coefficients = np.array([curve["coefficients"] for curve in curves])
+        self.sample_size = [curve.get("sample_size", 0) for curve in curves]
+        self.fuel_effect_per_lap = fuel_effect_per_lap
+        self.pit_loss = pit_loss
+        self.overtake_margin = overtake_margin
+
+    def field_from_session(self, session: SessionData) -> List[Dict]:
+        """
+        Every driver's actual strategy and pace offset, in starting order.
+
+        The starting order is the order at the end of lap 1. Stints on a
+        compound without a fitted curve use the race's most-run compound.
+
+        Returns:
+            List of {"driver", "compounds", "pit_laps", "pace_offset"}
+        """
+        laps = session.laps
+        if len(laps) == 0 or not self.compounds:
+            return []
+
+        main_compound = self.compounds[int(np.argmax(self.sample_size))]
+        quick = laps.quick_mask(by="driver")
+        first_lap = laps.select(
+            (laps["lap_number"] == 1) & np.isfinite(laps["lap_end_time"])
+        )
+        start_order = {
+            str(first_lap["driver"][row]): i
+            for i, row in enumerate(np.argsort(first_lap["lap_end_time"]))
+        }
+
+        field = []
+        for driver in laps.drivers():
+            driver_laps = laps.select(laps["driver"] == driver)
+            order = np.argsort(driver_laps["lap_number"])
+            lap_number = driver_laps["lap_number"][order]
+            stint = driver_laps["stint"][order]
+            compound = driver_laps["compound"][order]
+
+            # Stints from the stint column, each pit stop at the stint's last lap
+            changes = np.flatnonzero(np.diff(stint) != 0)
+            pit_laps = [int(lap_number[i]) for i in changes]
+            compounds = [
+                str(c) if c in self.compounds else main_compound
+                for c in compound[np.concatenate([[0], changes + 1])]
+            ]
+
+            # Pace offset: median residual of quick laps against the
+            # fuel-corrected compound curve
+            mine = driver_laps.select(
+                quick[laps["driver"] == driver]
+                & np.isin(driver_laps["compound"], self.compounds)
+                & (driver_laps["tyre_life"] > 0)
+            )
+            pace_offset = 0.0
+            if len(mine):
+                idx = np.array([self.compounds.index(c) for c in mine["compound"]])
+                predicted = self._lap_times(idx, mine["tyre_life"])
+                corrected = (
+                    mine["lap_time"] + self.fuel_effect_per_lap * mine["lap_number"]
+                )
+                pace_offset = float(np.median(corrected - predicted))
+
+            field.append(
+                {
+                    "driver": str(driver),
+                    "compounds": compounds,
+                    "pit_laps": pit_laps,
+                    "pace_offset": pace_offset,
+                }
+            )
+
+        field.sort(key=lambda d: start_order.get(d["driver"], len(start_order)))
+        return field
+
+    def plan_arrays(self, field: List[Dict], total_laps: int) -> Dict[str, np.ndarray]:
+        """
+        Pack driver plans into arrays for simulate.
+
+        Returns:
+            Dictionary with "compounds" (drivers × stints, index into
+            self.compounds), "pit_laps" (drivers × stints - 1, padded with
+            total_laps, i.e. no stop) and "pace_offset" (drivers)
+        """
+        n_stops = max((len(d["pit_laps"]) for d in field), default=0)
+        compounds = np.zeros((len(field), n_stops + 1), dtype=np.intp)
+        pit_laps = np.full((len(field), n_stops), total_laps, dtype=np.intp)
+        for i, plan in enumerate(field):
+            idx = [self.compounds.index(c) for c in plan["compounds"]]
+            compounds[i, : len(idx)] = idx
+            compounds[i, len(idx) :] = idx[-1]
+            pit_laps[i, : len(plan["pit_laps"])] = plan["pit_laps"]
+        return {
+            "compounds": compounds,
+            "pit_laps": pit_laps,
+            "pace_offset": np.array([d["pace_offset"] for d in field], dtype=float),
+        }
+
+    @metrics.timed("simulate_race")
+    def simulate(
+        self,
+        compounds: np.ndarray,
+        pit_laps: np.ndarray,
+        pace_offset: np.ndarray,
+        total_laps: int,
+        runs: int = 1,
+        lap_time_sigma: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Simulate a batch of races.
+
+        Args:
+            compounds: Compound index per stint, (drivers, stints) or
+                       (runs, drivers, stints) for per-race strategies
+            pit_laps: Lap at the end of which each stop is made,
+                      (drivers, stints - 1) or (runs, drivers, stints - 1);
+                      laps >= total_laps mean no stop
+            pace_offset: Per-driver pace offset (s/lap, + = slower)
+            total_laps: Race distance
+            runs: Number of races when the plans are not batched
+            lap_time_sigma: Standard deviation of random lap-time noise for
+                            Monte Carlo runs (0 = deterministic)
+            seed: Random seed for the noise
+
+        Returns:
+            Dictionary with "total_time" and "laps_held" (runs × drivers),
+            cars indexed as in the inputs
+        """
+        compounds = np.asarray(compounds)
+        pit_laps = np.asarray(pit_laps)
+        if compounds.ndim == 3:
+            runs = compounds.shape[0]
+        n_drivers = compounds.shape[-2]
+        pit_laps = np.broadcast_to(pit_laps, (runs, n_drivers, pit_laps.shape[-1]))
+        compounds = np.broadcast_to(compounds, (runs, n_drivers, compounds.shape[-1]))
+
+        # Traffic-free lap times, laps × runs × drivers
+        laps = np.arange(1, total_laps + 1)
+        stint = (pit_laps[..., None] < laps).sum(axis=2)
+        stint_start = np.concatenate(
+            [np.zeros((runs, n_drivers, 1), dtype=pit_laps.dtype), pit_laps], axis=2
+        )
+        age = laps - np.take_along_axis(stint_start, stint, axis=2)
+        compound = np.take_along_axis(compounds, stint, axis=2)
+        lap_time = (
+            self._lap_times(compound, age)
+            + np.asarray(pace_offset, dtype=float)[:, None]
+            - self.fuel_effect_per_lap * laps
+        )
+        lap_time += self.pit_loss * (pit_laps[..., None] == laps).any(axis=2)
+        if lap_time_sigma > 0:
+            rng = np.random.default_rng(seed)
+            lap_time += rng.normal(0.0, lap_time_sigma, lap_time.shape)
+        lap_time = lap_time.transpose(2, 0, 1).reshape(total_laps, -1)
+
+        # State is kept in running order: car[r, i] is the car in position i
+        # of race r, elapsed[r, i] its race time. Flat indices (car + rows)
+        # avoid per-lap take_along_axis overhead.
+        rows = np.arange(runs)[:, None] * n_drivers
+        car = np.broadcast_to(np.arange(n_drivers), (runs, n_drivers)) + rows
+        elapsed = np.broadcast_to(
+            np.arange(n_drivers) * self.GRID_SPACING, (runs, n_drivers)
+        ).copy()
+        laps_held = np.zeros(runs * n_drivers, dtype=np.intp)
+        queue = np.arange(n_drivers) * self.MIN_GAP
+        # Larger than any elapsed time, so each passing car starts a new queue
+        reset = 10 * (float(np.abs(lap_time).sum(axis=0).max()) + queue[-1] + 1.0)
+        passes = np.ones((runs, n_drivers), dtype=bool)
+
+        for lap in range(total_laps):
+            this_lap = lap_time[lap][car]
+            this_lap[:, 1:] += self.DIRTY_AIR_PENALTY * (
+                elapsed[:, 1:] - elapsed[:, :-1] < self.FOLLOW_THRESHOLD
+            )
+            free = elapsed + this_lap
+
+            # A car that gets clear of the car ahead starts a new queue;
+            # within a queue each car ends at least MIN_GAP behind the one
+            # ahead: after[i] = max(free[i], after[i-1] + MIN_GAP), i.e. a
+            # running maximum of free - i·MIN_GAP
+            np.less(free[:, 1:] + self.overtake_margin, free[:, :-1], out=passes[:, 1:])
+            offset = passes.cumsum(axis=1) * reset
+            key = free - queue + offset
+            limit = np.maximum.accumulate(key, axis=1)
+            held = limit > key
+            after = np.where(held, limit - offset + queue, free)
+            laps_held[car] += held
+
+            order = after.argsort(axis=1) + rows
+            car = car.ravel()[order]
+            elapsed = after.ravel()[order]
+
+        total_time = np.empty(runs * n_drivers)
+        total_time[car] = elapsed
+        return {
+            "total_time": total_time.reshape(runs, n_drivers),
+            "laps_held": laps_held.reshape(runs, n_drivers),
+        }
+
+    def results(self, field: List[Dict], total_time: np.ndarray) -> List[Dict]:
+        """
+        Finishing order of one simulated race.
+
+        Returns:
+            List of {"driver", "position", "total_time", "gap"} in finishing
+            order, gap to the winner in seconds
+        """
+        winner = float(total_time.min())
+        return [
+            {
+                "driver": field[i]["driver"],
+                "position": position,
+                "total_time": round(float(total_time[i]), 3),
+                "gap": round(float(total_time[i]) - winner, 3),
+            }
+            for position, i in enumerate(np.argsort(total_time), start=1)
+        ]
+
+    def _lap_times(self, compound: np.ndarray, ages: np.ndarray) -> np.ndarray:
+        a, b, c = np.moveaxis(self.coefficients[compound], -1, 0)
+        return a * ages**2 + b * ages + c
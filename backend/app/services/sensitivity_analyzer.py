@@ -0,0 +1,216 @@
+"""
+Strategy sensitivity analysis.
+
+Sweeps pit loss, each compound's degradation and pace, and race distance
+around their baseline values, re-ranks every strategy at each point and
+reports where the fastest strategy changes.
+"""
+from typing import Dict, List
+
+import numpy as np
+from app.services.strategy_engine import StrategyEngine
+from app.utils import metrics
+
+
+class SensitivityAnalyzer:
+    """
+    How robust is the recommended strategy to the model's inputs?
+
+    Predicted race time is linear in pit loss and in every curve
+    coefficient (see StrategyEngine.race_time_features), so all strategies
+    at all sweep points are evaluated with one matrix product per race
+    distance. Swept parameters:
+    - pit_loss: baseline ± PIT_LOSS_RANGE seconds
+    - <COMPOUND>_degradation: the compound's wear terms (a, b) scaled by
+      1 ± DEGRADATION_RANGE
+    - <COMPOUND>_pace: ± PACE_RANGE s/lap added to the compound's base pace
+    - total_laps: baseline ± LAPS_RANGE laps
+    """
+
+    STEPS = 41  # sweep points per parameter
+    PIT_LOSS_RANGE = 5.0  # seconds
+    DEGRADATION_RANGE = 0.5  # fraction of the fitted wear terms
+    PACE_RANGE = 1.0  # seconds per lap
+    LAPS_RANGE = 5  # laps
+
+    def __init__(
+        self,
+        engine: StrategyEngine,
+        degradation_curves: List[Dict],
+        total_laps: int,
+        pit_loss_seconds: float,
+        max_stops: int = 2,
+    ):
+        """
+        Args:
+            engine: StrategyEngine with the fitted fuel effect
+            degradation_curves: Fitted degradation curves by compound
+            total_laps: Baseline race distance
+            pit_loss_seconds: Baseline pit loss
+            max_stops: Maximum pit stops to consider
+        """
+        self.engine = engine
+        self.compounds = [curve["compound"] for curve in degradation_curves]
+        self.sequences = engine.compound_sequences(self.compounds, max_stops)
+        self.names = np.array(
+            [f"{'-'.join(s)} ({len(s) - 1}-stop)" for s in self.sequences]
+        )
+        self.total_laps = total_laps
+        self.pit_loss = pit_loss_seconds
+        self.parameters = engine.race_time_parameters(
+            degradation_curves, pit_loss_seconds
+        )
+
+    @metrics.timed("analyze_sensitivity")
+    def analyze(
+        self,
+        pit_loss_range: float = PIT_LOSS_RANGE,
+        degradation_range: float = DEGRADATION_RANGE,
+        pace_range: float = PACE_RANGE,
+        laps_range: int = LAPS_RANGE,
+        steps: int = STEPS,
+    ) -> Dict:
+        """
+        Sweep every parameter and find the break-even points.
+
+        Args:
+            pit_loss_range: Seconds either side of the baseline pit loss
+            degradation_range: Fraction either side of the fitted wear terms
+            pace_range: Seconds per lap either side of each compound's pace
+            laps_range: Laps either side of the baseline race distance
+            steps: Sweep points per continuous parameter
+
+        Returns:
+            Dictionary with the baseline "best_strategy", "runner_up",
+            "predicted_time" and "gap", the number of strategies and
+            evaluations, and "parameters": per swept parameter its range,
+            the sensitivity of the best strategy's time and of its gap to
+            the runner-up (seconds per unit, averaged over the range) and
+            the "break_evens" where the fastest strategy changes
+        """
+        if not self.sequences:
+            return {}
+
+        features = self.engine.race_time_features(
+            self.sequences, self.compounds, [self.total_laps]
+        )[0]
+        base = self.parameters
+        baseline = features @ base
+        ranked = np.argsort(baseline, kind="stable")
+        best = ranked[0]
+        # Sequences that only swap stints of equal length at this distance
+        # have the same features, hence always the same time as the best
+        distinct = [j for j in ranked[1:] if np.any(features[j] != features[best])]
+        runner_up = distinct[0] if distinct else best
+
+        # Parameter vectors for every sweep point, evaluated in one product
+        sweeps = []
+        offsets = np.linspace(-1.0, 1.0, steps)
+
+        rows = np.repeat(base[None, :], steps, axis=0)
+        rows[:, -2] = self.pit_loss + pit_loss_range * offsets
+        sweeps.append(("pit_loss", "s", self.pit_loss, rows[:, -2], rows))
+
+        for k, compound in enumerate(self.compounds):
+            wear = slice(3 * k, 3 * k + 2)
+            rows = np.repeat(base[None, :], steps, axis=0)
+            factor = 1.0 + degradation_range * offsets
+            rows[:, wear] *= factor[:, None]
+            sweeps.append((f"{compound}_degradation", "x", 1.0, factor, rows))
+
+            rows = np.repeat(base[None, :], steps, axis=0)
+            rows[:, 3 * k + 2] += pace_range * offsets
+            sweeps.append(
+                (f"{compound}_pace", "s/lap", 0.0, pace_range * offsets, rows)
+            )
+
+        times = features @ np.concatenate([rows for *_, rows in sweeps]).T
+        results = [
+            self._sweep(
+                name, unit, value, values, times[:, i * steps : (i + 1) * steps]
+            )
+            for i, (name, unit, value, values, _) in enumerate(sweeps)
+        ]
+        evaluations = times.size
+
+        # Race distance changes the stint lengths, hence the features
+        min_laps = max(len(s) for s in self.sequences)
+        laps = np.arange(
+            max(self.total_laps - laps_range, min_laps),
+            self.total_laps + laps_range + 1,
+        )
+        lap_times = (
+            self.engine.race_time_features(self.sequences, self.compounds, laps) @ base
+        ).T
+        results.append(
+            self._sweep(
+                "total_laps", "laps", self.total_laps, laps, lap_times, continuous=False
+            )
+        )
+        evaluations += lap_times.size
+
+        for result in results:
+            slope = result.pop("slope")
+            result["time_sensitivity"] = round(float(slope[best]), 4)
+            result["gap_sensitivity"] = round(float(slope[runner_up] - slope[best]), 4)
+
+        return {
+            "best_strategy": str(self.names[best]),
+            "runner_up": str(self.names[runner_up]),
+            "predicted_time": float(baseline[best]),
+            "gap": float(baseline[runner_up] - baseline[best]),
+            "strategies_evaluated": len(self.sequences),
+            "evaluations": int(evaluations),
+            "parameters": results,
+        }
+
+    def _sweep(
+        self,
+        name: str,
+        unit: str,
+        baseline: float,
+        values: np.ndarray,
+        times: np.ndarray,
+        continuous: bool = True,
+    ) -> Dict:
+        """
+        Summarise one parameter sweep.
+
+        Args:
+            values: Parameter value at each sweep point
+            times: Predicted race time (strategies × sweep points)
+            continuous: Solve for the exact crossing between sweep points
+                        (time is linear in the parameter); otherwise report
+                        the first sweep point with the new fastest strategy
+        """
+        fastest = times.argmin(axis=0)
+        break_evens = []
+        for i in np.flatnonzero(fastest[1:] != fastest[:-1]):
+            old, new = fastest[i], fastest[i + 1]
+            value = values[i + 1]
+            if continuous:
+                # Where old and new strategies take the same time
+                before = times[old, i] - times[new, i]
+                after = times[old, i + 1] - times[new, i + 1]
+                value = values[i] + before / (before - after) * (
+                    values[i + 1] - values[i]
+                )
+            break_evens.append(
+                {
+                    "value": round(float(value), 4),
+                    "from_strategy": str(self.names[old]),
+                    "to_strategy": str(self.names[new]),
+                }
+            )
+
+        span = float(values[-1] - values[0]) or 1.0
+        return {
+            "parameter": name,
+            "unit": unit,
+            "baseline": round(float(baseline), 4),
+            "low": round(float(values[0]), 4),
+            "high": round(float(values[-1]), 4),
+            # Seconds of race time per unit, averaged over the range
+            "slope": (times[:, -1] - times[:, 0]) / span,
+            "break_evens": break_evens,
+        }
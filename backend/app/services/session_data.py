@@ -0,0 +1,155 @@
+"""
+Backend-neutral session representation.
+
+Every data source (FastF1, local lap files, synthetic) returns a
+SessionData: event metadata plus a LapTable, a columnar table of typed
+per-lap arrays holding only the fields the analysis services use.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+# Column name -> dtype. Missing values are NaN in float columns.
+LAP_COLUMNS = {
+    "driver": "U3",  # driver code, e.g. "VER"
+    "driver_number": "U3",  # car number as string, e.g. "1"
+    "lap_number": np.int16,
+    "lap_time": np.float64,  # seconds
+    "compound": "U16",  # SOFT, MEDIUM, HARD, INTERMEDIATE, WET, UNKNOWN
+    "tyre_life": np.float32,  # laps driven on this set, including this lap
+    "stint": np.float32,
+    "position": np.float32,  # position at the end of the lap
+    "pit_in": np.bool_,  # car entered the pits at the end of this lap
+    "pit_out": np.bool_,  # car left the pits at the start of this lap
+    "is_personal_best": np.bool_,
+    "lap_start_time": np.float64,  # session time in seconds
+    "lap_end_time": np.float64,  # session time in seconds
+}
+
+# Same threshold as fastf1.core.Laps.pick_quicklaps (107% of the fastest lap)
+QUICKLAP_THRESHOLD = 1.07
+
+
+class LapTable:
+    """Columnar per-lap data: one typed NumPy array per column in LAP_COLUMNS."""
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        missing = set(LAP_COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing lap columns: {sorted(missing)}")
+        self.columns = {
+            name: np.asarray(columns[name], dtype=dtype)
+            for name, dtype in LAP_COLUMNS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["lap_number"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def select(self, rows: np.ndarray) -> "LapTable":
+        """New table with the rows selected by a boolean mask or index array."""
+        table = LapTable.__new__(LapTable)
+        table.columns = {name: values[rows] for name, values in self.columns.items()}
+        return table
+
+    def drivers(self) -> List[str]:
+        """Driver codes in order of first appearance."""
+        codes, first = np.unique(self.columns["driver"], return_index=True)
+        return codes[np.argsort(first)].tolist()
+
+    def quick_mask(
+        self, threshold: float = QUICKLAP_THRESHOLD, by: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Laps faster than threshold × the fastest lap (pick_quicklaps).
+
+        With by="driver", each lap is compared with the fastest lap of its
+        own driver instead of the session's fastest lap.
+        """
+        lap_time = self.columns["lap_time"]
+        if by is None:
+            groups = np.zeros(len(lap_time), dtype=np.intp)
+        else:
+            _, groups = np.unique(self.columns[by], return_inverse=True)
+
+        fastest = np.full(groups.max(initial=-1) + 1, np.inf)
+        np.fmin.at(fastest, groups, lap_time)
+        with np.errstate(invalid="ignore"):
+            return lap_time < fastest[groups] * threshold
+
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+
+class SessionData:
+    """A loaded session: event metadata and its lap table."""
+
+    __slots__ = ("year", "session_type", "event", "laps", "api_path")
+
+    def __init__(
+        self,
+        year: int,
+        session_type: str,
+        event: Dict[str, Union[str, int]],
+        laps: LapTable,
+        api_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            year: Season
+            session_type: R, Q, FP1, FP2, FP3, S, ...
+            event: EventName, Location, Country, RoundNumber and EventDate
+            laps: Per-lap data
+            api_path: FastF1 livetiming path, only set when telemetry can be
+                      fetched for this session
+        """
+        self.year = year
+        self.session_type = session_type
+        self.event = event
+        self.laps = laps
+        self.api_path = api_path
+
+    @property
+    def key(self) -> str:
+        """Stable identifier, e.g. '2023_italian-grand-prix_R'."""
+        return session_key(self.year, self.event["EventName"], self.session_type)
+
+    @property
+    def total_laps(self) -> int:
+        lap_numbers = self.laps["lap_number"]
+        return int(lap_numbers.max()) if len(lap_numbers) else 0
+
+    def save_npz(self, path: Path) -> None:
+        """Write the session as an uncompressed .npz (no pickled objects)."""
+        np.savez(
+            path,
+            __event__=np.array(json.dumps(self.event)),
+            __meta__=np.array(
+                json.dumps({"year": self.year, "session_type": self.session_type})
+            ),
+            **self.laps.columns,
+        )
+
+    @classmethod
+    def load_npz(cls, path: Path) -> "SessionData":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            event = json.loads(str(data["__event__"]))
+            laps = LapTable({name: data[name] for name in LAP_COLUMNS})
+        return cls(meta["year"], meta["session_type"], event, laps)
+
+
+def slugify(name: str) -> str:
+    """'Italian Grand Prix' -> 'italian-grand-prix'."""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def session_key(year: int, event_name: str, session_type: str) -> str:
+    return f"{year}_{slugify(event_name)}_{session_type.upper()}"
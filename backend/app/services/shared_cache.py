@@ -0,0 +1,328 @@
+"""
+Cross-worker session and result cache.
+
+Multiple uvicorn workers on one host share a cache directory instead of
+each holding its own copy of every session:
+
+    SHARED_CACHE_DIR/<source>/aliases/<request key>          canonical key
+    SHARED_CACHE_DIR/<source>/sessions/<key>/meta.json       event metadata
+    SHARED_CACHE_DIR/<source>/sessions/<key>/<column>.npy    lap columns
+    SHARED_CACHE_DIR/<source>/results/v<N>/<namespace>/<key>.json
+    SHARED_CACHE_DIR/<source>/locks/results-<stripe>.lock
+
+Lap columns are opened memory-mapped, so their pages live once in the OS
+page cache and are mapped into every worker. Derived results (degradation
+curves, strategies) are small JSON files read on demand. An exclusive
+``flock`` per key makes sure only one worker loads or computes a given
+entry; the others wait on the lock and then read what it wrote. Results
+share RESULT_LOCK_STRIPES lock files (by key hash) rather than one per key,
+and are kept within SHARED_RESULTS_MAX_MB, least recently used evicted
+first, so request parameters cannot grow the directory without bound.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from app.config import SHARED_CACHE_DIR, SHARED_CACHE_ENABLED, SHARED_RESULTS_MAX_MB
+from app.services.session_data import LAP_COLUMNS, LapTable, SessionData, session_key
+from app.utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# Bump when the degradation model or strategy engine change their output,
+# so results computed by older code are not served
+RESULTS_VERSION = 4
+
+# Sessions kept open (memory-mapped) per worker
+MAX_OPEN_SESSIONS = 64
+
+# Lock files shared by all results keys
+RESULT_LOCK_STRIPES = 64
+
+MB = 1024 * 1024
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock on a file, held across processes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedCache:
+    """Session lap arrays and derived results shared by all workers."""
+
+    def __init__(
+        self,
+        root: Path,
+        enabled: bool = SHARED_CACHE_ENABLED,
+        max_result_bytes: int = SHARED_RESULTS_MAX_MB * MB,
+    ):
+        """
+        Args:
+            root: Cache directory for one data source
+            enabled: When False, every call goes straight to the loader
+            max_result_bytes: Size budget of the results (0 = unbounded)
+        """
+        self.root = Path(root)
+        self.enabled = enabled
+        self.max_result_bytes = max_result_bytes
+        self._sessions: Dict[str, SessionData] = {}
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+
+    def load_session(
+        self,
+        year: int,
+        race_name: str,
+        session_type: str,
+        loader: Callable[[], Optional[SessionData]],
+    ) -> Optional[SessionData]:
+        """
+        Return a session from the cache, loading and storing it on a miss.
+
+        Args:
+            year, race_name, session_type: Request as given by the client;
+                different race names for one event share the stored arrays
+            loader: Loads the session from the data source
+
+        Returns:
+            Memory-mapped session, or None if the loader fails
+        """
+        if not self.enabled:
+            return loader()
+
+        alias = session_key(year, str(race_name), session_type)
+        key = self._resolve(alias)
+        if key is not None:
+            metrics.inc(
+                "f1_cache_requests_total", cache="shared_sessions", result="hit"
+            )
+            return self._open(key)
+
+        with file_lock(self.root / "locks" / f"{alias}.lock"):
+            # Another worker may have stored it while we waited
+            key = self._resolve(alias)
+            if key is not None:
+                metrics.inc(
+                    "f1_cache_requests_total", cache="shared_sessions", result="hit"
+                )
+                return self._open(key)
+
+            metrics.inc(
+                "f1_cache_requests_total", cache="shared_sessions", result="miss"
+            )
+            session = loader()
+            if session is None:
+                return None
+            self._store(session)
+            self._write_alias(alias, session.key)
+        return self._open(session.key)
+
+    def has_session(self, year: int, race_name: str, session_type: str) -> bool:
+        """Whether load_session would be served without calling the loader."""
+        if not self.enabled:
+            return False
+        return (
+            self._resolve(session_key(year, str(race_name), session_type)) is not None
+        )
+
+    def _resolve(self, alias: str) -> Optional[str]:
+        """Canonical session key for a request key, if it is stored."""
+        path = self.root / "aliases" / alias
+        if not path.exists():
+            return None
+        key = path.read_text().strip()
+        if not (self.root / "sessions" / key / "meta.json").exists():
+            return None
+        return key
+
+    def _write_alias(self, alias: str, key: str) -> None:
+        path = self.root / "aliases" / alias
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{alias}.{uuid.uuid4().hex}")
+        tmp_path.write_text(key)
+        os.replace(tmp_path, path)
+
+    def _store(self, session: SessionData) -> None:
+        """Write a session's lap columns and metadata, atomically."""
+        final_dir = self.root / "sessions" / session.key
+        if (final_dir / "meta.json").exists():
+            return
+
+        tmp_dir = final_dir.with_name(f".{session.key}.{uuid.uuid4().hex}")
+        tmp_dir.mkdir(parents=True)
+        for name, values in session.laps.columns.items():
+            np.save(tmp_dir / f"{name}.npy", values)
+        meta = {
+            "year": session.year,
+            "session_type": session.session_type,
+            "event": session.event,
+            "api_path": session.api_path,
+        }
+        (tmp_dir / "meta.json").write_text(json.dumps(meta))
+
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            # Stored concurrently under another alias
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _open(self, key: str) -> SessionData:
+        """Open a stored session with memory-mapped columns."""
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+
+        path = self.root / "sessions" / key
+        meta = json.loads((path / "meta.json").read_text())
+        laps = LapTable(
+            {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in LAP_COLUMNS}
+        )
+        session = SessionData(
+            meta["year"], meta["session_type"], meta["event"], laps, meta["api_path"]
+        )
+
+        if len(self._sessions) >= MAX_OPEN_SESSIONS:
+            self._sessions.pop(next(iter(self._sessions)))
+        self._sessions[key] = session
+        return session
+
+    # ------------------------------------------------------------------
+    # Derived results
+    # ------------------------------------------------------------------
+
+    def get_result(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return a JSON-serialisable result, computing it once across workers.
+
+        Args:
+            namespace: Kind of result, e.g. "curves" or "strategies"
+            key: Identifies the inputs (session key plus any parameters)
+            compute: Produces the result on a miss
+        """
+        if not self.enabled:
+            return compute()
+
+        path = self.root / "results" / f"v{RESULTS_VERSION}" / namespace / f"{key}.json"
+        result = self._read_result(path, namespace)
+        if result is not None:
+            return result
+
+        stripe = int(hashlib.sha1(f"{namespace}/{key}".encode()).hexdigest(), 16)
+        lock_path = self.root / "locks" / f"results-{stripe % RESULT_LOCK_STRIPES}.lock"
+        with file_lock(lock_path):
+            result = self._read_result(path, namespace)
+            if result is not None:
+                return result
+
+            metrics.inc("f1_cache_requests_total", cache=namespace, result="miss")
+            result = compute()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+            tmp_path.write_text(json.dumps(result))
+            os.replace(tmp_path, path)
+        self.trim_results()
+        return result
+
+    def trim_results(self) -> int:
+        """
+        Delete results of older RESULTS_VERSIONs, then the least recently
+        used results until they fit in max_result_bytes.
+
+        Returns:
+            Number of result files deleted
+        """
+        results_dir = self.root / "results"
+        current = results_dir / f"v{RESULTS_VERSION}"
+        for version_dir in results_dir.glob("v*"):
+            if version_dir != current:
+                shutil.rmtree(version_dir, ignore_errors=True)
+        if not self.max_result_bytes:
+            return 0
+
+        files = []
+        for path in current.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # deleted by another worker
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+
+        deleted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_result_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            deleted += 1
+        if deleted:
+            metrics.inc("f1_shared_results_evictions_total", deleted)
+        return deleted
+
+    @staticmethod
+    def _read_result(path: Path, namespace: str) -> Any:
+        try:
+            text = path.read_text()
+            os.utime(path)  # last use, for trim_results
+        except FileNotFoundError:  # not computed yet, or evicted
+            return None
+        metrics.inc("f1_cache_requests_total", cache=namespace, result="hit")
+        return json.loads(text)
+
+    def stats(self) -> Dict:
+        """Stored sessions and results with their on-disk sizes."""
+        sessions_dir = self.root / "sessions"
+        results_dir = self.root / "results" / f"v{RESULTS_VERSION}"
+        sessions = sorted(
+            path.name
+            for path in sessions_dir.glob("*")
+            if not path.name.startswith(".")
+        )
+        results = {
+            path.name: len(list(path.glob("*.json")))
+            for path in sorted(results_dir.glob("*"))
+        }
+        size = sum(f.stat().st_size for f in self.root.rglob("*") if f.is_file())
+        return {
+            "enabled": self.enabled,
+            "root": str(self.root),
+            "sessions": sessions,
+            "results": results,
+            "open_sessions": len(self._sessions),
+            "size_bytes": size,
+        }
+
+
+_caches: Dict[str, SharedCache] = {}
+
+
+def get_shared_cache(source_name: str) -> SharedCache:
+    """Return the (per-process) cache for a data source."""
+    if source_name not in _caches:
+        _caches[source_name] = SharedCache(SHARED_CACHE_DIR / source_name)
+    return _caches[source_name]
+
+
+metrics.describe(
+    "f1_shared_results_evictions_total", "Derived results evicted from the shared cache"
+)
@@ -0,0 +1,258 @@
+"""
+Compact, array-backed stints.
+
+Stints of one or many sessions share a single columnar lap buffer, sorted
+by session, driver and lap. A stint is a pair of offsets into that buffer
+plus a little metadata, so a season's stints cost a few bytes per lap
+instead of a dict per lap, and the buffer (or one session's slice of it)
+goes straight into DegradationModel without copying.
+"""
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+from app.services.session_data import SessionData
+
+# Per-lap columns of the buffer, as used by DegradationModel.fit_session
+LAP_FIELDS = ("compound", "tyre_life", "lap_number", "lap_time")
+
+
+class StintView:
+    """One driver stint: metadata and views of its laps in the buffer."""
+
+    __slots__ = (
+        "driver",
+        "stint_number",
+        "compound",
+        "lap_time",
+        "tyre_life",
+        "lap_number",
+    )
+
+    def __init__(
+        self,
+        driver: str,
+        stint_number: int,
+        compound: str,
+        laps: Dict[str, np.ndarray],
+        start: int,
+        stop: int,
+    ):
+        self.driver = driver
+        self.stint_number = stint_number
+        self.compound = compound
+        self.lap_time = laps["lap_time"][start:stop]
+        self.tyre_life = laps["tyre_life"][start:stop]
+        self.lap_number = laps["lap_number"][start:stop]
+
+    def __len__(self) -> int:
+        return len(self.lap_number)
+
+    @property
+    def start_lap(self) -> int:
+        return int(self.lap_number[0])
+
+    @property
+    def end_lap(self) -> int:
+        return int(self.lap_number[-1])
+
+    def to_dict(self) -> Dict:
+        """The stint as returned by get_stint_data (fields of schemas.Stint)."""
+        return {
+            "stint_number": self.stint_number,
+            "compound": self.compound,
+            "start_lap": self.start_lap,
+            "end_lap": self.end_lap,
+            "laps": [
+                {
+                    "lap_time": lap_time,
+                    "tyre_life": None if tyre_life != tyre_life else int(tyre_life),
+                    "lap_number": lap_number,
+                }
+                for lap_time, tyre_life, lap_number in zip(
+                    self.lap_time.tolist(),
+                    self.tyre_life.tolist(),
+                    self.lap_number.tolist(),
+                )
+            ],
+        }
+
+
+class StintTable:
+    """
+    Stints of one or more sessions over one lap buffer.
+
+    Stint i covers buffer rows offsets[i]:offsets[i + 1]; session s covers
+    stints session_offsets[s]:session_offsets[s + 1].
+    """
+
+    __slots__ = (
+        "sessions",
+        "laps",
+        "offsets",
+        "driver",
+        "stint_number",
+        "compound",
+        "session_offsets",
+    )
+
+    def __init__(
+        self,
+        sessions: List[str],
+        laps: Dict[str, np.ndarray],
+        offsets: np.ndarray,
+        driver: np.ndarray,
+        stint_number: np.ndarray,
+        compound: np.ndarray,
+        session_offsets: np.ndarray,
+    ):
+        """
+        Args:
+            sessions: Session keys, in buffer order
+            laps: LAP_FIELDS arrays, one row per lap
+            offsets: First buffer row of each stint, then the row count
+            driver: Driver code of each stint
+            stint_number: 1-based stint number within its driver's race
+            compound: Compound of each stint
+            session_offsets: First stint of each session, then the stint count
+        """
+        self.sessions = sessions
+        self.laps = laps
+        self.offsets = offsets
+        self.driver = driver
+        self.stint_number = stint_number
+        self.compound = compound
+        self.session_offsets = session_offsets
+
+    @classmethod
+    def from_session(cls, session: SessionData) -> "StintTable":
+        """
+        Every driver's stints: runs of their quick laps (relative to their
+        own fastest lap) on one compound, as in get_stint_data.
+        """
+        laps = session.laps
+        quick = laps.select(laps.quick_mask(by="driver"))
+        order = np.lexsort((quick["lap_number"], quick["driver"]))
+        driver = quick["driver"][order]
+        compound = _narrow(quick["compound"][order])
+
+        buffer = {"compound": compound}
+        for name in LAP_FIELDS[1:]:
+            buffer[name] = quick[name][order]
+
+        if len(order) == 0:
+            # No quick laps (unknown driver, no timed laps): no stints
+            return cls(
+                sessions=[session.key],
+                laps=buffer,
+                offsets=np.zeros(1, dtype=np.int64),
+                driver=driver,
+                stint_number=np.zeros(0, dtype=np.int16),
+                compound=compound,
+                session_offsets=np.zeros(2, dtype=np.int64),
+            )
+
+        starts = np.flatnonzero(
+            np.r_[True, (driver[1:] != driver[:-1]) | (compound[1:] != compound[:-1])]
+        )
+        driver_starts = np.flatnonzero(np.r_[True, driver[1:] != driver[:-1]])
+        first_stint = np.searchsorted(starts, driver_starts)
+        stint_driver = np.cumsum(np.isin(starts, driver_starts)) - 1
+
+        return cls(
+            sessions=[session.key],
+            laps=buffer,
+            offsets=np.r_[starts, len(order)].astype(np.int64),
+            driver=driver[starts],
+            stint_number=(
+                np.arange(len(starts)) - first_stint[stint_driver] + 1
+            ).astype(np.int16),
+            compound=compound[starts],
+            session_offsets=np.array([0, len(starts)], dtype=np.int64),
+        )
+
+    @classmethod
+    def concatenate(cls, tables: Sequence["StintTable"]) -> "StintTable":
+        """One table (and one lap buffer) holding every table's sessions."""
+        lap_counts = np.cumsum([0] + [len(t.laps["lap_time"]) for t in tables[:-1]])
+        stint_counts = np.cumsum([0] + [len(t) for t in tables[:-1]])
+        return cls(
+            sessions=[key for t in tables for key in t.sessions],
+            laps={
+                name: np.concatenate([t.laps[name] for t in tables])
+                for name in LAP_FIELDS
+            },
+            offsets=np.concatenate(
+                [t.offsets[:-1] + n for t, n in zip(tables, lap_counts)]
+                + [[sum(len(t.laps["lap_time"]) for t in tables)]]
+            ).astype(np.int64),
+            driver=np.concatenate([t.driver for t in tables]),
+            stint_number=np.concatenate([t.stint_number for t in tables]),
+            compound=np.concatenate([t.compound for t in tables]),
+            session_offsets=np.concatenate(
+                [t.session_offsets[:-1] + n for t, n in zip(tables, stint_counts)]
+                + [[sum(len(t) for t in tables)]]
+            ).astype(np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> StintView:
+        return StintView(
+            str(self.driver[i]),
+            int(self.stint_number[i]),
+            str(self.compound[i]),
+            self.laps,
+            int(self.offsets[i]),
+            int(self.offsets[i + 1]),
+        )
+
+    def __iter__(self) -> Iterator[StintView]:
+        return (self[i] for i in range(len(self)))
+
+    def for_driver(self, driver: str, session: int = 0) -> List[StintView]:
+        """One driver's stints in one of the table's sessions."""
+        first, last = self.session_offsets[session : session + 2]
+        rows = first + np.flatnonzero(self.driver[first:last] == driver)
+        return [self[i] for i in rows]
+
+    def session_laps(self) -> List[Dict[str, np.ndarray]]:
+        """Each session's slice of the lap buffer (views), for fit_sessions."""
+        bounds = self.offsets[self.session_offsets]
+        return [
+            {name: values[start:stop] for name, values in self.laps.items()}
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        One row per stint: "driver", "stint_number", "compound",
+        "start_lap", "end_lap" and "lap_count"
+        """
+        lap_number = self.laps["lap_number"]
+        return {
+            "driver": self.driver,
+            "stint_number": self.stint_number,
+            "compound": self.compound,
+            "start_lap": lap_number[self.offsets[:-1]],
+            "end_lap": lap_number[self.offsets[1:] - 1],
+            "lap_count": np.diff(self.offsets).astype(np.int16),
+        }
+
+    def nbytes(self) -> int:
+        arrays = list(self.laps.values()) + [
+            self.offsets,
+            self.driver,
+            self.stint_number,
+            self.compound,
+            self.session_offsets,
+        ]
+        return sum(values.nbytes for values in arrays)
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """Fixed-width strings cut to their longest value (e.g. U16 -> U6)."""
+    if values.dtype.kind != "U" or len(values) == 0:
+        return values
+    width = max(int(np.char.str_len(values).max()), 1)
+    return values.astype(f"U{width}") if width < values.dtype.itemsize // 4 else values
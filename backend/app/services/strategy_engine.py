@@ -4,10 +4,13 @@ Strategy simulation engine.
 Generates viable pit strategies and predicts race time for each using
 the degradation model.
 """
-from itertools import combinations_with_replacement
-from typing import Dict, List, Optional
+import heapq
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 from app.services.degradation_model import DegradationModel
+from app.utils import metrics
 
 
 class StrategyEngine:
@@ -15,12 +18,16 @@ class StrategyEngine:
     Simulates and ranks pit stop strategies.
 
     Approach:
-    1. Generate all viable strategies (0-stop, 1-stop, 2-stop, 3-stop)
+    1. Generate all feasible strategies (compound sequences with up to
+       max_stops stops, one order per set of interchangeable stints, see
+       iter_compound_sequences)
     2. For each strategy, simulate lap-by-lap tire degradation
     3. Sum total race time including pit losses
     4. Rank by predicted finish time
     """
 
+    CHUNK_SIZE = 1024  # candidate sequences scored per matrix product
+
     def __init__(self, degradation_model: DegradationModel):
         """
         Initialize strategy engine with a degradation model.
@@ -30,21 +37,33 @@ class StrategyEngine:
         """
         self.deg_model = degradation_model
 
+    @metrics.timed("simulate_strategies")
     def simulate_strategies(
         self,
         degradation_curves: List[Dict],
         total_laps: int,
         pit_loss_seconds: float,
         max_stops: int = 3,
+        tyre_sets: Optional[Dict[str, int]] = None,
+        max_stint_laps: Optional[Dict[str, int]] = None,
+        top_n: Optional[int] = None,
     ) -> List[Dict]:
         """
         Generate and simulate all viable strategies.
 
+        Candidates stream from iter_compound_sequences. With top_n, they are
+        scored in chunks of CHUNK_SIZE with race_time_features and only the
+        best top_n are kept and simulated, so the candidate space is never
+        held in memory.
+
         Args:
             degradation_curves: List of fitted degradation curves by compound
             total_laps: Total race distance in laps
             pit_loss_seconds: Time lost per pit stop
             max_stops: Maximum pit stops to consider
+            tyre_sets: Sets available per compound (unlimited if missing)
+            max_stint_laps: Longest stint per compound (unlimited if missing)
+            top_n: Return only the fastest top_n strategies
 
         Returns:
             List of strategies ranked by predicted time (fastest first)
@@ -57,31 +76,30 @@ class StrategyEngine:
         if not available_compounds:
             return []
 
-        strategies = []
-
-        # Generate strategies for 0 to max_stops
-        for num_stops in range(0, max_stops + 1):
-            # Generate compound combinations
-            # For n stops, we have n+1 stints
-            num_stints = num_stops + 1
-
-            for compounds in combinations_with_replacement(
-                available_compounds, num_stints
-            ):
-                # Skip invalid strategies (must use at least 2 compounds in dry race)
-                if num_stops > 0 and len(set(compounds)) < 2:
-                    continue
+        candidates = self.iter_compound_sequences(
+            available_compounds, max_stops, total_laps, tyre_sets, max_stint_laps
+        )
+        if top_n is not None:
+            candidates = self._fastest_sequences(
+                candidates,
+                available_compounds,
+                self.race_time_parameters(list(curves_dict.values()), pit_loss_seconds),
+                total_laps,
+                top_n,
+            )
 
-                strategy = self._simulate_strategy(
-                    list(compounds),
-                    curves_dict,
-                    total_laps,
-                    pit_loss_seconds,
-                    num_stops,
-                )
+        strategies = []
+        for compounds in candidates:
+            strategy = self._simulate_strategy(
+                list(compounds),
+                curves_dict,
+                total_laps,
+                pit_loss_seconds,
+                len(compounds) - 1,
+            )
 
-                if strategy:
-                    strategies.append(strategy)
+            if strategy:
+                strategies.append(strategy)
 
         # Sort by predicted time
         strategies.sort(key=lambda s: s["predicted_time"])
@@ -94,6 +112,282 @@ class StrategyEngine:
 
         return strategies
 
+    @staticmethod
+    def compound_sequences(
+        compounds: Sequence[str],
+        max_stops: int,
+        total_laps: Optional[int] = None,
+        tyre_sets: Optional[Dict[str, int]] = None,
+        max_stint_laps: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, ...]]:
+        """Every sequence of iter_compound_sequences, as a list."""
+        return list(
+            StrategyEngine.iter_compound_sequences(
+                compounds, max_stops, total_laps, tyre_sets, max_stint_laps
+            )
+        )
+
+    @staticmethod
+    def iter_compound_sequences(
+        compounds: Sequence[str],
+        max_stops: int,
+        total_laps: Optional[int] = None,
+        tyre_sets: Optional[Dict[str, int]] = None,
+        max_stint_laps: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Tuple[str, ...]]:
+        """
+        Lazily generate the compound per stint of every feasible strategy,
+        0 to max_stops stops.
+
+        Sequences are ordered where the order changes predicted time. Stints
+        split the race as in _simulate_strategy (equal stints, the remainder
+        added to the last one), and stints of the same length can be swapped
+        without changing it, so only one order of those is generated: the
+        one following `compounds`. At 57 laps MEDIUM-HARD (28 + 29 laps) and
+        HARD-MEDIUM are both generated; at 56 laps only MEDIUM-HARD is.
+        Without total_laps only the final stint counts as distinct.
+
+        Sequences are built stint by stint, so a prefix that breaks a
+        constraint is dropped with everything that would extend it:
+        - a dry race must use at least two dry compounds; a strategy using
+          INTERMEDIATE or WET is exempt (and may run a single stint)
+        - each compound is used at most tyre_sets[compound] times
+        - with total_laps, stints split the race as in _simulate_strategy
+          and none may be longer than max_stint_laps[compound]
+
+        Args:
+            compounds: Compounds with a degradation curve
+            max_stops: Maximum pit stops
+            total_laps: Race distance (needed for max_stint_laps)
+            tyre_sets: Sets available per compound (unlimited if missing)
+            max_stint_laps: Longest stint per compound (unlimited if missing)
+
+        Yields:
+            Tuples of compounds, fewer stops first
+        """
+        wet = set(DegradationModel.WET_COMPOUNDS)
+        tyre_sets = tyre_sets or {}
+        max_stint_laps = max_stint_laps or {}
+        sets_left = {c: tyre_sets.get(c, max_stops + 1) for c in compounds}
+        order = {c: i for i, c in enumerate(compounds)}
+
+        def extend(prefix, lengths, groups, dry, wet_used):
+            position = len(prefix)
+            if position == len(lengths):
+                if wet_used or len(dry) >= 2:
+                    yield tuple(prefix)
+                return
+
+            # Interchangeable with the previous stint: keep compound order
+            same_length = position > 0 and groups[position] == groups[position - 1]
+            for compound in compounds:
+                if sets_left[compound] <= 0:
+                    continue
+                if same_length and order[compound] < order[prefix[-1]]:
+                    continue
+                limit = max_stint_laps.get(compound)
+                if limit is not None and lengths[position] is not None:
+                    if lengths[position] > limit:
+                        continue
+
+                is_wet = compound in wet
+                new_dry = dry if is_wet else dry | {compound}
+                # Dry compounds still missing must fit in the stints left,
+                # unless a wet compound (which lifts the rule) still can
+                stints_left = len(lengths) - position - 1
+                missing = 0 if wet_used or is_wet else 2 - len(new_dry)
+                if missing > stints_left and not any(
+                    sets_left[w] > (w == compound) for w in wet & set(compounds)
+                ):
+                    continue
+
+                sets_left[compound] -= 1
+                prefix.append(compound)
+                yield from extend(prefix, lengths, groups, new_dry, wet_used or is_wet)
+                prefix.pop()
+                sets_left[compound] += 1
+
+        for num_stops in range(0, max_stops + 1):
+            # For n stops, we have n+1 stints
+            n_stints = num_stops + 1
+            if total_laps is None:
+                lengths = [None] * n_stints
+                groups = [0] * num_stops + [1]
+            else:
+                base = total_laps // n_stints
+                if base < 1:
+                    break
+                lengths = groups = [base] * num_stops + [total_laps - base * num_stops]
+            yield from extend([], lengths, groups, frozenset(), False)
+
+    def _fastest_sequences(
+        self,
+        sequences: Iterable[Tuple[str, ...]],
+        compounds: Sequence[str],
+        parameters: np.ndarray,
+        total_laps: int,
+        top_n: int,
+    ) -> List[Tuple[str, ...]]:
+        """
+        The top_n sequences with the lowest predicted race time, scoring a
+        chunk of CHUNK_SIZE sequences per matrix product.
+        """
+        # Heap of the top_n kept so far, slowest (and on ties latest) on top
+        fastest = []
+        order = count()
+        sequences = iter(sequences)
+        while True:
+            chunk = list(islice(sequences, self.CHUNK_SIZE))
+            if not chunk:
+                break
+            features = self.race_time_features(chunk, compounds, [total_laps])[0]
+            for sequence, time in zip(chunk, features @ parameters):
+                entry = (-time, -next(order), sequence)
+                if len(fastest) < top_n:
+                    heapq.heappush(fastest, entry)
+                elif entry > fastest[0]:
+                    heapq.heapreplace(fastest, entry)
+        return [sequence for *_, sequence in sorted(fastest, reverse=True)]
+
+    def race_time_features(
+        self,
+        sequences: List[Tuple[str, ...]],
+        compounds: Sequence[str],
+        total_laps: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Linear features of predicted race time, for many strategies and race
+        distances at once.
+
+        Stints split the race as in _simulate_strategy (equal stints, the
+        remainder added to the last one). A stint of n laps on compound k
+        adds Σt², Σt and n (t = 1..n) to compound k's [a, b, c] columns, so
+        predicted time = features @ race_time_parameters(...).
+
+        Args:
+            sequences: Compound per stint of each strategy
+            compounds: Compound order of the coefficient columns
+            total_laps: Race distances to evaluate
+
+        Returns:
+            Array (distances, strategies, 3 * compounds + 2): per-compound
+            [Σt², Σt, n] columns, then number of stops and -Σ lap_number
+        """
+        total_laps = np.atleast_1d(np.asarray(total_laps, dtype=float))
+        n_params = 3 * len(compounds) + 2
+        n_distances, n_sequences = len(total_laps), len(sequences)
+        n_stints = np.array([len(s) for s in sequences], dtype=int)
+
+        # First coefficient column of each stint's compound, -1 past the end
+        # of shorter sequences
+        column = {compound: 3 * k for k, compound in enumerate(compounds)}
+        width = int(n_stints.max(initial=1))
+        columns = np.full((n_sequences, width), -1)
+        for j, sequence in enumerate(sequences):
+            columns[j, : len(sequence)] = [column[c] for c in sequence]
+
+        # Stint lengths (distances × strategies × stints)
+        base = total_laps[:, None] // np.maximum(n_stints, 1)
+        last = total_laps[:, None] - base * (n_stints - 1)
+        is_last = np.arange(width) == (n_stints - 1)[:, None]
+        n = np.where(is_last, last[:, :, None], base[:, :, None])
+
+        # Sum each stint's terms into its compound's columns
+        d, j, i = np.nonzero(np.broadcast_to(columns >= 0, n.shape))
+        n = n[d, j, i]
+        cell = (d * n_sequences + j) * n_params + columns[j, i]
+        size = n_distances * n_sequences * n_params
+        features = (
+            np.bincount(cell, n * (n + 1) * (2 * n + 1) / 6, size)
+            + np.bincount(cell + 1, n * (n + 1) / 2, size)
+            + np.bincount(cell + 2, n, size)
+        ).reshape(n_distances, n_sequences, n_params)
+        features[:, :, -2] = n_stints - 1
+        features[:, :, -1] = -(total_laps * (total_laps + 1) / 2)[:, None]
+        return features
+
+    def race_time_parameters(
+        self, degradation_curves: List[Dict], pit_loss_seconds: float
+    ) -> np.ndarray:
+        """
+        Parameter vector matching race_time_features: each compound's
+        [a, b, c], pit loss and fuel effect per lap.
+        """
+        coefficients = [
+            c for curve in degradation_curves for c in curve["coefficients"]
+        ]
+        return np.array(
+            coefficients + [pit_loss_seconds, self.deg_model.fuel_effect_per_lap]
+        )
+
+    @metrics.timed("strategy_intervals")
+    def strategy_intervals(
+        self,
+        strategies: List[Dict],
+        samples: Dict,
+        total_laps: int,
+        pit_loss_seconds: float,
+        confidence: float = 0.95,
+    ) -> List[Dict]:
+        """
+        Propagate bootstrap samples of the fit to the strategies' race times.
+
+        Every strategy is evaluated under every sample's coefficients and
+        fuel effect in one matrix product (see race_time_features).
+
+        Args:
+            strategies: Ranked output of simulate_strategies
+            samples: DegradationModel.bootstrap output for the same session
+            total_laps: Race distance used for the strategies
+            pit_loss_seconds: Pit loss used for the strategies
+            confidence: Interval coverage
+
+        Returns:
+            Copies of the strategies with "predicted_time_ci",
+            "time_delta_ci" (to the fastest strategy's time in the same
+            sample) and "probability_fastest"
+        """
+        if not strategies:
+            return []
+
+        compounds = samples["compounds"]
+        sequences = [
+            tuple(stint["compound"] for stint in strategy["stints"])
+            for strategy in strategies
+        ]
+        features = self.race_time_features(sequences, compounds, [total_laps])[0]
+
+        # One parameter vector per sample; compounds without a fit are not
+        # used by any strategy and get zero coefficients
+        coefficients = np.nan_to_num(np.asarray(samples["coefficients"], dtype=float))
+        fuel = np.asarray(samples["fuel_effect_per_lap"], dtype=float)
+        parameters = np.column_stack(
+            [
+                coefficients.reshape(len(fuel), -1),
+                np.full(len(fuel), pit_loss_seconds),
+                fuel,
+            ]
+        )
+        times = features @ parameters.T  # strategies × samples
+        deltas = times - times[0]
+
+        tail = 50 * (1 - confidence)
+        time_ci = np.percentile(times, [tail, 100 - tail], axis=1)
+        delta_ci = np.percentile(deltas, [tail, 100 - tail], axis=1)
+        fastest = np.bincount(times.argmin(axis=0), minlength=len(strategies)) / len(
+            fuel
+        )
+
+        return [
+            {
+                **strategy,
+                "predicted_time_ci": [float(time_ci[0, j]), float(time_ci[1, j])],
+                "time_delta_ci": [float(delta_ci[0, j]), float(delta_ci[1, j])],
+                "probability_fastest": float(fastest[j]),
+            }
+            for j, strategy in enumerate(strategies)
+        ]
+
     def _simulate_strategy(
         self,
         compounds: List[str],
@@ -0,0 +1,516 @@
+"""
+Downsampled, memory-mapped telemetry store.
+
+Track analyses only need a handful of car data channels per lap. Instead of
+``session.load(telemetry=True)`` (~1200MB), the store reads the livetiming
+car data stream line by line, spools each driver's speed, throttle, brake
+and DRS samples to a temporary file, then processes one driver at a time:
+it keeps every timed lap, resamples it onto a fixed distance grid and
+writes the driver as compact ``.npy`` files:
+
+    TELEMETRY_DIR/<session>/meta.json
+    TELEMETRY_DIR/<session>/<driver>/lap_numbers.npy  int16   (laps,)
+    TELEMETRY_DIR/<session>/<driver>/lap_length.npy   float32 (laps,)
+    TELEMETRY_DIR/<session>/<driver>/speed.npy        float32 (laps, points)
+    TELEMETRY_DIR/<session>/<driver>/throttle.npy     uint8   (laps, points)
+    TELEMETRY_DIR/<session>/<driver>/brake.npy        uint8   (laps, points)
+    TELEMETRY_DIR/<session>/<driver>/drs.npy          uint8   (laps, points)
+
+Readers open the arrays memory-mapped, so only the laps they slice are
+paged in and the full FastF1 telemetry is never held in memory. The store
+is kept under TELEMETRY_MAX_MB by evicting whole sessions, least recently
+used (meta.json mtime) first.
+"""
+import base64
+import json
+import os
+import shutil
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from app.config import (
+    LIVETIMING_URL,
+    TELEMETRY_DIR,
+    TELEMETRY_DISTANCE_STEP,
+    TELEMETRY_MAX_MB,
+)
+from app.services.session_data import SessionData
+from app.services.shared_cache import file_lock
+from app.utils import metrics
+
+CHANNELS = {
+    "speed": np.float32,
+    "throttle": np.uint8,
+    "brake": np.uint8,
+    "drs": np.uint8,
+}
+
+# livetiming page with every car's data (one compressed record per line)
+CAR_DATA_PAGE = "CarData.z.jsonStream"
+TIMESTAMP_LENGTH = 12  # "00:00:03.123" session time before each record
+
+# One raw car data sample, as spooled to a driver's temporary file
+SPOOL_DTYPE = np.dtype(
+    [
+        ("time", "<f8"),  # session time in seconds
+        ("date", "<M8[ns]"),
+        ("speed", "<f4"),
+        ("throttle", "u1"),
+        ("brake", "u1"),
+        ("drs", "u1"),
+    ]
+)
+
+
+class DriverTelemetry:
+    """Memory-mapped telemetry of one driver in one session."""
+
+    __slots__ = ("driver", "lap_numbers", "lap_length", "distance", "channels")
+
+    def __init__(self, driver: str, path: Path, distance: np.ndarray):
+        self.driver = driver
+        self.lap_numbers = np.load(path / "lap_numbers.npy")
+        self.lap_length = np.load(path / "lap_length.npy", mmap_mode="r")
+        self.distance = distance
+        self.channels = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r") for name in CHANNELS
+        }
+
+    def rows_for(self, lap_numbers: Iterable[int]) -> np.ndarray:
+        """Row indices of the given lap numbers (missing laps are skipped)."""
+        return np.flatnonzero(np.isin(self.lap_numbers, list(lap_numbers)))
+
+    def __getitem__(self, channel: str) -> np.ndarray:
+        return self.channels[channel]
+
+
+class TelemetryStore:
+    """Ingests and serves downsampled per-lap telemetry."""
+
+    MIN_SAMPLES_PER_LAP = 10
+    SPOOL_FLUSH = 4096  # samples buffered per driver before they are spooled
+    HTTP_TIMEOUT = (10, 60)  # seconds to connect, and between received bytes
+    # Rough peak memory of one ingest, used by admission control (~4MB
+    # measured for a race streamed at 4Hz, plus headroom)
+    INGEST_MEMORY_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, root: Path = TELEMETRY_DIR, max_mb: int = TELEMETRY_MAX_MB):
+        """
+        Args:
+            root: Store directory
+            max_mb: Size budget of the stored sessions (0 = unbounded)
+        """
+        self.root = Path(root)
+        self.max_bytes = max_mb * 1024 * 1024
+
+    @staticmethod
+    def session_key(session: SessionData) -> str:
+        """Stable directory name for a session, derived from its API path."""
+        if session.api_path is None:
+            raise ValueError(f"No telemetry available for session {session.key}")
+        # e.g. /static/2023/2023-09-03_Italian_Grand_Prix/2023-09-03_Race/
+        return session.api_path.strip("/").split("/", 1)[-1].replace("/", "__")
+
+    def has_session(self, key: str) -> bool:
+        return (self.root / key / "meta.json").exists()
+
+    def needs_ingest(self, session: SessionData) -> bool:
+        """Whether ensure(session) would stream the session's car data."""
+        return session.api_path is not None and not self.has_session(
+            self.session_key(session)
+        )
+
+    def meta(self, key: str) -> Dict:
+        return json.loads((self.root / key / "meta.json").read_text())
+
+    def ensure(self, session: SessionData) -> str:
+        """
+        Ingest a session's telemetry unless it is already stored.
+
+        A file lock per session keeps concurrent workers from ingesting the
+        same session twice; the others wait and then use the stored arrays.
+        """
+        key = self.session_key(session)
+        if self._touch(key):
+            metrics.inc("f1_cache_requests_total", cache="telemetry", result="hit")
+            return key
+
+        with file_lock(self.root / f".{key}.lock"):
+            if self._touch(key):
+                metrics.inc("f1_cache_requests_total", cache="telemetry", result="hit")
+                return key
+            metrics.inc("f1_cache_requests_total", cache="telemetry", result="miss")
+            try:
+                self.ingest(session)
+            except BaseException:
+                # Spool files and half-written drivers of a failed ingest
+                shutil.rmtree(self._tmp_dir(key), ignore_errors=True)
+                raise
+        self.enforce(keep=[key])
+        return key
+
+    def enforce(self, keep: Iterable[str] = ()) -> Dict:
+        """
+        Evict least recently used sessions until the store fits in
+        max_bytes. Sessions in keep (e.g. one just ingested) stay.
+
+        Returns:
+            Dictionary with the "evicted" session keys and "freed_bytes"
+        """
+        keep = set(keep)
+        sessions = []
+        for entry in _scandir(self.root):
+            meta_path = Path(entry.path, "meta.json")
+            try:
+                last_used = meta_path.stat().st_mtime
+                size = json.loads(meta_path.read_text())["size_bytes"]
+            except (OSError, ValueError, KeyError):
+                continue  # not a (complete) session
+            sessions.append((last_used, size, entry.name))
+        total = sum(size for _, size, _ in sessions)
+
+        evicted, freed = [], 0
+        for _, size, key in sorted(sessions):
+            if not self.max_bytes or total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            # Not while the session is (re)ingested
+            with file_lock(self.root / f".{key}.lock"):
+                shutil.rmtree(self.root / key, ignore_errors=True)
+            total -= size
+            freed += size
+            evicted.append(key)
+
+        if evicted:
+            metrics.inc("f1_telemetry_evictions_total", len(evicted))
+        metrics.gauge_set("f1_telemetry_bytes", total)
+        return {"evicted": evicted, "freed_bytes": freed}
+
+    def _touch(self, key: str) -> bool:
+        """Mark a stored session as used now; False if it is not stored."""
+        try:
+            os.utime(self.root / key / "meta.json")
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _tmp_dir(self, key: str) -> Path:
+        return self.root / f".{key}.tmp-{os.getpid()}"
+
+    @metrics.timed("ingest_telemetry")
+    def ingest(self, session: SessionData) -> Dict:
+        """
+        Extract, downsample and persist telemetry for every timed lap.
+
+        The car data stream is first split into one spool file per driver
+        (see spool_car_data), then drivers are resampled one at a time, so
+        only one driver's raw samples are ever in memory.
+
+        Returns:
+            The session metadata, including on-disk size and ingest time
+        """
+        start = time.perf_counter()
+        key = self.session_key(session)
+        tmp_dir = self._tmp_dir(key)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        laps = session.laps
+        laps = laps.select(
+            np.isfinite(laps["lap_start_time"]) & np.isfinite(laps["lap_end_time"])
+        )
+
+        spool_dir = tmp_dir / ".spool"
+        spooled = self.spool_car_data(session.api_path, spool_dir)
+        reference_length = None
+        drivers = []
+
+        for driver_number in np.unique(laps["driver_number"]):
+            spool_path = spooled.get(str(driver_number))
+            if spool_path is None:
+                continue
+
+            records = np.fromfile(spool_path, dtype=SPOOL_DTYPE)
+            spool_path.unlink()
+            samples = {
+                "time": records["time"],
+                "date": records["date"],
+                "speed": records["speed"].astype(np.float64),
+                "throttle": records["throttle"].astype(np.float64),
+                "brake": records["brake"].astype(np.float64),
+                "drs": records["drs"],
+            }
+            del records
+
+            driver_laps = laps.select(laps["driver_number"] == driver_number)
+            windows = zip(
+                driver_laps["lap_number"],
+                driver_laps["lap_start_time"],
+                driver_laps["lap_end_time"],
+            )
+            laps_on_grid = []
+            for lap_number, lap_start, lap_end in windows:
+                lap = self._lap_distance(samples, lap_start, lap_end)
+                if lap is not None:
+                    laps_on_grid.append((lap_number, lap))
+
+            if not laps_on_grid:
+                continue
+
+            if reference_length is None:
+                # The first driver fixes the grid for the whole session
+                reference_length = float(np.median([lap[1] for _, lap in laps_on_grid]))
+                points = max(1, int(round(reference_length / TELEMETRY_DISTANCE_STEP)))
+                grid = np.arange(points) / points
+
+            self._write_driver(
+                tmp_dir / str(driver_number), laps_on_grid, samples, grid
+            )
+            drivers.append(str(driver_number))
+
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+        meta = {
+            "session_key": key,
+            "drivers": drivers,
+            "lap_length_m": reference_length,
+            "points_per_lap": 0 if reference_length is None else int(grid.size),
+            "distance_step_m": (
+                0.0 if reference_length is None else reference_length / grid.size
+            ),
+            "channels": {
+                name: np.dtype(dtype).name for name, dtype in CHANNELS.items()
+            },
+            "size_bytes": _dir_size(tmp_dir),
+            "ingest_seconds": round(time.perf_counter() - start, 3),
+        }
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        # Publish atomically so readers never see a half-written session
+        final_dir = self.root / key
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+        print(
+            f"Telemetry ingested for {key}: {len(drivers)} drivers, "
+            f"{meta['size_bytes'] / 1024 / 1024:.1f} MB on disk, "
+            f"{meta['ingest_seconds']:.1f}s"
+        )
+        return meta
+
+    def spool_car_data(self, api_path: str, spool_dir: Path) -> Dict[str, Path]:
+        """
+        Stream a session's car data into one spool file per driver.
+
+        The livetiming API serves every car's data as one stream. It is read
+        line by line and each record is decoded on its own; samples are
+        collected in a fixed SPOOL_FLUSH-sample array per driver and
+        appended to the driver's file whenever it fills. Memory holds one
+        record and those arrays (~100KB per driver), never the whole stream.
+
+        Args:
+            api_path: Session path in the livetiming API
+            spool_dir: Directory for the spool files (created)
+
+        Returns:
+            Dict mapping driver number to its spool file of SPOOL_DTYPE records
+        """
+        import requests
+
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        buffers: Dict[str, np.ndarray] = {}
+        filled: Dict[str, int] = {}
+        paths: Dict[str, Path] = {}
+        decode_errors = 0
+
+        def flush(driver: str) -> None:
+            with open(paths[driver], "ab") as f:
+                buffers[driver][: filled[driver]].tofile(f)
+            filled[driver] = 0
+
+        url = f"{LIVETIMING_URL}{api_path}{CAR_DATA_PAGE}"
+        with requests.get(url, stream=True, timeout=self.HTTP_TIMEOUT) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                try:
+                    samples = list(_car_data_samples(line))
+                except (ValueError, KeyError, TypeError, zlib.error):
+                    decode_errors += 1
+                    continue
+                for driver, sample in samples:
+                    if driver not in buffers:
+                        buffers[driver] = np.empty(self.SPOOL_FLUSH, dtype=SPOOL_DTYPE)
+                        filled[driver] = 0
+                        paths[driver] = spool_dir / f"{driver}.bin"
+                    buffers[driver][filled[driver]] = sample
+                    filled[driver] += 1
+                    if filled[driver] == self.SPOOL_FLUSH:
+                        flush(driver)
+
+        for driver in buffers:
+            flush(driver)
+        if decode_errors:
+            print(f"Car data {api_path}: {decode_errors} records could not be decoded")
+        return paths
+
+    def _lap_distance(self, samples: Dict[str, np.ndarray], start: float, end: float):
+        """
+        Integrate distance over one lap.
+
+        Returns:
+            (sample mask, lap length in meters, normalised lap fraction per
+            sample) or None if the lap has too few samples
+        """
+        mask = (samples["time"] >= start) & (samples["time"] <= end)
+        if mask.sum() < self.MIN_SAMPLES_PER_LAP:
+            return None
+
+        date = samples["date"][mask]
+        seconds = (date - date[0]).astype(np.float64) / 1e9
+        distance = np.cumsum(
+            np.diff(seconds, prepend=0.0) * samples["speed"][mask] / 3.6
+        )
+        lap_length = distance[-1]
+        if lap_length <= 0:
+            return None
+
+        # Normalising by the lap's own length lines laps up point by point
+        # despite small integration drift between them
+        return mask, lap_length, distance / lap_length
+
+    def _write_driver(
+        self,
+        path: Path,
+        laps_on_grid: List,
+        samples: Dict[str, np.ndarray],
+        grid: np.ndarray,
+    ) -> None:
+        """Resample each lap onto the grid and write the driver's arrays."""
+        path.mkdir(parents=True)
+        shape = (len(laps_on_grid), grid.size)
+        arrays = {
+            name: np.lib.format.open_memmap(
+                path / f"{name}.npy", mode="w+", dtype=dtype, shape=shape
+            )
+            for name, dtype in CHANNELS.items()
+        }
+
+        lap_numbers = np.empty(len(laps_on_grid), dtype=np.int16)
+        lap_lengths = np.empty(len(laps_on_grid), dtype=np.float32)
+
+        for row, (lap_number, (mask, lap_length, fraction)) in enumerate(laps_on_grid):
+            lap_numbers[row] = lap_number
+            lap_lengths[row] = lap_length
+            arrays["speed"][row] = np.interp(grid, fraction, samples["speed"][mask])
+            arrays["throttle"][row] = np.clip(
+                np.rint(np.interp(grid, fraction, samples["throttle"][mask])), 0, 255
+            )
+            arrays["brake"][row] = (
+                np.interp(grid, fraction, samples["brake"][mask]) > 0.5
+            )
+            # DRS is a state code, so take the nearest preceding sample
+            nearest = np.searchsorted(fraction, grid, side="right") - 1
+            arrays["drs"][row] = samples["drs"][mask][np.clip(nearest, 0, None)]
+
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        np.save(path / "lap_numbers.npy", lap_numbers)
+        np.save(path / "lap_length.npy", lap_lengths)
+
+    @metrics.timed("read_telemetry")
+    def load_driver(self, key: str, driver: str) -> Optional[DriverTelemetry]:
+        """Open one driver's telemetry memory-mapped, or None if absent."""
+        path = self.root / key / driver
+        if not path.exists():
+            return None
+        meta = self.meta(key)
+        points = meta["points_per_lap"]
+        distance = np.arange(points, dtype=np.float32) * meta["distance_step_m"]
+        return DriverTelemetry(driver, path, distance)
+
+    def session_stats(self) -> List[Dict]:
+        """On-disk size, ingest time and read time for every stored session."""
+        if not self.root.exists():
+            return []
+
+        stats = []
+        for entry in sorted(os.scandir(self.root), key=lambda e: e.name):
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            meta = json.loads(Path(entry.path, "meta.json").read_text())
+
+            start = time.perf_counter()
+            for driver in meta["drivers"]:
+                self.load_driver(entry.name, driver)
+            load_seconds = time.perf_counter() - start
+
+            stats.append(
+                {
+                    "session_key": entry.name,
+                    "drivers": len(meta["drivers"]),
+                    "points_per_lap": meta["points_per_lap"],
+                    "size_bytes": meta["size_bytes"],
+                    "ingest_seconds": meta["ingest_seconds"],
+                    "load_seconds": round(load_seconds, 4),
+                }
+            )
+        return stats
+
+
+def _car_data_samples(line: bytes) -> Iterator[Tuple[str, Tuple]]:
+    """
+    Decode one line of the car data stream.
+
+    A line is the session time ("00:00:03.123") followed by a JSON string
+    holding the base64, raw-deflate compressed JSON record.
+
+    Yields:
+        (driver number, sample) with the sample in SPOOL_DTYPE field order
+    """
+    text = line.decode("utf-8-sig").strip()
+    if len(text) <= TIMESTAMP_LENGTH:
+        return
+    hours, minutes, seconds = text[:TIMESTAMP_LENGTH].split(":")
+    session_time = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    payload = base64.b64decode(json.loads(text[TIMESTAMP_LENGTH:]))
+    record = json.loads(zlib.decompress(payload, -zlib.MAX_WBITS))
+
+    for entry in record["Entries"]:
+        date = np.datetime64(entry["Utc"].rstrip("Z"), "ns")
+        for driver, car in entry["Cars"].items():
+            # Channels: 2 speed (km/h), 4 throttle (%), 5 brake, 45 DRS state
+            channels = car["Channels"]
+            yield driver, (
+                session_time,
+                date,
+                channels["2"],
+                min(max(channels["4"], 0), 255),
+                channels["5"] > 0,
+                channels["45"],
+            )
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _scandir(path: Path) -> List[os.DirEntry]:
+    """Session directories (no lock files or temporary directories)."""
+    try:
+        with os.scandir(path) as entries:
+            return [e for e in entries if not e.name.startswith(".") and e.is_dir()]
+    except OSError:
+        return []
+
+
+metrics.describe("f1_telemetry_bytes", "Size of the downsampled telemetry store")
+metrics.describe(
+    "f1_telemetry_evictions_total", "Sessions evicted from the telemetry store"
+)
@@ -0,0 +1,240 @@
+"""
+Undercut / overcut calculator.
+
+Evaluates every driver pair and every candidate pit lap over the next few
+laps in one NumPy broadcast, using the fitted degradation curves.
+"""
+from typing import Dict, List
+
+import numpy as np
+from app.services.session_data import SessionData
+from app.utils import metrics
+
+
+class UndercutEngine:
+    """
+    Finds the driver pairs where pitting first (undercut) or staying out
+    longer (overcut) gains track position.
+
+    Model, for an attacker behind a defender by `gap` seconds at the end of
+    the current lap L:
+    - Undercut: the attacker pits at the end of lap p (L < p <= L + horizon),
+      the defender responds `response_lag` laps later. Compare time over
+      laps p+1 .. p+lag+1, until both cars have pitted and completed one
+      lap on new tyres.
+    - Overcut: the defender pits at p and the attacker `response_lag` laps
+      later, over the same laps.
+
+    Until the first stop both cars run on their current tyres and the gap
+    moves with their lap time difference: it grows when the car behind is
+    slower, and it shrinks when it is faster, but never below
+    DIRTY_AIR_GAP (closer than that, the car behind loses its pace in
+    dirty air and cannot pass on track). Both cars run the same laps and
+    stop once, so fuel effect, pit loss and out-lap penalties cancel. What
+    is left is tyre age (old tyres keep degrading, new ones start fresh)
+    and each driver's pace offset from the compound curve. The attacker
+    gains the position when the time it makes up exceeds the gap at the
+    first stop; that surplus is the margin.
+
+    The primary result is the margin for stopping now (first stop at the
+    end of lap L+1). The best lap in the horizon is reported next to it;
+    it assumes the rival does not stop first.
+    """
+
+    RECENT_LAPS = 5  # laps used to estimate a driver's pace offset
+    DIRTY_AIR_GAP = 1.0  # seconds - the car behind cannot close in further
+
+    def __init__(self, curves: List[Dict]):
+        """
+        Args:
+            curves: Fitted degradation curves (DegradationModel output)
+        """
+        self.compounds = [curve["compound"] for curve in curves]
+        self.coefficients = np.array([curve["coefficients"] for curve in curves])
+
+    def field_at_lap(
+        self, session: SessionData, lap: int, fuel_effect_per_lap: float
+    ) -> List[Dict]:
+        """
+        Each running driver's state at the end of a lap.
+
+        Drivers on a compound without a fitted curve, or pitting on this lap,
+        are left out.
+
+        Returns:
+            List of {"driver", "position", "compound", "tyre_life", "gap",
+            "pace_offset"} sorted by position, gap to the leader in seconds
+        """
+        laps = session.laps
+        at_lap = laps.select(
+            (laps["lap_number"] == lap)
+            & np.isfinite(laps["lap_end_time"])
+            & np.isfinite(laps["tyre_life"])
+            & ~laps["pit_in"]
+            & np.isin(laps["compound"], self.compounds)
+        )
+        if len(at_lap) == 0:
+            return []
+
+        leader_time = at_lap["lap_end_time"].min()
+        quick = laps.quick_mask(by="driver")
+        field = []
+        for row in np.argsort(at_lap["lap_end_time"]):
+            driver = str(at_lap["driver"][row])
+            compound = str(at_lap["compound"][row])
+            tyre_life = int(at_lap["tyre_life"][row])
+
+            # Pace offset: median residual of the driver's recent laps on this
+            # set of tyres against the fuel-corrected compound curve
+            recent = laps.select(
+                (laps["driver"] == driver)
+                & (laps["lap_number"] <= lap)
+                & (laps["lap_number"] > lap - min(self.RECENT_LAPS, tyre_life - 1))
+                & quick
+            )
+            pace_offset = 0.0
+            if len(recent):
+                a, b, c = self.coefficients[self.compounds.index(compound)]
+                age = recent["tyre_life"]
+                predicted = a * age**2 + b * age + c
+                corrected = (
+                    recent["lap_time"] + fuel_effect_per_lap * recent["lap_number"]
+                )
+                pace_offset = float(np.median(corrected - predicted))
+
+            field.append(
+                {
+                    "driver": driver,
+                    "position": len(field) + 1,
+                    "compound": compound,
+                    "tyre_life": tyre_life,
+                    "gap": float(at_lap["lap_end_time"][row] - leader_time),
+                    "pace_offset": pace_offset,
+                }
+            )
+        return field
+
+    @metrics.timed("analyze_undercuts")
+    def analyze(
+        self,
+        field: List[Dict],
+        lap: int,
+        remaining_laps: int,
+        horizon: int = 5,
+        response_lag: int = 1,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Evaluate undercuts and overcuts for every pair and candidate pit lap.
+
+        Args:
+            field: Driver states (see field_at_lap); gap is to the leader
+            lap: Current lap L
+            remaining_laps: Laps left after L (picks the new compound)
+            horizon: Candidate pit laps L+1 .. L+horizon
+            response_lag: Laps between the first car's stop and the other's
+
+        Returns:
+            Dictionary with "undercuts" and "overcuts", each a list of
+            {"attacker", "defender", "gap", "pit_lap", "margin",
+            "best_pit_lap", "best_margin", "new_compound"} for the pairs
+            that gain track position with a first stop in the horizon.
+            pit_lap is L+1 and margin the margin for stopping now (negative:
+            not yet); best_pit_lap and best_margin are for the best first
+            stop in the horizon. Sorted by margin, best first.
+        """
+        if len(field) < 2 or len(self.compounds) == 0:
+            return {"undercuts": [], "overcuts": []}
+
+        drivers = np.array([d["driver"] for d in field])
+        compound = np.array([self.compounds.index(d["compound"]) for d in field])
+        tyre_life = np.array([d["tyre_life"] for d in field], dtype=float)
+        gap = np.array([d["gap"] for d in field], dtype=float)
+        pace = np.array([d.get("pace_offset", 0.0) for d in field], dtype=float)
+        new_compound = self._new_compounds(compound, remaining_laps)
+
+        # Cumulative lap times (drivers × laps) on the current set for up to
+        # horizon + lag more laps, and on the new set for up to lag + 1 laps
+        steps = np.arange(1, horizon + response_lag + 1)
+        old = self._lap_times(compound, tyre_life[:, None] + steps) + pace[:, None]
+        new_ages = np.arange(1, response_lag + 2, dtype=float)
+        new = self._lap_times(new_compound, new_ages[None, :]) + pace[:, None]
+        old_total = np.concatenate([np.zeros((len(field), 1)), old.cumsum(axis=1)], 1)
+        new_total = np.concatenate([np.zeros((len(field), 1)), new.cumsum(axis=1)], 1)
+
+        # Time from the first stop (end of lap L+k) to the end of lap
+        # L+k+lag+1 for the car that pits first and the one that pits second
+        k = np.arange(1, horizon + 1)
+        first = np.broadcast_to(new_total[:, [response_lag + 1]], (len(field), horizon))
+        second = old_total[:, k + response_lag] - old_total[:, k] + new_total[:, [1]]
+
+        # pair_gap[a, b] > 0 when attacker a is behind defender b
+        pair_gap = gap[:, None] - gap[None, :]
+        behind = pair_gap > 0
+
+        # Gap at the first stop (end of lap L+k): moved by the lap time
+        # difference on the current tyres, floored at the dirty air gap
+        drift = old_total[:, None, k] - old_total[None, :, k]
+        floor = np.minimum(pair_gap, self.DIRTY_AIR_GAP)[:, :, None]
+        gap_at_stop = np.maximum(pair_gap[:, :, None] + drift, floor)
+
+        # (attacker, defender, pit lap) margins in one broadcast
+        undercut = second[None, :, :] - first[:, None, :] - gap_at_stop
+        overcut = first[None, :, :] - second[:, None, :] - gap_at_stop
+
+        return {
+            "undercuts": self._opportunities(
+                undercut, behind, drivers, new_compound, pair_gap, lap
+            ),
+            "overcuts": self._opportunities(
+                overcut, behind, drivers, new_compound, pair_gap, lap
+            ),
+        }
+
+    def _lap_times(self, compound: np.ndarray, ages: np.ndarray) -> np.ndarray:
+        a, b, c = self.coefficients[compound].T
+        return a[:, None] * ages**2 + b[:, None] * ages + c[:, None]
+
+    def _new_compounds(self, compound: np.ndarray, remaining_laps: int) -> np.ndarray:
+        """
+        Compound to fit at the stop: the fitted compound, other than the
+        current one, with the lowest mean lap time over the remaining laps.
+        """
+        ages = np.arange(1, max(remaining_laps, 1) + 1, dtype=float)
+        mean_time = self._lap_times(np.arange(len(self.compounds)), ages[None, :]).mean(
+            axis=1
+        )
+        # options[d, c]: mean time, infinite for the driver's current compound
+        options = np.broadcast_to(mean_time, (len(compound), len(mean_time))).copy()
+        if len(self.compounds) > 1:
+            options[np.arange(len(compound)), compound] = np.inf
+        return options.argmin(axis=1)
+
+    def _opportunities(
+        self,
+        margins: np.ndarray,
+        behind: np.ndarray,
+        drivers: np.ndarray,
+        new_compound: np.ndarray,
+        pair_gap: np.ndarray,
+        lap: int,
+    ) -> List[Dict]:
+        best_k = margins.argmax(axis=2)
+        best = np.take_along_axis(margins, best_k[:, :, None], axis=2)[:, :, 0]
+        now = margins[:, :, 0]
+        attackers, defenders = np.nonzero(behind & (best > 0))
+
+        opportunities = [
+            {
+                "attacker": str(drivers[a]),
+                "defender": str(drivers[b]),
+                "gap": round(float(pair_gap[a, b]), 3),
+                "pit_lap": lap + 1,
+                "margin": round(float(now[a, b]), 3),
+                "best_pit_lap": lap + 1 + int(best_k[a, b]),
+                "best_margin": round(float(best[a, b]), 3),
+                "new_compound": self.compounds[new_compound[a]],
+            }
+            for a, b in zip(attackers, defenders)
+        ]
+        opportunities.sort(key=lambda o: (o["margin"], o["best_margin"]), reverse=True)
+        return opportunities
@@ -0,0 +1,26 @@
+"""
+Admin access control.
+
+Admin features are enabled by setting the ``ADMIN_TOKEN`` environment
+variable; callers authenticate with a matching ``X-Admin-Token`` header.
+"""
+import hmac
+from typing import Optional
+
+from app.config import ADMIN_TOKEN
+from fastapi import Header, HTTPException
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against ADMIN_TOKEN in constant time."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """FastAPI dependency rejecting requests without a valid admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin API is disabled")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
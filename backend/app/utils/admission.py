@@ -0,0 +1,252 @@
+"""
+Admission control for session loads.
+
+A request whose session is already in the shared cache is cheap: it maps
+the stored arrays and goes ahead at once. A cold load fetches the session
+from the data source, which for FastF1 peaks at 200-300MB, so two at a
+time can exhaust a small instance. Cold loads therefore:
+
+- run at most MAX_COLD_LOADS at a time per process, in a worker thread so
+  the event loop keeps serving cheap requests meanwhile;
+- wait in a queue of at most COLD_LOAD_QUEUE requests, for at most
+  COLD_LOAD_QUEUE_TIMEOUT seconds;
+- are refused when the process baseline plus the expected memory of
+  this load and every running one would exceed MEMORY_BUDGET_MB, or when
+  RSS already does.
+
+The baseline is the idle process's RSS, measured at startup, plus what
+the data source's libraries take once imported (fastf1 and pandas, ~48MB
+on top of the ~59MB app). Loads are compared against the headroom above
+it rather than against current RSS: memory a finished load leaves behind
+in the allocator is reused by the next one, so counting it again would
+refuse every load after the first.
+
+Telemetry ingestion and large bootstrap runs are admitted the same way
+(run_cold), each with its own expected memory.
+
+Refused requests get 503 with a Retry-After header.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+from app.config import (
+    BOOTSTRAP_COLD_SAMPLES,
+    BUNDLE_FALLBACK,
+    COLD_LOAD_MEMORY_MB,
+    COLD_LOAD_QUEUE,
+    COLD_LOAD_QUEUE_TIMEOUT,
+    MAX_COLD_LOADS,
+    MEMORY_BUDGET_MB,
+)
+from app.services.bundle import get_bundle
+from app.services.data_sources import get_data_source
+from app.services.fastf1_client import FastF1Client
+from app.services.session_data import SessionData
+from app.utils import metrics
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+MB = 1024 * 1024
+RETRY_AFTER = 30  # seconds suggested to refused clients
+BOOTSTRAP_SAMPLE_BYTES = 16 * 1024  # peak per sample: resampled fit + intervals
+
+T = TypeVar("T")
+
+
+class Overloaded(HTTPException):
+    """The server cannot take on another cold load right now."""
+
+    def __init__(self, reason: str, retry_after: int = RETRY_AFTER):
+        super().__init__(
+            status_code=503,
+            detail=f"Server busy ({reason}), retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.reason = reason
+
+
+class AdmissionController:
+    """Limits concurrent cold loads by count, queue length and memory."""
+
+    def __init__(
+        self,
+        max_cold_loads: int = MAX_COLD_LOADS,
+        max_queue: int = COLD_LOAD_QUEUE,
+        queue_timeout: float = COLD_LOAD_QUEUE_TIMEOUT,
+        memory_budget: int = MEMORY_BUDGET_MB * MB,
+    ):
+        """
+        Args:
+            max_cold_loads: Cold loads running at once
+            max_queue: Cold loads waiting for a slot before new ones are refused
+            queue_timeout: Seconds a cold load may wait for a slot
+            memory_budget: RSS limit in bytes (0 = no limit)
+        """
+        self.max_cold_loads = max_cold_loads
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.memory_budget = memory_budget
+        self.baseline: Optional[int] = None
+        self.running = 0
+        self.reserved = 0  # expected bytes of the running loads
+        self.waiting = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(max_cold_loads, 1))
+
+    def calibrate(self, import_bytes: int = 0) -> int:
+        """
+        Measure the baseline: current (idle) RSS plus the memory the data
+        source's libraries will take once imported. Returns it in bytes.
+        """
+        self.baseline = metrics.get_rss_bytes() + import_bytes
+        metrics.gauge_set("f1_admission_baseline_bytes", self.baseline)
+        return self.baseline
+
+    @contextmanager
+    def cold_load(self, expected_bytes: int):
+        """
+        Hold a cold-load slot (blocking; run in a worker thread).
+
+        Raises:
+            Overloaded: queue full, no slot within the timeout, or not
+                        enough memory budget
+        """
+        with self._lock:
+            # A load that has to wait is checked against the running loads
+            # once it has a slot; now, only whether it can ever fit
+            self._check_memory(
+                expected_bytes, alone=self.running >= self.max_cold_loads
+            )
+            if self.running >= self.max_cold_loads and self.waiting >= self.max_queue:
+                self._refuse("queue_full")
+            self.waiting += 1
+            self._update_gauges()
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self._update_gauges()
+                self._refuse("queue_timeout")
+            try:
+                # Memory may have grown while this load was queued
+                self._check_memory(expected_bytes)
+            except Overloaded:
+                self._slots.release()
+                self._update_gauges()
+                raise
+            self.running += 1
+            self.reserved += expected_bytes
+            self._update_gauges()
+        metrics.inc("f1_admission_total", cost="cold", result="admitted")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.reserved -= expected_bytes
+                self._update_gauges()
+            self._slots.release()
+
+    def projected_rss(self, expected_bytes: int, alone: bool = False) -> int:
+        """
+        RSS if this load and every running one (none, when alone) reached
+        their peak.
+        """
+        if self.baseline is None:
+            self.calibrate()
+        return self.baseline + (0 if alone else self.reserved) + expected_bytes
+
+    def _check_memory(self, expected_bytes: int, alone: bool = False) -> None:
+        if not self.memory_budget:
+            return
+        if (
+            self.projected_rss(expected_bytes, alone) > self.memory_budget
+            or metrics.get_rss_bytes() > self.memory_budget
+        ):
+            self._refuse("memory")
+
+    def _refuse(self, reason: str) -> None:
+        metrics.inc("f1_admission_total", cost="cold", result=f"rejected_{reason}")
+        raise Overloaded(reason)
+
+    def _update_gauges(self) -> None:
+        metrics.gauge_set("f1_cold_loads", self.running, state="running")
+        metrics.gauge_set("f1_cold_loads", self.waiting, state="waiting")
+
+
+_controller = AdmissionController()
+
+
+def calibrate() -> int:
+    """Measure the admission baseline for the configured data source."""
+    return _controller.calibrate(get_data_source().IMPORT_MEMORY_BYTES)
+
+
+async def load_session(
+    client: FastF1Client, year: int, race_name: str, session_type: str = "R"
+) -> Optional[SessionData]:
+    """
+    FastF1Client.load_session behind admission control.
+
+    Cached sessions are opened directly; cold loads take a slot and run in
+    a worker thread.
+
+    Raises:
+        Overloaded: the cold load was refused (503 + Retry-After)
+        HTTPException: 404 when serving only from an analysis bundle
+    """
+    if not BUNDLE_FALLBACK and get_bundle() is not None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Session not in bundle: {year} {race_name} {session_type}",
+        )
+
+    if client.cache.has_session(year, race_name, session_type):
+        metrics.inc("f1_admission_total", cost="cheap", result="admitted")
+        return client.load_session(year, race_name, session_type)
+
+    expected = COLD_LOAD_MEMORY_MB * MB or client.source.LOAD_MEMORY_BYTES
+    if _controller.baseline is None:
+        _controller.calibrate(client.source.IMPORT_MEMORY_BYTES)
+    return await run_cold(expected, client.load_session, year, race_name, session_type)
+
+
+async def run_cold(expected_bytes: int, fn: Callable[..., T], *args) -> T:
+    """
+    fn(*args) in a worker thread, holding a cold-load slot.
+
+    Args:
+        expected_bytes: Peak memory fn is expected to use
+
+    Raises:
+        Overloaded: the work was refused (503 + Retry-After)
+    """
+
+    def run() -> T:
+        with _controller.cold_load(expected_bytes):
+            return fn(*args)
+
+    return await run_in_threadpool(run)
+
+
+async def run_bootstrap(n_samples: int, fn: Callable[[], T]) -> T:
+    """
+    fn(), which computes or uses n_samples bootstrap samples: inline up to
+    BOOTSTRAP_COLD_SAMPLES, above that behind admission control.
+
+    Raises:
+        Overloaded: the work was refused (503 + Retry-After)
+    """
+    if n_samples <= BOOTSTRAP_COLD_SAMPLES:
+        return fn()
+    return await run_cold(n_samples * BOOTSTRAP_SAMPLE_BYTES, fn)
+
+
+metrics.describe("f1_admission_total", "Session loads admitted or refused, by cost")
+metrics.describe("f1_cold_loads", "Cold session loads running and waiting")
+metrics.describe(
+    "f1_admission_baseline_bytes", "Idle RSS plus data source imports, for admission"
+)
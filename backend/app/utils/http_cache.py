@@ -0,0 +1,114 @@
+"""
+Content-addressed HTTP caching for analysis endpoints.
+
+A response is fully determined by its session, request parameters, the
+data source and the model version (RESULTS_VERSION), so its strong ETag is
+a hash of those and can be checked before any session is loaded. A match
+on ``If-None-Match`` returns 304 Not Modified for GET/HEAD (412 for other
+methods, per RFC 9110). Once a complete result has been computed, past
+seasons get a long-lived, immutable ``Cache-Control`` so browsers and a
+CDN/reverse proxy can serve repeats; results from a fallback or partial
+path are sent with ``no-store`` and without the ETag.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import DATA_SOURCE, HTTP_CACHE_CURRENT_MAX_AGE, HTTP_CACHE_MAX_AGE
+from app.services.session_data import session_key
+from app.services.shared_cache import RESULTS_VERSION
+from app.utils import metrics
+from fastapi import Request, Response
+
+
+def make_etag(endpoint: str, params: Dict[str, Any]) -> str:
+    """
+    Strong ETag for a response.
+
+    Args:
+        endpoint: Endpoint name, e.g. "degradation"
+        params: Everything the response depends on besides the model version
+                and data source (session key and request parameters)
+    """
+    identity = {
+        "endpoint": endpoint,
+        "params": params,
+        "source": DATA_SOURCE,
+        "version": RESULTS_VERSION,
+    }
+    digest = hashlib.sha256(
+        json.dumps(identity, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def session_etag(
+    endpoint: str, request: Any, extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    ETag for a session analysis request (a model with year, race, session).
+
+    The race is normalised as in the session key, so "Monza" and "monza"
+    share an ETag. `extra` adds anything else the response depends on.
+    """
+    params = request.model_dump(exclude={"year", "race", "session"})
+    params["session"] = session_key(request.year, request.race, request.session)
+    params.update(extra or {})
+    return make_etag(endpoint, params)
+
+
+def cache_control(year: int) -> str:
+    """Cache-Control for a response about a season."""
+    if year < datetime.now(timezone.utc).year:
+        return f"public, max-age={HTTP_CACHE_MAX_AGE}, immutable"
+    return f"public, max-age={HTTP_CACHE_CURRENT_MAX_AGE}"
+
+
+def cache_headers(etag: str, year: int, complete: bool = True) -> Dict[str, str]:
+    """
+    Caching headers for a computed response.
+
+    Only a complete result gets the ETag and Cache-Control (immutable for
+    past seasons). A result from a fallback or partial path gets
+    "no-store" instead, so no client or proxy keeps it and the next
+    request computes it again.
+    """
+    if not complete:
+        return {"Cache-Control": "no-store"}
+    return {"ETag": etag, "Cache-Control": cache_control(year)}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def conditional_response(request: Request, etag: str, year: int) -> Optional[Response]:
+    """
+    Answer an endpoint call from the client's cache, if it has this version.
+
+    Nothing is set on a miss: the endpoint adds cache_headers once its
+    result is computed, and only a complete result carries the ETag a
+    client can send back.
+
+    Args:
+        request: Incoming request (for If-None-Match and the method)
+        etag: From make_etag / session_etag
+        year: Season of the analysed session
+
+    Returns:
+        304 (or 412) response on a match, otherwise None
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.inc("f1_cache_requests_total", cache="http", result="hit")
+        status_code = 304 if request.method in ("GET", "HEAD") else 412
+        return Response(status_code=status_code, headers=cache_headers(etag, year))
+
+    metrics.inc("f1_cache_requests_total", cache="http", result="miss")
+    return None
@@ -0,0 +1,297 @@
+"""
+Lightweight in-process metrics for the F1 Strategy Room backend.
+
+Collects stage timings, counters and gauges and renders them in the
+Prometheus text exposition format. Stage timings recorded while a request
+is being handled are also reported back to the client as a
+``Server-Timing`` header.
+
+When metrics are disabled (``METRICS_ENABLED=false``) the decorators return
+the wrapped function untouched and the middleware is not installed, so the
+instrumented code paths run without any extra work.
+"""
+import functools
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import METRICS_ENABLED
+
+# Histogram buckets in seconds, sized for everything from JSON encoding
+# (milliseconds) up to cold FastF1 session loads (tens of seconds)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+_help: Dict[str, str] = {}
+
+# Per-request list of (stage, seconds) used to build the Server-Timing header
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_stages", default=None
+)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, help_text: str) -> None:
+    """Register the HELP text shown for a metric in the /metrics output."""
+    _help[name] = help_text
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    """Increment a counter."""
+    if not METRICS_ENABLED:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def gauge_add(name: str, value: float, **labels: str) -> None:
+    """Add (or subtract, with a negative value) to a gauge."""
+    if not METRICS_ENABLED:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _gauges.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def gauge_set(name: str, value: float, **labels: str) -> None:
+    """Set a gauge to an absolute value."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _gauges.setdefault(name, {})[_label_key(labels)] = value
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    """Record a duration in a histogram."""
+    if not METRICS_ENABLED:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        # Layout: one slot per bucket, then +Inf, sum
+        buckets = series.get(key)
+        if buckets is None:
+            buckets = series[key] = [0.0] * (len(DURATION_BUCKETS) + 2)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+        buckets[-2] += 1
+        buckets[-1] += seconds
+
+
+def record_stage(stage_name: str, seconds: float) -> None:
+    """Record a completed stage globally and for the current request."""
+    observe("f1_stage_duration_seconds", seconds, stage=stage_name)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage_name, seconds))
+
+
+@contextmanager
+def stage(stage_name: str):
+    """
+    Time a block of code as a named pipeline stage.
+
+    Example:
+        with metrics.stage("simulate_strategies"):
+            strategies = engine.simulate_strategies(...)
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage_name, time.perf_counter() - start)
+
+
+def timed(stage_name: str) -> Callable:
+    """
+    Decorator form of :func:`stage`.
+
+    Returns the function unchanged when metrics are disabled, so decorated
+    service methods carry no overhead at all in that configuration.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage_name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def get_rss_bytes() -> int:
+    """
+    Current resident set size of this process in bytes.
+
+    Reads /proc on Linux and falls back to the peak RSS reported by
+    getrusage elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_peak_rss_bytes() -> int:
+    """Peak resident set size of this process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    gauge_set("f1_process_resident_memory_bytes", get_rss_bytes())
+    gauge_set("f1_process_peak_resident_memory_bytes", get_peak_rss_bytes())
+
+    lines: List[str] = []
+    with _lock:
+        for kind, store in (("counter", _counters), ("gauge", _gauges)):
+            for name in sorted(store):
+                if name in _help:
+                    lines.append(f"# HELP {name} {_help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in store[name].items():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name in sorted(_histograms):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, buckets in _histograms[name].items():
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    labels = _format_labels(key, ("le", f"{bound:g}"))
+                    lines.append(f"{name}_bucket{labels} {_format_value(count)}")
+                labels = _format_labels(key, ("le", "+Inf"))
+                count = _format_value(buckets[-2])
+                lines.append(f"{name}_bucket{labels} {count}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {buckets[-1]:.6f}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear all recorded metrics (used by benchmarks between scenarios)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def server_timing_header(stages: List[Tuple[str, float]]) -> str:
+    """Build a Server-Timing header value, summing repeated stages."""
+    totals: Dict[str, List[float]] = {}
+    for stage_name, seconds in stages:
+        entry = totals.setdefault(stage_name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    parts = []
+    for stage_name, (seconds, count) in totals.items():
+        part = f"{stage_name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware tracking in-flight requests and request latency.
+
+    Adds a ``Server-Timing`` header listing every stage recorded while the
+    request was handled, plus the total time spent in the application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: List[Tuple[str, float]] = []
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                timings = stages + [("total", time.perf_counter() - start)]
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", server_timing_header(timings).encode("latin-1"))
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        gauge_add("f1_http_requests_in_flight", 1)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            gauge_add("f1_http_requests_in_flight", -1)
+            _request_stages.reset(token)
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "unmatched")
+            elapsed = time.perf_counter() - start
+            inc(
+                "f1_http_requests_total",
+                handler=handler,
+                method=scope["method"],
+                status=str(status["code"]),
+            )
+            observe("f1_http_request_duration_seconds", elapsed, handler=handler)
+
+
+describe("f1_stage_duration_seconds", "Time spent in each analysis pipeline stage")
+describe("f1_http_requests_total", "HTTP requests handled, by handler and status")
+describe("f1_http_request_duration_seconds", "End-to-end HTTP request latency")
+describe("f1_http_requests_in_flight", "HTTP requests currently being handled")
+describe("f1_cache_requests_total", "Session cache lookups, by cache and result")
+describe("f1_process_resident_memory_bytes", "Current resident set size")
+describe("f1_process_peak_resident_memory_bytes", "Peak resident set size")
@@ -0,0 +1,217 @@
+"""
+Opt-in per-request CPU and allocation profiling.
+
+An admin can ask for a single request to be profiled by sending
+``X-Profile: 1`` (or adding ``?profile=1``) together with a valid
+``X-Admin-Token``. The request is then run under cProfile and tracemalloc
+and the results are written to ``PROFILES_DIR``:
+
+- ``<profile_id>.prof``: raw cProfile stats (load with pstats or snakeviz)
+- ``<profile_id>.txt``: readable summary with the top functions by
+  cumulative time and the top allocation sites
+
+The profile id is returned in the ``X-Profile-Id`` response header and the
+files can be downloaded through the admin API. Requests that do not opt in
+only pay for a header scan, and the middleware is not installed at all
+when no admin token is configured.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from app.config import PROFILE_MAX_RETAINED, PROFILE_TOP_ALLOCATIONS, PROFILES_DIR
+from app.utils.admin import is_admin_token
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+TOP_FUNCTIONS = 40
+
+# cProfile and tracemalloc are process-wide, so only one profile at a time
+_profile_lock = threading.Lock()
+
+
+def _wants_profile(scope) -> bool:
+    """Check whether the request opted in to profiling with a valid token."""
+    opted_in = False
+    token = None
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile" and value in (b"1", b"true"):
+            opted_in = True
+        elif name == b"x-admin-token":
+            token = value.decode("latin-1")
+
+    query = scope.get("query_string", b"")
+    if not opted_in and b"profile" in query:
+        params = parse_qs(query.decode("latin-1"))
+        opted_in = params.get("profile", [""])[0] in ("1", "true")
+
+    return opted_in and is_admin_token(token)
+
+
+def _format_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[str]:
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+    )
+    lines = []
+    for index, stat in enumerate(snapshot.statistics("lineno")[:limit], 1):
+        frame = stat.traceback[0]
+        lines.append(
+            f"#{index}: {frame.filename}:{frame.lineno} "
+            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks"
+        )
+    return lines
+
+
+def _write_profile(
+    profile_id: str,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    peak_bytes: int,
+    summary: Dict[str, str],
+) -> None:
+    """Write raw stats and a readable report, then prune old profiles."""
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(PROFILES_DIR / f"{profile_id}.prof"))
+
+    stats_stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_stream)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    report = [f"{key}: {value}" for key, value in summary.items()]
+    report.append(f"peak_traced_memory: {peak_bytes / 1024 / 1024:.2f} MiB")
+    report.append("")
+    report.append(f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites (still allocated)")
+    report.append("-" * 70)
+    report.extend(_format_allocations(snapshot, PROFILE_TOP_ALLOCATIONS))
+    report.append("")
+    report.append(f"Top {TOP_FUNCTIONS} functions by cumulative time")
+    report.append("-" * 70)
+    report.append(stats_stream.getvalue())
+
+    (PROFILES_DIR / f"{profile_id}.txt").write_text("\n".join(report))
+    prune_profiles(PROFILE_MAX_RETAINED)
+
+
+def prune_profiles(max_retained: int) -> None:
+    """Delete the oldest profiles beyond max_retained."""
+    profiles = list_profiles()
+    for profile in profiles[max_retained:]:
+        for suffix in (".prof", ".txt"):
+            try:
+                (PROFILES_DIR / f"{profile['profile_id']}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    """List retained profiles, newest first."""
+    if not PROFILES_DIR.exists():
+        return []
+
+    profiles = []
+    for entry in os.scandir(PROFILES_DIR):
+        if not entry.name.endswith(".txt"):
+            continue
+        profile_id = entry.name[:-4]
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            continue
+        stat = entry.stat()
+        profiles.append(
+            {
+                "profile_id": profile_id,
+                "created_at": stat.st_mtime,
+                "size_bytes": stat.st_size,
+            }
+        )
+
+    profiles.sort(key=lambda p: p["created_at"], reverse=True)
+    return profiles
+
+
+def get_profile_path(profile_id: str, kind: str) -> Optional[Path]:
+    """Resolve the file for a profile id ('prof' or 'txt'), if it exists."""
+    if not PROFILE_ID_PATTERN.match(profile_id) or kind not in ("prof", "txt"):
+        return None
+    path = PROFILES_DIR / f"{profile_id}.{kind}"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running opted-in requests under cProfile and tracemalloc."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not _profile_lock.acquire(blocking=False):
+            # Another profile is in progress; serve the request normally
+            await self.app(scope, receive, _with_header(send, b"x-profile-skipped"))
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            tracemalloc.start()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+                snapshot = tracemalloc.take_snapshot()
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            _write_profile(
+                profile_id,
+                profiler,
+                snapshot,
+                peak_bytes,
+                {
+                    "profile_id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": str(status["code"]),
+                    "duration_ms": f"{(time.perf_counter() - start) * 1000:.1f}",
+                    "note": "async requests interleaved on the event loop "
+                    "are included in the CPU profile",
+                },
+            )
+        finally:
+            _profile_lock.release()
+
+
+def _with_header(send, header_name: bytes):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers", [])) + [(header_name, b"1")]
+            message = {**message, "headers": headers}
+        await send(message)
+
+    return wrapped
@@ -0,0 +1,132 @@
+"""Benchmark for the joint tyre/fuel DegradationModel fit.
+
+1. Accuracy: fits races generated with a known fuel effect and known
+   compound curves and reports the recovered values.
+2. Throughput: fits every race of a synthetic season, one session at a time
+   and as one batched solve, and reports sessions per second.
+3. Bootstrap: time for BOOTSTRAP_SAMPLES stint resamples of one race and
+   the spread of the resampled fuel effect.
+"""
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from app.services.degradation_model import DegradationModel  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+
+YEAR = 2023
+RUNS = 20
+N_DRIVERS = 20
+N_LAPS = 57
+BOOTSTRAP_SAMPLES = 1000
+TRUE_COMPOUNDS = {
+    "SOFT": (0.0020, 0.060, 90.0),
+    "MEDIUM": (0.0010, 0.035, 90.6),
+    "HARD": (0.0005, 0.020, 91.05),
+}
+
+
+def known_race(rng: np.random.Generator, fuel_effect: float) -> dict:
+    """Lap arrays for a one-stop race with a known fuel effect and curves."""
+    compound, tyre_life, lap_number, lap_time, stint_id = [], [], [], [], []
+    for driver in range(N_DRIVERS):
+        pit_lap = int(rng.integers(15, 40))
+        first, second = rng.choice(list(TRUE_COMPOUNDS), size=2, replace=False)
+        for lap in range(2, N_LAPS + 1):
+            if lap in (pit_lap, pit_lap + 1):
+                continue
+            name = first if lap < pit_lap else second
+            life = lap if lap < pit_lap else lap - pit_lap
+            a, b, c = TRUE_COMPOUNDS[name]
+            compound.append(name)
+            tyre_life.append(life)
+            lap_number.append(lap)
+            stint_id.append(2 * driver + (lap > pit_lap))
+            lap_time.append(
+                a * life**2 + b * life + c - fuel_effect * lap + rng.normal(0, 0.15)
+            )
+    return {
+        "compound": np.array(compound),
+        "tyre_life": np.array(tyre_life, dtype=float),
+        "lap_number": np.array(lap_number, dtype=float),
+        "lap_time": np.array(lap_time),
+        "stint_id": np.array(stint_id),
+    }
+
+
+def check_accuracy(model: DegradationModel) -> None:
+    rng = np.random.default_rng(3)
+    fuel_effects = rng.uniform(0.04, 0.08, size=5)
+    fits = model.fit_sessions([known_race(rng, fuel) for fuel in fuel_effects])
+
+    print("Fuel effect (s/lap): true vs fitted")
+    for fuel, fit in zip(fuel_effects, fits):
+        print(f"  {fuel:.4f}  {fit['fuel_effect_per_lap']:.4f}")
+
+    print("Tyre curves (first race): true vs fitted [a, b, c]")
+    for curve in fits[0]["curves"]:
+        true = TRUE_COMPOUNDS[curve["compound"]]
+        fitted = ", ".join(f"{v:.4f}" for v in curve["coefficients"])
+        print(f"  {curve['compound']:<7} {list(true)}  [{fitted}]")
+
+
+def median_seconds(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    model = DegradationModel()
+    check_accuracy(model)
+
+    source = SyntheticDataSource()
+    client = FastF1Client(source)
+    sessions = [
+        source.load_session(YEAR, event["round_number"], "R")
+        for event in source.get_schedule(YEAR)
+    ]
+    n = len(sessions)
+
+    extract = median_seconds(lambda: [client.get_fit_laps(s) for s in sessions])
+    fit_laps = [client.get_fit_laps(s) for s in sessions]
+    one_by_one = median_seconds(lambda: [model.fit_session(laps) for laps in fit_laps])
+    batched = median_seconds(lambda: model.fit_sessions(fit_laps))
+
+    laps = sum(len(laps["lap_time"]) for laps in fit_laps)
+    print(f"\nSeason of {n} synthetic races, {laps} fit laps")
+    print(
+        f"  extract fit laps:     {extract * 1000:7.2f} ms  {n / extract:8.0f} sessions/s"
+    )
+    print(
+        f"  fit one at a time:    {one_by_one * 1000:7.2f} ms  "
+        f"{n / one_by_one:8.0f} sessions/s"
+    )
+    print(
+        f"  fit batched:          {batched * 1000:7.2f} ms  {n / batched:8.0f} sessions/s"
+    )
+
+    bootstrap = median_seconds(
+        lambda: model.bootstrap(fit_laps[0], n_samples=BOOTSTRAP_SAMPLES)
+    )
+    samples = model.bootstrap(fit_laps[0], n_samples=BOOTSTRAP_SAMPLES)
+    low, high = np.percentile(samples["fuel_effect_per_lap"], [2.5, 97.5])
+    print(
+        f"\nBootstrap, {BOOTSTRAP_SAMPLES} stint resamples of one race: "
+        f"{bootstrap * 1000:.2f} ms"
+    )
+    print(
+        f"  fuel effect {model.fit_session(fit_laps[0])['fuel_effect_per_lap']:.4f} "
+        f"s/lap, 95% interval [{low:.4f}, {high:.4f}]"
+    )
+
+
+if __name__ == "__main__":
+    main()
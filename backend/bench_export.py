@@ -0,0 +1,86 @@
+"""Benchmark for the binary columnar export against JSON.
+
+Encodes the quick laps of one synthetic race and of a whole synthetic
+season as JSON (what a JSON laps endpoint sends: get_race_laps dicts),
+streamed .npz and, when pyarrow is installed, an Arrow IPC stream. Reports
+bytes and encode/decode time for each.
+"""
+import io
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+from app.utils import columnar  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+YEAR = 2023
+RUNS = 10
+
+
+def median_seconds(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def encode(fmt: str, client: FastF1Client, sessions: list) -> bytes:
+    if fmt == "json":
+        laps = [lap for s in sessions for lap in client.get_race_laps(s)["laps"]]
+        return JSONResponse({"laps": laps, "total_laps": len(laps)}).body
+    parts = [client.get_race_lap_columns(s) for s in sessions]
+    columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+    return b"".join(columnar.stream_columns(columns, fmt))
+
+
+def decode(fmt: str, data: bytes) -> int:
+    if fmt == "json":
+        return len(json.loads(data)["laps"])
+    if fmt == "npz":
+        with np.load(io.BytesIO(data)) as archive:
+            return len({name: archive[name] for name in archive.files}["lap_time"])
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_all().num_rows
+
+
+def report(label: str, client: FastF1Client, sessions: list) -> None:
+    formats = ["json", "npz"] + (["arrow"] if columnar.arrow_available() else [])
+    print(f"\n{label}")
+    print(
+        f"  {'format':<7} {'rows':>7} {'bytes':>11} {'encode ms':>10} {'decode ms':>10}"
+    )
+    for fmt in formats:
+        data = encode(fmt, client, sessions)
+        rows = decode(fmt, data)
+        encode_time = median_seconds(lambda: encode(fmt, client, sessions))
+        decode_time = median_seconds(lambda: decode(fmt, data))
+        print(
+            f"  {fmt:<7} {rows:>7} {len(data):>11,} "
+            f"{encode_time * 1000:>10.2f} {decode_time * 1000:>10.2f}"
+        )
+    if not columnar.arrow_available():
+        print("  (arrow skipped: pyarrow not installed)")
+
+
+def main():
+    source = SyntheticDataSource()
+    client = FastF1Client(source)
+    sessions = [
+        source.load_session(YEAR, event["round_number"], "R")
+        for event in source.get_schedule(YEAR)
+    ]
+    report("Quick laps, one race", client, sessions[:1])
+    report(f"Quick laps, {len(sessions)}-race season", client, sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark for the FastF1 disk cache index.
+
+Builds a fake cache of SEASONS × EVENTS × SESSIONS session directories with
+FILES_PER_SESSION files each, then times a cold index build, an incremental
+refresh with nothing changed, a refresh after a few sessions changed, and
+LRU eviction down to half the size.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from app.services.fastf1_cache import FastF1DiskCache  # noqa: E402
+
+SEASONS = range(2018, 2024)
+EVENTS = 24
+SESSIONS = ("Practice_1", "Practice_2", "Practice_3", "Qualifying", "Race")
+FILES_PER_SESSION = 12
+FILE_BYTES = 4096
+
+
+def build(root: Path) -> int:
+    files = 0
+    payload = os.urandom(FILE_BYTES)
+    for year in SEASONS:
+        for event in range(EVENTS):
+            for session in SESSIONS:
+                path = root / str(year) / f"{year}-{event:02d}_Grand_Prix" / session
+                path.mkdir(parents=True)
+                for i in range(FILES_PER_SESSION):
+                    (path / f"data_{i}.ff1pkl").write_bytes(payload)
+                    files += 1
+    (root / "fastf1_http_cache.sqlite").write_bytes(payload)
+    return files
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        files = build(root)
+        cache = FastF1DiskCache(root, max_bytes=0, pinned=["2023/*/Race"])
+        print(f"{files} files in {files // FILES_PER_SESSION} sessions\n")
+
+        timed("cold index build", cache.refresh)
+        timed("refresh, nothing changed", cache.refresh)
+        for year in (2019, 2021, 2023):
+            path = root / str(year) / f"{year}-05_Grand_Prix" / "Race"
+            (path / "extra.ff1pkl").write_bytes(b"x" * FILE_BYTES)
+        timed("refresh, 3 sessions changed", cache.refresh)
+        timed("full rescan", lambda: cache.refresh(full=True))
+
+        size = cache.stats()["size_bytes"]
+        result = timed("evict to half size", lambda: cache.evict(size // 2))
+        stats = cache.stats()
+        print(
+            f"\n  evicted {len(result['evicted'])} sessions, "
+            f"{stats['size_bytes'] / size:.0%} of the size left, "
+            f"{len(stats['pinned'])} pinned kept"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Benchmark for lean session ingestion.
+
+Compares, per session, the memory of the two ways of holding a loaded
+session:
+
+- full: FastF1's Laps frame (~30 columns, object strings, timedeltas) kept
+        for the session's lifetime and analysed with pick_quicklaps and
+        iterrows, as the client did before sessions became SessionData
+- lean: the LapTable FastF1DataSource converts the frame to right after
+        loading (13 typed arrays), with the FastF1 objects released and the
+        analysis run by FastF1Client on the arrays
+
+For each it reports the memory still held once the session is loaded
+(steady) and the traced peak while loading and while running get_race_laps,
+get_stint_data for every driver and analyze_race.
+
+With --source fastf1, sessions are loaded from FastF1 (network or a warm
+FastF1 cache needed) and the full variant keeps the Session object. By
+default a Laps frame with all of FastF1's columns is built from synthetic
+sessions, so the comparison runs offline.
+
+Usage:
+    python bench_ingestion.py
+    python bench_ingestion.py --source fastf1 --races Monza Bahrain
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import (  # noqa: E402
+    FastF1DataSource,
+    SyntheticDataSource,
+)
+from app.services.degradation_model import DegradationModel  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+from app.services.session_data import SessionData  # noqa: E402
+
+YEAR = 2023
+RACES = ["Bahrain", "Monza", "Singapore"]
+
+
+# ============================================================================
+# Loading
+# ============================================================================
+
+
+def fastf1_laps_frame(session: SessionData):
+    """A FastF1 Laps frame, with all of its columns, holding a session's laps."""
+    import pandas as pd
+    from fastf1.core import Laps
+
+    laps = session.laps
+    n = len(laps)
+
+    def timedeltas(seconds: np.ndarray):
+        return pd.to_timedelta(seconds, unit="s")
+
+    def strings(values: np.ndarray) -> np.ndarray:
+        return values.astype(object)
+
+    sector = laps["lap_time"] / 3
+    start = laps["lap_start_time"]
+    return Laps(
+        {
+            "Time": timedeltas(laps["lap_end_time"]),
+            "Driver": strings(laps["driver"]),
+            "DriverNumber": strings(laps["driver_number"]),
+            "LapTime": timedeltas(laps["lap_time"]),
+            "LapNumber": laps["lap_number"].astype(np.float64),
+            "Stint": laps["stint"].astype(np.float64),
+            "PitOutTime": timedeltas(np.where(laps["pit_out"], start, np.nan)),
+            "PitInTime": timedeltas(
+                np.where(laps["pit_in"], laps["lap_end_time"], np.nan)
+            ),
+            "Sector1Time": timedeltas(sector),
+            "Sector2Time": timedeltas(sector),
+            "Sector3Time": timedeltas(sector),
+            "Sector1SessionTime": timedeltas(start + sector),
+            "Sector2SessionTime": timedeltas(start + 2 * sector),
+            "Sector3SessionTime": timedeltas(laps["lap_end_time"]),
+            "SpeedI1": np.full(n, 290.0),
+            "SpeedI2": np.full(n, 280.0),
+            "SpeedFL": np.full(n, 300.0),
+            "SpeedST": np.full(n, 320.0),
+            "IsPersonalBest": laps["is_personal_best"],
+            "Compound": strings(laps["compound"]),
+            "TyreLife": laps["tyre_life"].astype(np.float64),
+            "FreshTyre": laps["tyre_life"] <= 1,
+            "Team": strings(np.char.add("Team ", laps["driver"])),
+            "LapStartTime": timedeltas(start),
+            "LapStartDate": pd.Timestamp(datetime(YEAR, 1, 1)) + timedeltas(start),
+            "TrackStatus": np.full(n, "1", dtype=object),
+            "Position": laps["position"].astype(np.float64),
+            "Deleted": np.zeros(n, dtype=bool),
+            "DeletedReason": np.full(n, "", dtype=object),
+            "FastF1Generated": np.zeros(n, dtype=bool),
+            "IsAccurate": np.ones(n, dtype=bool),
+        }
+    )
+
+
+def load_full(source: str, race: str, session_type: str):
+    """The loaded FastF1 object: a Laps frame, or (fastf1) the Session."""
+    if source == "fastf1":
+        fastf1 = FastF1DataSource()._import_fastf1()
+        session = fastf1.get_session(YEAR, race, session_type)
+        session.load(laps=True, telemetry=False, weather=False, messages=False)
+        return session
+    return fastf1_laps_frame(
+        SyntheticDataSource().load_session(YEAR, race, session_type)
+    )
+
+
+def load_lean(source: str, race: str, session_type: str) -> SessionData:
+    """The session as FastF1DataSource ingests it."""
+    if source == "fastf1":
+        return FastF1DataSource().load_session(YEAR, race, session_type)
+    session = SyntheticDataSource().load_session(YEAR, race, session_type)
+    frame = fastf1_laps_frame(session)
+    del session
+    laps = FastF1DataSource._lap_table(frame)
+    del frame
+    return SessionData(YEAR, session_type, {"EventName": race}, laps)
+
+
+# ============================================================================
+# Analysis
+# ============================================================================
+
+
+def full_analysis(laps) -> None:
+    """get_race_laps, get_stint_data and analyze_race on the Laps frame."""
+    race_laps = [
+        {
+            "driver": lap["Driver"],
+            "lap_number": int(lap["LapNumber"]),
+            "lap_time": float(lap["LapTime"].total_seconds()),
+            "compound": lap["Compound"],
+            "tyre_life": int(lap["TyreLife"]) if lap["TyreLife"] else None,
+            "is_personal_best": bool(lap["IsPersonalBest"]),
+        }
+        for _, lap in laps.pick_quicklaps().iterrows()
+    ]
+
+    stints = {}
+    for driver in laps["Driver"].unique():
+        driver_stints = stints[driver] = []
+        for _, lap in laps.pick_drivers(driver).pick_quicklaps().iterrows():
+            if not driver_stints or driver_stints[-1]["compound"] != lap["Compound"]:
+                driver_stints.append(
+                    {
+                        "stint_number": len(driver_stints) + 1,
+                        "compound": lap["Compound"],
+                        "start_lap": int(lap["LapNumber"]),
+                        "laps": [],
+                    }
+                )
+            driver_stints[-1]["end_lap"] = int(lap["LapNumber"])
+            driver_stints[-1]["laps"].append(
+                {
+                    "lap_time": float(lap["LapTime"].total_seconds()),
+                    "tyre_life": int(lap["TyreLife"]) if lap["TyreLife"] else None,
+                    "lap_number": int(lap["LapNumber"]),
+                }
+            )
+
+    DegradationModel().analyze_race(stints)
+    del race_laps
+
+
+def lean_analysis(client: FastF1Client, session: SessionData) -> None:
+    """get_race_laps, get_stint_data and analyze_race on the LapTable."""
+    client.get_race_laps(session)
+    for driver in session.laps.drivers():
+        client.get_stint_data(session, driver)
+    DegradationModel().analyze_race(client.get_stint_table(session))
+
+
+# ============================================================================
+# Measurement
+# ============================================================================
+
+
+def traced(fn):
+    """Result of fn(), memory it still holds and traced peak (bytes)."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, peak
+
+
+def measure(source: str, race: str, session_type: str) -> dict:
+    client = FastF1Client(SyntheticDataSource())
+    full, full_held, full_load_peak = traced(
+        lambda: load_full(source, race, session_type)
+    )
+    laps = full.laps if source == "fastf1" else full
+    _, _, full_analysis_peak = traced(lambda: full_analysis(laps))
+    n_laps = len(laps)
+    full = laps = None  # freed before the lean variant is traced
+
+    lean, lean_held, lean_load_peak = traced(
+        lambda: load_lean(source, race, session_type)
+    )
+    if lean is None:
+        raise SystemExit(f"Could not load {YEAR} {race} {session_type}")
+    _, _, lean_analysis_peak = traced(lambda: lean_analysis(client, lean))
+
+    return {
+        "laps": n_laps,
+        "full": (full_held, full_load_peak, full_analysis_peak),
+        "lean": (lean_held, lean_load_peak, lean_analysis_peak),
+        "lap_table": lean.laps.nbytes(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--source", choices=["synthetic", "fastf1"], default="synthetic"
+    )
+    parser.add_argument("--races", nargs="+", default=RACES)
+    parser.add_argument("--session", default="R")
+    args = parser.parse_args()
+
+    # Import pandas and fastf1 (and anything else created on first use)
+    # before tracing
+    measure("synthetic", RACES[0], args.session)
+
+    print(f"{YEAR}, session {args.session}, source {args.source}\n")
+    print(
+        f"  {'race':<10} {'laps':>5} {'':<5} {'steady':>9} {'load peak':>10}"
+        f" {'analysis peak':>14}"
+    )
+    for race in args.races:
+        result = measure(args.source, race, args.session)
+        for variant in ("full", "lean"):
+            held, load_peak, analysis_peak = result[variant]
+            print(
+                f"  {race if variant == 'full' else '':<10}"
+                f" {result['laps'] if variant == 'full' else '':>5} {variant:<5}"
+                f" {held / 1e6:7.2f}MB {load_peak / 1e6:8.2f}MB"
+                f" {analysis_peak / 1e6:12.2f}MB"
+            )
+        full_held, lean_held = result["full"][0], result["lean"][0]
+        print(
+            f"  {'':<10} {'':>5} {'':<5} {full_held / lean_held:7.1f}x smaller"
+            f" (LapTable {result['lap_table'] / 1e3:.0f}KB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""HTTP load test for the analysis endpoints.
+
+Starts the API with uvicorn in a subprocess (synthetic data source by
+default, so no network or FastF1 cache is needed) and drives /api/races,
+/api/degradation, /api/strategy and /api/overtakes with a closed loop of
+asyncio + httpx clients. Each scenario is one concurrency level, request
+mix and key distribution:
+
+- hot:  HOT_SHARE of requests go to the first HOT_RACES races of the
+        calendar, the rest are spread over the whole season
+- cold: races drawn uniformly from the whole season
+
+Per scenario it reports throughput, p50/p95/p99 latency, error rate and
+the peak RSS and PSS of the server process tree, and writes everything to a JSON
+file that --compare can diff against a previous run.
+
+Usage:
+    python bench_load.py                                 # default scenarios
+    python bench_load.py --concurrency 1 16 64 --duration 20 --keys hot
+    python bench_load.py --mix strategy=3,overtakes=1 --workers 4
+    python bench_load.py --data-source local --output load_after.json \\
+        --compare load_before.json
+    python bench_load.py --url http://localhost:8000     # existing server
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+YEAR = 2023
+HOT_RACES = 2
+HOT_SHARE = 0.9
+DEFAULT_MIX = {"races": 1, "degradation": 2, "strategy": 2, "overtakes": 1}
+DEFAULT_CONCURRENCY = [1, 8, 32]
+RSS_SAMPLE_INTERVAL = 0.05
+STARTUP_TIMEOUT = 30
+
+
+# ============================================================================
+# Server process
+# ============================================================================
+
+
+def start_server(port: int, workers: int, data_source: str) -> subprocess.Popen:
+    env = dict(os.environ, DATA_SOURCE=data_source)
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]  # fmt: skip
+    return subprocess.Popen(command, cwd=Path(__file__).resolve().parent, env=env)
+
+
+def wait_until_healthy(url: str, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not healthy after {STARTUP_TIMEOUT}s")
+
+
+def process_tree_memory(pid: int) -> tuple:
+    """
+    (RSS, PSS) in bytes of a process and all its descendants (Linux /proc).
+
+    RSS counts shared pages (mapped files, copy-on-write) once per worker;
+    PSS splits them between the processes sharing them, so its sum is what
+    the workers really cost together.
+    """
+    rss = pss = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1]) * 1024
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return rss, pss
+
+
+class RSSSampler:
+    """Background thread tracking the peak RSS and PSS of a process tree."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak = 0
+        self.peak_pss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss, pss = process_tree_memory(self.pid)
+            self.peak = max(self.peak, rss)
+            self.peak_pss = max(self.peak_pss, pss)
+            self._stop.wait(RSS_SAMPLE_INTERVAL)
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+# ============================================================================
+# Load generation
+# ============================================================================
+
+
+def pick_race(rng: random.Random, races: list, keys: str) -> str:
+    if keys == "hot" and rng.random() < HOT_SHARE:
+        return rng.choice(races[:HOT_RACES])
+    return rng.choice(races)
+
+
+def build_request(endpoint: str, race: str) -> tuple:
+    """(method, path, json body) for one request."""
+    if endpoint == "races":
+        return "GET", f"/api/races/{YEAR}", None
+    return "POST", f"/api/{endpoint}", {"year": YEAR, "race": race, "session": "R"}
+
+
+async def client_loop(client, rng, scenario, races, deadline, samples) -> None:
+    endpoints = list(scenario["mix"])
+    weights = list(scenario["mix"].values())
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        method, path, body = build_request(
+            endpoint, pick_race(rng, races, scenario["keys"])
+        )
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.append((endpoint, time.perf_counter() - start, ok))
+
+
+async def run_scenario(url: str, scenario: dict, races: list, seed: int) -> tuple:
+    """Run one scenario; returns the samples and the wall time in seconds."""
+    samples = []
+    limits = httpx.Limits(max_connections=scenario["concurrency"])
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        deadline = start + scenario["duration"]
+        await asyncio.gather(
+            *(
+                client_loop(
+                    client, random.Random(seed + i), scenario, races, deadline, samples
+                )
+                for i in range(scenario["concurrency"])
+            )
+        )
+        return samples, time.perf_counter() - start
+
+
+def warm_up(url: str, race: str, workers: int) -> None:
+    """Hit every endpoint once per worker so lazy imports are not measured."""
+    for endpoint in DEFAULT_MIX:
+        method, path, body = build_request(endpoint, race)
+        for _ in range(workers):
+            httpx.request(method, f"{url}{path}", json=body, timeout=120)
+
+
+def summarize(samples: list) -> dict:
+    latencies = np.array([latency for _, latency, _ in samples]) * 1000
+    errors = sum(not ok for _, _, ok in samples)
+    if latencies.size == 0:
+        return {"requests": 0, "errors": 0, "error_rate": 0.0, "latency_ms": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "latency_ms": {
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "mean": round(float(latencies.mean()), 2),
+            "max": round(float(latencies.max()), 2),
+        },
+    }
+
+
+def scenario_result(scenario: dict, samples: list, elapsed: float, memory) -> dict:
+    result = dict(scenario, **summarize(samples))
+    result["elapsed_s"] = round(elapsed, 2)
+    result["throughput_rps"] = round(len(samples) / elapsed, 2)
+    peak_rss, peak_pss = memory or (None, None)
+    result["peak_rss_mb"] = None if peak_rss is None else round(peak_rss / 2**20, 1)
+    result["peak_pss_mb"] = None if peak_pss is None else round(peak_pss / 2**20, 1)
+    result["endpoints"] = {
+        endpoint: summarize([s for s in samples if s[0] == endpoint])
+        for endpoint in scenario["mix"]
+    }
+    return result
+
+
+# ============================================================================
+# Reporting
+# ============================================================================
+
+
+def print_result(result: dict) -> None:
+    latency = result["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0}
+    rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f}"
+    pss = "-" if result["peak_pss_mb"] is None else f"{result['peak_pss_mb']:.0f}"
+    print(
+        f"{result['name']:<20} {result['throughput_rps']:>9.1f} "
+        f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} "
+        f"{result['error_rate'] * 100:>7.2f}% {rss:>9} {pss:>9}"
+    )
+
+
+def print_comparison(results: list, baseline_path: Path) -> None:
+    baseline = {
+        r["name"]: r for r in json.loads(baseline_path.read_text())["scenarios"]
+    }
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'scenario':<20} {'rps':>9} {'p95':>9} {'p99':>9} {'rss':>9} {'pss':>9}")
+
+    def change(new, old):
+        if not new or not old:
+            return "-"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None:
+            print(f"{result['name']:<20} (not in baseline)")
+            continue
+        latency = result["latency_ms"] or {}
+        old_latency = old["latency_ms"] or {}
+        print(
+            f"{result['name']:<20} "
+            f"{change(result['throughput_rps'], old['throughput_rps']):>9} "
+            f"{change(latency.get('p95'), old_latency.get('p95')):>9} "
+            f"{change(latency.get('p99'), old_latency.get('p99')):>9} "
+            f"{change(result['peak_rss_mb'], old['peak_rss_mb']):>9} "
+            f"{change(result['peak_pss_mb'], old.get('peak_pss_mb')):>9}"
+        )
+
+
+def parse_mix(text: str) -> dict:
+    """'strategy=3,overtakes=1' -> {'strategy': 3.0, 'overtakes': 1.0}"""
+    mix = {}
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{endpoint}'")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def build_scenarios(args) -> list:
+    if args.scenarios:
+        scenarios = json.loads(args.scenarios.read_text())
+        for scenario in scenarios:
+            scenario.setdefault("mix", DEFAULT_MIX)
+            scenario.setdefault("keys", "hot")
+            scenario.setdefault("duration", args.duration)
+        return scenarios
+
+    return [
+        {
+            "name": f"{keys}-c{concurrency}",
+            "concurrency": concurrency,
+            "keys": keys,
+            "mix": args.mix,
+            "duration": args.duration,
+        }
+        for keys in args.keys
+        for concurrency in args.concurrency
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Target an already running server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--data-source", default="synthetic")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY
+    )
+    parser.add_argument(
+        "--keys", nargs="+", choices=["hot", "cold"], default=["hot", "cold"]
+    )
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds each")
+    parser.add_argument(
+        "--scenarios", type=Path, help="JSON list of scenarios (overrides flags)"
+    )
+    parser.add_argument(
+        "--no-warmup",
+        action="store_true",
+        help="Skip the first request per endpoint (lazy imports, model setup)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("load_results.json"))
+    parser.add_argument("--compare", type=Path, help="Previous results file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, args.workers, args.data_source)
+
+    try:
+        if server is not None:
+            wait_until_healthy(url, server)
+        schedule = httpx.get(f"{url}/api/races/{YEAR}", timeout=120).json()["races"]
+        races = [race["race_name"] for race in schedule]
+        print(f"Target {url}, {len(races)} races in {YEAR}\n")
+        if not args.no_warmup:
+            warm_up(url, races[0], args.workers)
+
+        print(
+            f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'p99 ms':>9} {'errors':>8} {'rss MB':>9} {'pss MB':>9}"
+        )
+        results = []
+        for scenario in build_scenarios(args):
+            if server is not None:
+                with RSSSampler(server.pid) as sampler:
+                    samples, elapsed = asyncio.run(
+                        run_scenario(url, scenario, races, args.seed)
+                    )
+                memory = (sampler.peak, sampler.peak_pss)
+            else:
+                samples, elapsed = asyncio.run(
+                    run_scenario(url, scenario, races, args.seed)
+                )
+                memory = None
+            results.append(scenario_result(scenario, samples, elapsed, memory))
+            print_result(results[-1])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "url": url,
+                    "workers": None if args.url else args.workers,
+                    "data_source": None if args.url else args.data_source,
+                    "python": platform.python_version(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "scenarios": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
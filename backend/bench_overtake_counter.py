@@ -0,0 +1,81 @@
+"""Benchmark for the position-based OvertakeCounter.
+
+Builds a synthetic 20-driver, 70-lap race (random on-track swaps, one pit
+stop per driver, two retirements) and times OvertakeCounter.count, which
+needs to run in milliseconds per race for season-wide batch runs.
+"""
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.overtake_counter import OvertakeCounter  # noqa: E402
+
+N_DRIVERS = 20
+N_LAPS = 70
+N_RACES = 24
+RUNS = 20
+
+
+def synthetic_race(rng: np.random.Generator):
+    """Flat per-lap arrays for one race plus the number of swaps injected."""
+    order = list(range(N_DRIVERS))
+    pit_laps = rng.integers(15, 50, size=N_DRIVERS)
+    retired_after = {
+        int(d): int(rng.integers(20, 60)) for d in rng.choice(N_DRIVERS, 2)
+    }
+
+    drivers, laps, positions, pit_in, pit_out = [], [], [], [], []
+    injected = 0
+    for lap in range(1, N_LAPS + 1):
+        running = [d for d in order if retired_after.get(d, N_LAPS) >= lap]
+        # One random on-track swap every other lap, away from pit laps
+        if lap > 1 and lap % 2 == 0:
+            i = int(rng.integers(1, len(running)))
+            a, b = running[i], running[i - 1]
+            if all(abs(lap - pit_laps[d]) > 2 for d in (a, b)):
+                order[order.index(a)], order[order.index(b)] = b, a
+                running = [d for d in order if retired_after.get(d, N_LAPS) >= lap]
+                injected += 1
+        for pos, d in enumerate(running, 1):
+            drivers.append(f"D{d:02d}")
+            laps.append(lap)
+            positions.append(pos)
+            pit_in.append(lap == pit_laps[d])
+            pit_out.append(lap == pit_laps[d] + 1)
+
+    arrays = (
+        np.array(drivers),
+        np.array(laps, dtype=np.float64),
+        np.array(positions, dtype=np.float64),
+        np.array(pit_in),
+        np.array(pit_out),
+    )
+    return arrays, injected
+
+
+def main():
+    rng = np.random.default_rng(7)
+    races = [synthetic_race(rng) for _ in range(N_RACES)]
+    counter = OvertakeCounter()
+
+    for (arrays, injected), _ in zip(races, range(3)):
+        result = counter.count(*arrays)
+        print(f"Injected swaps: {injected}, counted: {result['total_overtakes']}")
+
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for arrays, _ in races:
+            counter.count(*arrays)
+        timings.append((time.perf_counter() - start) / N_RACES)
+
+    per_race_ms = np.median(timings) * 1000
+    print(f"\n{N_DRIVERS} drivers x {N_LAPS} laps: {per_race_ms:.2f} ms per race")
+    print(f"Season of {N_RACES} races: {per_race_ms * N_RACES:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark for the full-field RaceSimulator.
+
+1. Check: simulates a synthetic race with every driver's actual strategy
+   and compares the simulated finishing order with the real one.
+2. Latency: one race at a time, as used inside strategy search loops.
+3. Throughput: batched Monte Carlo races with lap-time noise.
+"""
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+from app.services.race_simulator import RaceSimulator  # noqa: E402
+
+YEAR = 2023
+RUNS = 50
+BATCHES = (10, 100, 1000)
+
+
+def median_seconds(fn, runs: int = RUNS) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    source = SyntheticDataSource()
+    client = FastF1Client(source)
+    event = source.get_schedule(YEAR)[0]
+    session = source.load_session(YEAR, event["round_number"], "R")
+    fit = client.get_degradation_fit(session)
+    total_laps = session.total_laps
+
+    simulator = RaceSimulator(
+        fit["curves"], fit["fuel_effect_per_lap"], source.PIT_LOSS
+    )
+    field = simulator.field_from_session(session)
+    plans = simulator.plan_arrays(field, total_laps)
+    args = (plans["compounds"], plans["pit_laps"], plans["pace_offset"], total_laps)
+
+    race = simulator.simulate(*args)
+    simulated = [r["driver"] for r in simulator.results(field, race["total_time"][0])]
+    laps = session.laps
+    last = laps.select(laps["lap_number"] == total_laps)
+    actual = [str(d) for d in last["driver"][np.argsort(last["lap_end_time"])]]
+    same = sum(a == s for a, s in zip(actual, simulated))
+    print(f"{event['race_name']}, {len(field)} drivers, {total_laps} laps")
+    print(f"  actual:    {' '.join(actual)}")
+    print(f"  simulated: {' '.join(simulated)}")
+    print(f"  same position: {same}/{len(actual)}")
+
+    single = median_seconds(lambda: simulator.simulate(*args))
+    print(f"\n  one race:        {single * 1000:8.2f} ms  {1 / single:8.0f} races/s")
+    for runs in BATCHES:
+        batch = median_seconds(
+            lambda: simulator.simulate(*args, runs=runs, lap_time_sigma=0.3),
+            runs=max(3, RUNS * 10 // runs),
+        )
+        print(
+            f"  batch of {runs:<6} {batch * 1000:8.2f} ms  {runs / batch:8.0f} races/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup benchmark: import time of app.main and lazy data-stack imports.
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and
+compares the median cumulative import time of app.main against the budget
+recorded in startup_budget.json. Also checks that importing the app and
+serving / and /health never imports the heavy data stack.
+
+Usage:
+    python bench_startup.py            # check against the recorded budget
+    python bench_startup.py --record   # re-record the budget (median x 1.5)
+
+Exits with status 1 if the budget is exceeded or a heavy module is imported.
+"""
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+RUNS = 7
+HEADROOM = 1.5
+HEAVY_MODULES = ["fastf1", "pandas", "sklearn", "scipy", "matplotlib"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s+app\.main$")
+
+HEALTH_CHECK = f"""
+import sys
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+assert client.get("/").status_code == 200
+assert client.get("/health").status_code == 200
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def measure_import_ms() -> float:
+    """Cumulative import time of app.main in a fresh interpreter, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.search(line.strip())
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError("app.main not found in -X importtime output")
+
+
+def heavy_modules_after_health_check() -> list:
+    result = subprocess.run(
+        [sys.executable, "-c", HEALTH_CHECK], capture_output=True, text=True, check=True
+    )
+    output = result.stdout.strip()
+    return output.split(",") if output else []
+
+
+def main() -> int:
+    samples = [measure_import_ms() for _ in range(RUNS)]
+    median_ms = statistics.median(samples)
+    print(f"app.main import time: median {median_ms:.1f} ms over {RUNS} runs")
+    print(f"  samples: {', '.join(f'{s:.0f}' for s in samples)} ms")
+
+    if "--record" in sys.argv:
+        budget = {"import_budget_ms": round(median_ms * HEADROOM)}
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"Recorded budget: {budget['import_budget_ms']} ms -> {BUDGET_FILE.name}")
+        return 0
+
+    failed = False
+    budget_ms = json.loads(BUDGET_FILE.read_text())["import_budget_ms"]
+    if median_ms > budget_ms:
+        print(f"FAILED: import time {median_ms:.1f} ms exceeds budget {budget_ms} ms")
+        failed = True
+    else:
+        print(f"SUCCESS: within budget ({budget_ms} ms)")
+
+    heavy = heavy_modules_after_health_check()
+    if heavy:
+        print(f"FAILED: serving / and /health imported: {', '.join(heavy)}")
+        failed = True
+    else:
+        print("SUCCESS: / and /health served without importing the data stack")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Benchmark for compact StintTable stints at season scale.
+
+Builds every driver's stints for every race of a synthetic season and fits
+the degradation curves, once with stints as lists of dicts (get_stint_data
++ analyze_race per race) and once as one StintTable (get_stint_table,
+concatenated, + analyze_season). Reports time and memory of both.
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from app.services.degradation_model import DegradationModel  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+from app.services.stints import StintTable  # noqa: E402
+
+YEAR = 2023
+RUNS = 5
+
+
+def dict_stints(client: FastF1Client, sessions) -> list:
+    return [
+        {
+            driver: client.get_stint_data(session, driver)
+            for driver in np.unique(session.laps["driver"]).tolist()
+        }
+        for session in sessions
+    ]
+
+
+def table_stints(client: FastF1Client, sessions) -> StintTable:
+    return StintTable.concatenate(
+        [client.get_stint_table(session) for session in sessions]
+    )
+
+
+def measure(build, fit):
+    """Median seconds to build and to fit, and traced memory of the stints."""
+    build_times, fit_times = [], []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        stints = build()
+        build_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        fit(stints)
+        fit_times.append(time.perf_counter() - start)
+        del stints
+
+    tracemalloc.start()
+    stints = build()  # noqa: F841 (kept alive while measuring)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(build_times)), float(np.median(fit_times)), retained, peak
+
+
+def main():
+    source = SyntheticDataSource()
+    client = FastF1Client(source)
+    sessions = [
+        source.load_session(YEAR, event["round_number"], "R")
+        for event in source.get_schedule(YEAR)
+    ]
+    laps = sum(len(session.laps) for session in sessions)
+    print(f"{len(sessions)} races, {laps} laps\n")
+
+    results = {
+        "dicts": measure(
+            lambda: dict_stints(client, sessions),
+            lambda stints: [DegradationModel().analyze_race(race) for race in stints],
+        ),
+        "StintTable": measure(
+            lambda: table_stints(client, sessions),
+            lambda stints: DegradationModel().analyze_season(stints),
+        ),
+    }
+
+    print(f"  {'':<11} {'build':>9} {'fit':>9} {'retained':>10} {'peak':>10}")
+    for name, (build, fit, retained, peak) in results.items():
+        print(
+            f"  {name:<11} {build * 1000:7.1f}ms {fit * 1000:7.1f}ms"
+            f" {retained / 1e6:8.2f}MB {peak / 1e6:8.2f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
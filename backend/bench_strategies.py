@@ -0,0 +1,135 @@
+"""Benchmark for the constraint-aware strategy enumerator.
+
+Counts the ordered compound sequences of every stop count and compares
+eager enumeration (every itertools.product sequence built, then filtered
+and reduced to one order of its equal-length stints) with
+StrategyEngine.iter_compound_sequences, which drops infeasible and
+reordered prefixes as it goes. Then times simulate_strategies on the full space and
+with top_n, where candidates are streamed and scored in chunks.
+"""
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+sys.path.insert(0, ".")
+
+from app.services.degradation_model import DegradationModel  # noqa: E402
+from app.services.strategy_engine import StrategyEngine  # noqa: E402
+
+TOTAL_LAPS = 57
+PIT_LOSS = 22.0
+DRY = list(DegradationModel.DRY_COMPOUNDS)
+ALL = list(DegradationModel.COMPOUNDS)
+
+# A typical race allocation (sets left) and stint limits
+TYRE_SETS = {"SOFT": 2, "MEDIUM": 2, "HARD": 2, "INTERMEDIATE": 2, "WET": 1}
+MAX_STINT_LAPS = {"SOFT": 20, "MEDIUM": 32, "HARD": 45, "INTERMEDIATE": 30}
+
+
+def eager(compounds, max_stops, tyre_sets=None, max_stint_laps=None):
+    """Every ordered sequence, materialised, then filtered."""
+    tyre_sets, max_stint_laps = tyre_sets or {}, max_stint_laps or {}
+    wet = set(DegradationModel.WET_COMPOUNDS)
+    order = {c: i for i, c in enumerate(compounds)}
+    candidates = [
+        sequence
+        for stops in range(max_stops + 1)
+        for sequence in product(compounds, repeat=stops + 1)
+    ]
+    feasible = []
+    for sequence in candidates:
+        n = len(sequence)
+        base = TOTAL_LAPS // n
+        lengths = [base] * (n - 1) + [TOTAL_LAPS - base * (n - 1)]
+        if not wet & set(sequence) and len(set(sequence)) < 2:
+            continue
+        # Swapping stints of equal length gives the same strategy
+        if any(
+            lengths[i] == lengths[i + 1] and order[sequence[i]] > order[sequence[i + 1]]
+            for i in range(n - 1)
+        ):
+            continue
+        if any(sequence.count(c) > tyre_sets.get(c, n) for c in set(sequence)):
+            continue
+        if any(
+            length > max_stint_laps.get(c, length)
+            for c, length in zip(sequence, lengths)
+        ):
+            continue
+        feasible.append(sequence)
+    return len(candidates), feasible
+
+
+def lazy(compounds, max_stops, tyre_sets=None, max_stint_laps=None):
+    return sum(
+        1
+        for _ in StrategyEngine.iter_compound_sequences(
+            compounds, max_stops, TOTAL_LAPS, tyre_sets, max_stint_laps
+        )
+    )
+
+
+def timed(fn):
+    """Result, seconds (untraced run) and traced peak memory of fn()."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    print(f"{TOTAL_LAPS} laps; constrained = sets {TYRE_SETS}, max stint laps\n")
+    print(
+        f"  {'compounds':<10} {'stops':>5} {'constraints':<11} {'ordered':>8}"
+        f" {'feasible':>8} {'eager':>16} {'lazy':>16}"
+    )
+    for compounds in (DRY, ALL):
+        for max_stops in range(1, 5):
+            for constrained in (False, True):
+                args = (TYRE_SETS, MAX_STINT_LAPS) if constrained else ()
+                (total, feasible), eager_s, eager_peak = timed(
+                    lambda: eager(compounds, max_stops, *args)
+                )
+                count, lazy_s, lazy_peak = timed(
+                    lambda: lazy(compounds, max_stops, *args)
+                )
+                assert count == len(feasible)
+                print(
+                    f"  {len(compounds):<10} {max_stops:>5}"
+                    f" {'yes' if constrained else 'no':<11} {total:>8} {count:>8}"
+                    f" {eager_s * 1000:6.1f}ms {eager_peak / 1024:5.0f}KB"
+                    f" {lazy_s * 1000:6.1f}ms {lazy_peak / 1024:5.0f}KB"
+                )
+
+    curves = [
+        {
+            "compound": compound,
+            "coefficients": [0.0005 * (3 - k % 3), 0.02 + 0.01 * k, 90.0 + 0.5 * k],
+        }
+        for k, compound in enumerate(ALL)
+    ]
+    engine = StrategyEngine(DegradationModel())
+    print(f"\nsimulate_strategies, {len(ALL)} compounds, 4 stops:")
+    for label, kwargs in (
+        ("all candidates", {}),
+        ("top_n=10", {"top_n": 10}),
+        ("top_n=10, constrained", {"top_n": 10, "tyre_sets": TYRE_SETS}),
+    ):
+        strategies, seconds, peak = timed(
+            lambda: engine.simulate_strategies(
+                curves, TOTAL_LAPS, PIT_LOSS, max_stops=4, **kwargs
+            )
+        )
+        print(
+            f"  {label:<22} {len(strategies):>5} strategies"
+            f" {seconds * 1000:8.1f}ms {peak / 1e6:6.2f}MB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
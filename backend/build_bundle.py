@@ -0,0 +1,77 @@
+"""Build a precompiled analysis bundle for serving with ANALYSIS_BUNDLE.
+
+Loads sessions from FastF1 (or another data source), runs stint extraction,
+the degradation fit and the default strategy simulation for each, and
+writes them to one memory-mappable file. An API started with
+ANALYSIS_BUNDLE=<file> answers those sessions without loading them.
+
+Usage:
+    python build_bundle.py --year 2023
+    python build_bundle.py --year 2022 2023 --races Monza Silverstone --sessions R
+    python build_bundle.py --year 2023 --source synthetic --output data/test.bundle
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from app.config import DATA_DIR  # noqa: E402
+from app.services.bundle import BundleWriter  # noqa: E402
+from app.services.data_sources import get_data_source  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--year", type=int, nargs="+", required=True)
+    parser.add_argument(
+        "--races", nargs="*", help="Race names or rounds (default: whole season)"
+    )
+    parser.add_argument("--sessions", nargs="+", default=["R"])
+    parser.add_argument(
+        "--source", choices=["fastf1", "local", "synthetic"], default="fastf1"
+    )
+    parser.add_argument("--output", type=Path, default=DATA_DIR / "analysis.bundle")
+    args = parser.parse_args()
+
+    client = FastF1Client(get_data_source(args.source))
+    writer = BundleWriter(client)
+
+    failures = 0
+    for year in args.year:
+        schedule = client.source.get_schedule(year)
+        if not schedule:
+            print(f"No schedule found for {year}")
+            failures += 1
+            continue
+        writer.add_schedule(year, schedule)
+
+        races = args.races or [event["round_number"] for event in schedule]
+        for race in races:
+            for session_type in args.sessions:
+                start = time.perf_counter()
+                session = client.load_session(year, race, session_type)
+                if session is None:
+                    print(f"FAILED: {year} {race} {session_type}")
+                    failures += 1
+                    continue
+
+                entry = writer.add_session(session)
+                print(
+                    f"{session.key}: {len(entry['fit']['curves'])} curves, "
+                    f"{sum(len(s) for s in entry['strategies'].values())} strategies "
+                    f"({time.perf_counter() - start:.1f}s)"
+                )
+
+    if not writer.sessions:
+        print("Nothing to bundle")
+        sys.exit(1)
+    size = writer.write(args.output)
+    print(f"{len(writer.sessions)} sessions, {size / 1024:.0f} KB -> {args.output}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
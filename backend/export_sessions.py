@@ -0,0 +1,73 @@
+"""Export sessions to the local data source layout.
+
+Loads sessions from FastF1 (or the synthetic generator) and writes the lap
+tables under LOCAL_DATA_DIR, so the API can run with DATA_SOURCE=local
+without network access to the livetiming API.
+
+Usage:
+    python export_sessions.py --year 2023
+    python export_sessions.py --year 2023 --races Monza Silverstone --sessions R Q
+    python export_sessions.py --year 2023 --source synthetic --format parquet
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from app.config import LOCAL_DATA_DIR  # noqa: E402
+from app.services.data_sources import LocalDataSource, get_data_source  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument(
+        "--races", nargs="*", help="Race names or rounds (default: whole season)"
+    )
+    parser.add_argument("--sessions", nargs="+", default=["R"])
+    parser.add_argument("--source", choices=["fastf1", "synthetic"], default="fastf1")
+    parser.add_argument("--format", choices=["npz", "parquet"], default="npz")
+    parser.add_argument("--output", type=Path, default=LOCAL_DATA_DIR)
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Parquet export needs pyarrow: pip install pyarrow")
+            sys.exit(1)
+
+    source = get_data_source(args.source)
+    local = LocalDataSource(args.output)
+
+    schedule = source.get_schedule(args.year)
+    if not schedule:
+        print(f"No schedule found for {args.year}")
+        sys.exit(1)
+    local.write_schedule(args.year, schedule)
+
+    races = args.races or [event["round_number"] for event in schedule]
+    failures = 0
+    for race in races:
+        for session_type in args.sessions:
+            start = time.perf_counter()
+            session = source.load_session(args.year, race, session_type)
+            if session is None:
+                print(f"FAILED: {args.year} {race} {session_type}")
+                failures += 1
+                continue
+
+            path = local.write_session(session, args.format)
+            print(
+                f"{session.key}: {len(session.laps)} laps, "
+                f"{path.stat().st_size / 1024:.0f} KB "
+                f"({time.perf_counter() - start:.1f}s) -> {path}"
+            )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
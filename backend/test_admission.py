@@ -0,0 +1,69 @@
+"""Test script for admission control under the deployed memory budget."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, ".")
+
+# Fresh caches, so every session load is a cold load
+os.environ["SHARED_CACHE_DIR"] = tempfile.mkdtemp()
+os.environ["JOBS_DB"] = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+os.environ.setdefault("DATA_SOURCE", "synthetic")
+
+from app.main import app  # noqa: E402
+from app.services.data_sources import DataSource, FastF1DataSource  # noqa: E402
+from app.utils import admission  # noqa: E402
+from app.utils.metrics import get_rss_bytes  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+MB = admission.MB
+BUDGET_MB = 450  # MEMORY_BUDGET_MB in render.yaml
+
+print("Testing admission control with FastF1 load estimates...\n")
+failures = []
+
+# Whatever source serves the sessions, admit them as FastF1 loads
+for source in DataSource.__subclasses__():
+    source.IMPORT_MEMORY_BYTES = FastF1DataSource.IMPORT_MEMORY_BYTES
+    source.LOAD_MEMORY_BYTES = FastF1DataSource.LOAD_MEMORY_BYTES
+
+
+def practice_request(client: TestClient, race: str, budget_mb: int) -> int:
+    controller = admission._controller
+    controller.memory_budget = budget_mb * MB
+    response = client.get(
+        f"/api/strategy?year=2023&race={race}&source=practice&total_laps=51"
+    )
+    print(
+        f"  {race:<10} budget {budget_mb}MB, baseline"
+        f" {controller.baseline / MB:.0f}MB, RSS {get_rss_bytes() / MB:.0f}MB:"
+        f" {response.status_code} {response.json().get('detail', '')}"
+    )
+    return response.status_code
+
+
+# The worker as deployed; the baseline is measured on startup
+admission._controller = admission.AdmissionController(memory_budget=BUDGET_MB * MB)
+with TestClient(app) as client:
+    # A fresh worker: four practice sessions loaded one after another
+    if practice_request(client, "Monza", BUDGET_MB) != 200:
+        failures.append("practice request refused on a fresh worker")
+
+    # Memory a finished load leaves in the allocator is not held against
+    # the next one
+    left_behind = bytearray(150 * MB)
+    if practice_request(client, "Bahrain", BUDGET_MB) != 200:
+        failures.append("practice request refused after an earlier load")
+    del left_behind
+
+    # A budget too small for one load is still enforced
+    if practice_request(client, "Singapore", 250) != 503:
+        failures.append("load admitted beyond the memory budget")
+
+if failures:
+    print("\nFAILED:")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1)
+
+print("\nAdmission control working correctly!")
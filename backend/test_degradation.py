@@ -21,7 +21,7 @@ print(f"SUCCESS: Loaded {session.event['EventName']}")
 
 # Get stint data for all drivers
 print("\nExtracting stint data for all drivers...")
-all_drivers = session.laps["Driver"].unique()
+all_drivers = session.laps.drivers()
 print(f"Found {len(all_drivers)} drivers")
 
 all_stints = {}
@@ -0,0 +1,130 @@
+"""Test script for JobQueue: recovery of jobs orphaned by a restart."""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+from app.services.job_queue import JobQueue  # noqa: E402
+
+LEASE = 2.0  # seconds
+
+
+def run(kind, params):
+    return {"kind": kind, **params}
+
+
+def queue(path: Path, workers: int = 1) -> JobQueue:
+    return JobQueue(run, path, workers=workers, poll_interval=0.1, lease_timeout=LEASE)
+
+
+def orphan(path: Path, job_id: str, worker: str, seen_ago: float) -> None:
+    """Mark a job as running by `worker`, last seen `seen_ago` seconds ago."""
+    now = time.time()
+    with queue(path, workers=0)._transaction() as db:
+        db.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, started_at = ?,"
+            " worker_seen_at = ? WHERE id = ?",
+            (worker, now - seen_ago, now - seen_ago, job_id),
+        )
+
+
+def wait_for(q: JobQueue, job_id: str, status: str, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if q.get(job_id)["status"] == status:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+print("Testing JobQueue restart recovery...\n")
+failures = []
+path = Path(tempfile.mkdtemp()) / "jobs.sqlite3"
+
+# Jobs left running by workers that are gone
+api = queue(path, workers=0)
+dead_pid, _ = api.submit("season", {"year": 2021})
+other_host, _ = api.submit("season", {"year": 2022})
+reused_pid, _ = api.submit("season", {"year": 2023})
+live_other, _ = api.submit("season", {"year": 2024})
+
+# A process on this host that claimed a job and died
+child = subprocess.run(
+    [
+        sys.executable,
+        "-c",
+        "import sys; sys.path.insert(0, '.');"
+        "from pathlib import Path; from app.services.job_queue import JobQueue;"
+        f"q = JobQueue(None, Path({str(path)!r}), workers=0); print(q._claim()['id'])",
+    ],
+    capture_output=True,
+    text=True,
+    check=True,
+)
+if child.stdout.strip() != dead_pid["id"]:
+    failures.append("child process did not claim the oldest job")
+# Another host's worker that stopped renewing its lease
+orphan(path, other_host["id"], "other-host:4242:0badf00d", seen_ago=LEASE * 2)
+# An earlier process whose pid is now ours (the pid is alive, the lease is not)
+orphan(path, reused_pid["id"], f"{api.worker_id.rsplit(':', 1)[0]}:deadbeef", LEASE * 2)
+# Another host's worker that is still running its job
+orphan(path, live_other["id"], "other-host:4243:0ddba11", seen_ago=0)
+
+# Submitting a job whose worker is alive reuses it; an expired one is requeued
+job, created = api.submit("season", {"year": 2024})
+print(f"Live lease dedup:    created={created} status={job['status']}")
+if created or job["status"] != "running":
+    failures.append("submit did not deduplicate against a live lease")
+job, created = api.submit("season", {"year": 2022})
+print(f"Expired lease dedup: created={created} status={job['status']}")
+if created or job["status"] != "queued":
+    failures.append("submit did not requeue the job with an expired lease")
+
+# Restart: the new process requeues and runs the orphaned jobs
+worker = queue(path)
+worker.start()
+for name, job in [
+    ("dead pid", dead_pid),
+    ("other host", other_host),
+    ("reused pid", reused_pid),
+]:
+    ok = wait_for(worker, job["id"], "succeeded")
+    print(f"{name:<12} -> {worker.get(job['id'])['status']}")
+    if not ok:
+        failures.append(f"{name} job was not recovered")
+
+status = worker.get(live_other["id"])["status"]
+print(f"{'live lease':<12} -> {status}")
+if status != "running":
+    failures.append("job with a live lease was taken from its worker")
+
+# A long job keeps its lease past the timeout while it runs
+slow = JobQueue(
+    lambda kind, params: time.sleep(LEASE * 2) or params,
+    path,
+    workers=1,
+    poll_interval=0.1,
+    lease_timeout=LEASE,
+)
+worker.shutdown()
+slow.start()
+long_job, _ = slow.submit("season", {"year": 2025})
+time.sleep(LEASE * 1.5)
+job, created = queue(path, workers=0).submit("season", {"year": 2025})
+print(f"Heartbeat dedup:     created={created} status={job['status']}")
+if created or job["status"] != "running":
+    failures.append("lease of a long-running job was not renewed")
+if not wait_for(slow, long_job["id"], "succeeded"):
+    failures.append("long-running job did not finish")
+slow.shutdown()
+
+if failures:
+    print("\nFAILED:")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1)
+
+print("\nJob queue recovery working correctly!")
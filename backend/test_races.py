@@ -0,0 +1,63 @@
+"""Test script for the caching headers of the races listing."""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, ".")
+
+# A local data directory with a schedule for 2023 only
+LOCAL_DIR = Path(tempfile.mkdtemp())
+os.environ["DATA_SOURCE"] = "local"
+os.environ["LOCAL_DATA_DIR"] = str(LOCAL_DIR)
+os.environ["SHARED_CACHE_DIR"] = tempfile.mkdtemp()
+os.environ["JOBS_DB"] = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+
+from app.main import app  # noqa: E402
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+SCHEDULE = LOCAL_DIR / "2023" / "schedule.json"
+SCHEDULE.parent.mkdir(parents=True)
+SCHEDULE.write_text(json.dumps(SyntheticDataSource().get_schedule(2023)))
+
+print("Testing /api/races caching headers...\n")
+failures = []
+client = TestClient(app)
+
+# A season without a schedule is not cached
+response = client.get("/api/races/2022")
+print(
+    f"Empty season:     {len(response.json()['races'])} races,"
+    f" Cache-Control {response.headers.get('cache-control')},"
+    f" ETag {response.headers.get('etag')}"
+)
+if response.headers.get("cache-control") != "no-store" or "etag" in response.headers:
+    failures.append("empty schedule was cacheable")
+
+response = client.get("/api/races/2023")
+etag = response.headers.get("etag")
+print(f"Season:           {len(response.json()['races'])} races, ETag {etag}")
+if not etag or "immutable" not in response.headers.get("cache-control", ""):
+    failures.append("complete schedule was not cacheable")
+
+response = client.get("/api/races/2023", headers={"If-None-Match": etag})
+print(f"Revalidation:     {response.status_code}")
+if response.status_code != 304:
+    failures.append("unchanged schedule was not answered with 304")
+
+# A revised calendar changes the ETag
+SCHEDULE.write_text(json.dumps(SyntheticDataSource().get_schedule(2023)[:-1]))
+response = client.get("/api/races/2023", headers={"If-None-Match": etag})
+print(f"Revised calendar: {response.status_code}, ETag {response.headers.get('etag')}")
+if response.status_code != 200 or response.headers.get("etag") == etag:
+    failures.append("revised schedule was answered with the old ETag")
+
+if failures:
+    print("\nFAILED:")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1)
+
+print("\nRaces caching working correctly!")
@@ -0,0 +1,68 @@
+"""Test script for stint extraction of drivers without quick laps."""
+import sys
+
+import numpy as np
+
+sys.path.insert(0, ".")
+
+from app.services.data_sources import SyntheticDataSource  # noqa: E402
+from app.services.fastf1_client import FastF1Client  # noqa: E402
+from app.services.session_data import LapTable, SessionData  # noqa: E402
+from app.services.stints import StintTable  # noqa: E402
+
+print("Testing get_stint_data for drivers without quick laps...\n")
+
+source = SyntheticDataSource()
+client = FastF1Client(source)
+session = source.load_session(2023, "Monza", "R")
+failures = []
+
+
+def with_lap_times(session: SessionData, lap_time: np.ndarray) -> SessionData:
+    columns = dict(session.laps.columns, lap_time=lap_time)
+    return SessionData(
+        session.year, session.session_type, session.event, LapTable(columns)
+    )
+
+
+# A lap-1 retirement: the driver's only lap has no time
+dnf = session.laps.drivers()[0]
+lap_time = session.laps["lap_time"].copy()
+lap_time[session.laps["driver"] == dnf] = np.nan
+dnf_session = with_lap_times(session, lap_time)
+# No lap of the session has a time
+untimed_session = with_lap_times(session, np.full(len(lap_time), np.nan))
+
+cases = [
+    ("unknown driver", session, "XXX"),
+    ("lap-1 DNF", dnf_session, dnf),
+    ("no quick laps", untimed_session, dnf),
+]
+for name, case_session, driver in cases:
+    try:
+        stints = client.get_stint_data(case_session, driver)
+    except Exception as e:
+        failures.append(f"{name}: {type(e).__name__}: {e}")
+        continue
+    print(f"{name:<15} {driver}: {len(stints)} stints")
+    if stints:
+        failures.append(f"{name}: expected no stints, got {len(stints)}")
+
+table = StintTable.from_session(untimed_session)
+print(f"\nEmpty table: {len(table)} stints, offsets {table.offsets.tolist()}")
+if len(table) or table.offsets.tolist() != [0]:
+    failures.append("session without quick laps did not give an empty StintTable")
+
+# Other drivers keep their stints
+stints = client.get_stint_data(dnf_session, dnf_session.laps.drivers()[1])
+print(f"Other driver: {len(stints)} stints")
+if not stints:
+    failures.append("other drivers lost their stints")
+
+if failures:
+    print("\nFAILED:")
+    for failure in failures:
+        print(f"  {failure}")
+    sys.exit(1)
+
+print("\nStint extraction working correctly!")
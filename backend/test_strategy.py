@@ -20,11 +20,11 @@ if not session:
     sys.exit(1)
 
 # Get total laps
-total_laps = int(session.laps["LapNumber"].max())
+total_laps = session.total_laps
 print(f"Total laps: {total_laps}")
 
 # Get stint data
-all_drivers = session.laps["Driver"].unique()
+all_drivers = session.laps.drivers()
 all_stints = {}
 for driver in all_drivers:
     stints = client.get_stint_data(session, driver)
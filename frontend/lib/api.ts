@@ -24,6 +24,14 @@ async function fetchAPI<T>(
   return response.json();
 }
 
+/**
+ * Query string for session analyses. GET requests let the browser and any
+ * proxy cache responses (the backend sends ETag and Cache-Control).
+ */
+function sessionQuery(year: number, race: string, session: string): string {
+  return new URLSearchParams({ year: String(year), race, session }).toString();
+}
+
 export async function healthCheck(): Promise<{ status: string }> {
   return fetchAPI("/health");
 }
@@ -37,11 +45,7 @@ export async function getDegradation(
   race: string,
   session: string = "R"
 ): Promise<DegradationResponse> {
-  return fetchAPI("/api/degradation", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ year, race, session }),
-  });
+  return fetchAPI(`/api/degradation?${sessionQuery(year, race, session)}`);
 }
 
 export async function getStrategy(
@@ -49,11 +53,7 @@ export async function getStrategy(
   race: string,
   session: string = "R"
 ): Promise<StrategyResponse> {
-  return fetchAPI("/api/strategy", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ year, race, session }),
-  });
+  return fetchAPI(`/api/strategy?${sessionQuery(year, race, session)}`);
 }
 
 export async function getOvertakes(
@@ -61,9 +61,5 @@ export async function getOvertakes(
   race: string,
   session: string = "R"
 ): Promise<OvertakeResponse> {
-  return fetchAPI("/api/overtakes", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ year, race, session }),
-  });
+  return fetchAPI(`/api/overtakes?${sessionQuery(year, race, session)}`);
 }
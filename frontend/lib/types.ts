@@ -85,7 +85,7 @@ export interface OvertakeZone {
   distance_start: number;
   distance_end: number;
   avg_speed_delta: number;
-  overtake_count: number;
+  overtake_count: number | null; // not located on track yet
   difficulty: string;
   has_drs: boolean;
 }